@@ -1,9 +1,47 @@
+"""Run the API server: ``python -m backend [--workers N] [--reload]``.
+
+By default this is the production setup: WORKERS processes (one per CPU
+core unless configured) behind one socket. Each worker's DB pool is capped
+at an equal share of DB_MAX_CONNECTIONS (90 by default), and it gets the
+same share of the deployment-wide model, upload and job limits
+(core/workers.py). On SIGTERM every worker stops accepting connections,
+finishes in-flight requests (up to SERVER_DRAIN_SECONDS),
+drains running transcription jobs and closes its pool. Orchestrators
+should allow about SERVER_DRAIN_SECONDS + JOB_DRAIN_SECONDS before killing
+the process.
+
+--reload runs a single auto-reloading process for development.
+"""
+
+import argparse
+import os
+
 import uvicorn
 
-if __name__ == "__main__":
+from backend.constants import API_ADDRESS, API_PORT, SERVER_CONFIG
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server.")
+    parser.add_argument("--host", default=API_ADDRESS)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_CONFIG["WORKERS"], help="0 = one per CPU core")
+    parser.add_argument("--reload", action="store_true", help="Single auto-reloading process (development)")
+    args = parser.parse_args()
+
+    workers = 1 if args.reload else args.workers or os.cpu_count() or 1
+    # Workers are fresh interpreters; they read this when sizing their pools
+    os.environ["SERVER_WORKERS"] = str(workers)
+
     uvicorn.run(
         "backend.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-    )
\ No newline at end of file
+        host=args.host,
+        port=args.port,
+        reload=args.reload,
+        workers=None if args.reload else workers,
+        timeout_graceful_shutdown=SERVER_CONFIG["DRAIN_SECONDS"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,54 @@ from fastapi import FastAPI, Depends, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from backend.db.database import DatabaseManager
-from .routers import upload, main, auth, tex
+from backend.db import database
+from backend.core.agent import close_client
+from backend.core.hashing import hashing_pool
+from backend.core.jobs import job_queue
+from backend.core.preprocess import image_preprocessor
+from backend.core.revocation_feed import revocation_feed
+from backend.core.startup import startup
+from backend.core.thumbnails import thumbnailer
+from backend.core.token_reaper import token_reaper
+from .routers import upload, main, auth, tex, images
+from .middleware.metrics import MetricsMiddleware
+from .middleware.server_timing import ServerTimingMiddleware
+from .middleware.upload_limits import UploadLimitMiddleware
 
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Don't wait for the database or the model SDK: the pool connects and
+    # startup (migrations, job workers) retries in the background; /ready
+    # tells when it's done. On shutdown (after the server has drained
+    # in-flight requests) let running jobs finish, then release everything.
+    if database.pg is not None:
+        await database.pg.open(wait=False)
+    startup.start(database.pg)
+    try:
+        yield
+    finally:
+        await startup.stop()
+        await token_reaper.stop()
+        await revocation_feed.stop()
+        await job_queue.drain()
+        await close_client()
+        if database.pg is not None:
+            await database.pg.close_all()
+        hashing_pool.shutdown(wait=False)
+        image_preprocessor.shutdown(wait=False)
+        thumbnailer.shutdown(wait=False)
+
+
 def create_app() -> FastAPI:
 
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     app.add_middleware(
     CORSMiddleware,
@@ -22,10 +58,15 @@ def create_app() -> FastAPI:
     allow_methods=["*"],
     allow_headers=["*"],
 )
+    app.add_middleware(UploadLimitMiddleware)
+    app.add_middleware(ServerTimingMiddleware)
+    # Outermost, so rejected uploads are counted too
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(upload.router)
     app.include_router(main.router)
     app.include_router(auth.router)
     app.include_router(tex.router)
+    app.include_router(images.router)
 
     return app
\ No newline at end of file
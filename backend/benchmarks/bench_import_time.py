@@ -0,0 +1,70 @@
+"""Cold import time of the app, and the modules that dominate it.
+
+Each run imports --module in a fresh interpreter with ``-X importtime``
+(DB pool creation disabled, as in tests) and reports the wall time plus the
+top-level packages that took longest to import. Exits with status 1 if the
+median exceeds --budget seconds, so it can gate CI.
+
+Usage:
+    python -m backend.benchmarks.bench_import_time --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from backend.benchmarks.common import emit
+
+
+def import_once(module: str) -> tuple[float, dict[str, int]]:
+    """(wall seconds, microseconds spent importing each top-level package)."""
+    env = {**os.environ, "DISABLE_DB_INIT": "1"}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - start
+    packages = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"; summing
+        # self time attributes every microsecond exactly once
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _cumulative, name = line[len("import time:"):].split("|")
+        top = name.strip().split(".")[0]
+        packages[top] = packages.get(top, 0) + int(own)
+    return elapsed, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="backend.api")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.5, help="Median seconds allowed")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    walls, last = [], {}
+    for _ in range(args.runs):
+        wall, last = import_once(args.module)
+        walls.append(wall)
+    median = statistics.median(walls)
+    slowest = sorted(last.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    emit({
+        "config": vars(args),
+        "median_s": round(median, 3),
+        "min_s": round(min(walls), 3),
+        "max_s": round(max(walls), 3),
+        "slowest_ms": {name: round(us / 1000, 1) for name, us in slowest},
+        "within_budget": median <= args.budget,
+    })
+    if median > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Login storm benchmark: bcrypt inline on the event loop vs the hashing pool.
+
+Fires a burst of concurrent /auth/login requests at the app in-process while
+a probe keeps hitting /health, then reports login throughput and the latency
+the unrelated /health route saw during the storm. The database is replaced by
+a fake that returns one user with a real bcrypt hash, so only hashing cost is
+measured.
+
+Usage:
+    python -m backend.benchmarks.bench_login_storm --logins 40 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("DISABLE_DB_INIT", "1")
+
+import bcrypt
+import httpx
+
+import backend.routers.auth as auth_router
+from backend.api import create_app
+from backend.benchmarks.common import emit, summarize
+from backend.core.hashing import hashing_pool
+
+
+class _UserCursor:
+    def __init__(self, user_row):
+        self._user_row = user_row
+
+    async def execute(self, query, params=None):
+        pass
+
+    async def fetchone(self):
+        return dict(self._user_row)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class _UserConn:
+    def __init__(self, user_row):
+        self._user_row = user_row
+
+    def cursor(self, *args, **kwargs):
+        return _UserCursor(self._user_row)
+
+    async def commit(self):
+        pass
+
+
+class _UserPG:
+    def __init__(self, password: str, cost: int):
+        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=cost))
+        self._user_row = {
+            "id": 1,
+            "username": "bench",
+            "email": "bench@example.com",
+            "password_hash": hashed.decode("utf-8"),
+        }
+
+    @asynccontextmanager
+    async def connection(self):
+        yield _UserConn(self._user_row)
+
+
+async def run_storm(logins: int, concurrency: int, probe_interval: float) -> dict:
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    login_latencies, probe_latencies = [], []
+    statuses = Counter()
+    storm_done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one_login():
+            async with limit:
+                start = time.perf_counter()
+                r = await client.post("/auth/login", json={"username": "bench", "password": "pw"})
+                login_latencies.append(time.perf_counter() - start)
+                statuses[r.status_code] += 1
+
+        async def probe():
+            while not storm_done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        storm_done.set()
+        await probe_task
+
+    return {
+        "logins": summarize(login_latencies, elapsed),
+        "login_statuses": dict(statuses),
+        "health_during_storm": summarize(probe_latencies, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=hashing_pool.workers or 4)
+    parser.add_argument("--queue-size", type=int, default=hashing_pool.queue_size)
+    parser.add_argument("--executor", choices=("thread", "process"), default=hashing_pool.kind)
+    parser.add_argument("--cost", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    auth_router.pg = _UserPG("pw", args.cost)
+    hashing_pool.queue_size = args.queue_size
+    hashing_pool.kind = args.executor
+
+    report = {"config": vars(args)}
+    for mode, workers in (("inline", 0), ("pool", args.workers)):
+        hashing_pool.shutdown()
+        hashing_pool.workers = workers
+        report[mode] = asyncio.run(run_storm(args.logins, args.concurrency, args.probe_interval))
+    hashing_pool.shutdown()
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
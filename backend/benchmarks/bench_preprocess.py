@@ -0,0 +1,108 @@
+"""Page preprocessing: bytes sent to the model and latency, before vs after.
+
+By default synthetic phone-sized photos are generated (12 MP, high-quality
+JPEG with sensor-like noise); pass --images to use real notebook pages
+instead. Reports, for the raw pages and the preprocessed ones:
+
+- bytes on disk and base64 bytes actually sent inline to the model,
+- preprocessing time with a cold and a warm derivative cache,
+- estimated upload time at --uplink-mbps,
+- with --live (needs AI_API_KEY), the real end-to-end model latency.
+
+Usage:
+    python -m backend.benchmarks.bench_preprocess --pages 8
+    python -m backend.benchmarks.bench_preprocess --images notes/*.jpg --live
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from backend.benchmarks.common import emit
+from backend.constants import PREPROCESS_CONFIG
+from backend.core.preprocess import ImagePreprocessor, PreprocessSettings
+
+
+def synthetic_pages(directory: Path, n: int) -> list[str]:
+    paths = []
+    for i in range(n):
+        noise = Image.effect_noise((4032, 3024), 24).convert("RGB")
+        page = Image.blend(Image.new("RGB", noise.size, (235, 232, 225)), noise, 0.25)
+        draw = ImageDraw.Draw(page)
+        for line in range(60):
+            y = 150 + line * 45
+            draw.line([(200, y), (3800 - (line * 37) % 900, y + 6)], fill=(30, 30, 60), width=5)
+        path = directory / f"page_{i}.jpg"
+        page.save(path, format="JPEG", quality=95)
+        paths.append(str(path))
+    return paths
+
+
+def payload_bytes(paths: list[str]) -> dict:
+    raw = sum(os.path.getsize(p) for p in paths)
+    inline = sum(len(base64.b64encode(Path(p).read_bytes())) for p in paths)
+    return {"file_bytes": raw, "inline_base64_bytes": inline}
+
+
+async def live_latencies(*page_sets: list[str]) -> list[float]:
+    from backend.core.agent import generate_latex_from_images
+
+    latencies = []
+    for paths in page_sets:
+        start = time.perf_counter()
+        await generate_latex_from_images(paths)
+        latencies.append(round(time.perf_counter() - start, 3))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", nargs="*", help="Real page images (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=8, help="Synthetic pages to generate")
+    parser.add_argument("--max-dimension", type=int, default=PREPROCESS_CONFIG["MAX_DIMENSION"])
+    parser.add_argument("--quality", type=int, default=PREPROCESS_CONFIG["QUALITY"])
+    parser.add_argument("--grayscale", action="store_true", default=PREPROCESS_CONFIG["GRAYSCALE"])
+    parser.add_argument("--workers", type=int, default=PREPROCESS_CONFIG["WORKERS"] or 2)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0)
+    parser.add_argument("--live", action="store_true", help="Also time real model calls")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pages = args.images or synthetic_pages(tmp, args.pages)
+        settings = PreprocessSettings(args.max_dimension, args.grayscale, args.quality)
+        preprocessor = ImagePreprocessor(settings, str(tmp / "derived"), workers=args.workers)
+
+        start = time.perf_counter()
+        derived = asyncio.run(preprocessor.prepare(pages))
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        asyncio.run(preprocessor.prepare(pages))
+        warm = time.perf_counter() - start
+        preprocessor.shutdown()
+
+        report = {"config": {**vars(args), "images": len(pages), "settings": settings.tag}}
+        for name, paths in (("raw", pages), ("preprocessed", derived)):
+            sizes = payload_bytes(paths)
+            sizes["est_upload_s"] = round(sizes["inline_base64_bytes"] * 8 / (args.uplink_mbps * 1e6), 3)
+            report[name] = sizes
+        if args.live:
+            raw_s, preprocessed_s = asyncio.run(live_latencies(pages, derived))
+            report["raw"]["model_latency_s"] = raw_s
+            report["preprocessed"]["model_latency_s"] = preprocessed_s
+        report["preprocessed"]["cold_preprocess_s"] = round(cold, 3)
+        report["preprocessed"]["warm_preprocess_s"] = round(warm, 3)
+        report["bytes_reduction"] = round(
+            1 - report["preprocessed"]["inline_base64_bytes"] / report["raw"]["inline_base64_bytes"], 3
+        )
+    emit(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Small helpers shared by the benchmark scripts in this package."""
+
+import json
+import math
+import sys
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of samples (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Summarize request latencies (seconds) measured over elapsed seconds."""
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def emit(report: dict):
+    """Write a benchmark report to stdout as JSON."""
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from dotenv import dotenv_values
 
@@ -5,22 +6,163 @@ from dotenv import dotenv_values
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 ENV_PATH = PROJECT_ROOT / ".env"
 
-ENV = dotenv_values(ENV_PATH)
+# Values from .env, overridden by the process environment
+ENV = {**dotenv_values(ENV_PATH), **os.environ}
 
 # Container listens on 0.0.0.0; match compose exposed port
 API_ADDRESS = "0.0.0.0"
 API_PORT = 8000
 
+# python -m backend runs WORKERS server processes (0 = one per CPU core) and
+# exports the resolved count. Limits below marked "deployment-wide" are then
+# split evenly between the workers (see core/workers.py). On SIGTERM a
+# worker stops accepting connections and gives in-flight requests up to
+# DRAIN_SECONDS to finish before shutting down.
+SERVER_CONFIG = {
+    "WORKERS": int(ENV.get("SERVER_WORKERS", 0)),
+    "DRAIN_SECONDS": float(ENV.get("SERVER_DRAIN_SECONDS", 20)),
+}
+
 # Use service name for in-network DB host
+# POOL_TIMEOUT is how long a request waits for a free connection;
+# STATEMENT_TIMEOUT_MS is enforced server-side on every connection.
+# Leases held longer than LEASE_WARN_SECONDS are logged as probable leaks.
+# POOL_MAX_SIZE caps each worker's pool and MAX_CONNECTIONS all workers'
+# connections together, pools and revocation feeds (0 = no overall cap);
+# the default leaves headroom under Postgres' default max_connections of 100.
+# The app starts without waiting for the database: migrations
+# (MIGRATE_ON_STARTUP) and the first connection are retried in the
+# background, backing off up to STARTUP_RETRY_MAX_DELAY seconds, until they
+# succeed. /ready fails until then, or if SELECT 1 takes over READY_TIMEOUT.
 DB_CONFIG = {
-    "DB_HOST": "postgres",
-    "DB_PORT": 5432,
-    "DB_NAME": "mydatabase",
+    "DB_HOST": ENV.get("DB_HOST", "postgres"),
+    "DB_PORT": int(ENV.get("DB_PORT", 5432)),
+    "DB_NAME": ENV.get("DB_NAME", "mydatabase"),
     "DB_USER": ENV.get("DB_USER", "test"),
     "DB_PASSWORD": ENV.get("DB_PASSWORD", "test"),
+    "POOL_MIN_SIZE": int(ENV.get("DB_POOL_MIN_SIZE", 1)),
+    "POOL_MAX_SIZE": int(ENV.get("DB_POOL_MAX_SIZE", 10)),
+    "MAX_CONNECTIONS": int(ENV.get("DB_MAX_CONNECTIONS", 90)),
+    "POOL_TIMEOUT": float(ENV.get("DB_POOL_TIMEOUT", 30)),
+    "CONNECT_TIMEOUT": float(ENV.get("DB_CONNECT_TIMEOUT", 30)),
+    "STATEMENT_TIMEOUT_MS": int(ENV.get("DB_STATEMENT_TIMEOUT_MS", 15000)),
+    "LEASE_WARN_SECONDS": float(ENV.get("DB_LEASE_WARN_SECONDS", 10)),
+    "MIGRATE_ON_STARTUP": ENV.get("DB_MIGRATE_ON_STARTUP", "1") == "1",
+    "STARTUP_RETRY_MAX_DELAY": float(ENV.get("DB_STARTUP_RETRY_MAX_DELAY", 30)),
+    "READY_TIMEOUT": float(ENV.get("DB_READY_TIMEOUT", 2)),
 }
 
+# Finished transcriptions are cached by content in tex_codes; the newest
+# CACHE_SIZE results are also kept in memory. At most MAX_CONCURRENCY model
+# calls run at once, started at no more than REQUESTS_PER_MINUTE with bursts
+# of up to RPM_BURST; all three are deployment-wide and the first two may be
+# 0 for no limit. Notebooks longer than CHUNK_PAGES (0 = never split) are
+# transcribed in chunks, CHUNK_PARALLELISM at a time, and merged into one
+# document.
+# Each call times out after CALL_TIMEOUT seconds and transient failures are
+# retried up to MAX_RETRIES times with jittered exponential backoff. If at
+# least BREAKER_ERROR_RATE of the last BREAKER_WINDOW calls (and at least
+# BREAKER_MIN_CALLS) failed, calls fail fast for BREAKER_RESET_SECONDS.
+# BASE_URL overrides the API endpoint (e.g. a local fake for load tests).
 AI_CONFIG = {
     "API_KEY": ENV.get("AI_API_KEY", ""),
     "MODEL_NAME": "gemini-2.0-flash",
-}
\ No newline at end of file
+    "BASE_URL": ENV.get("AI_BASE_URL", ""),
+    "CACHE_SIZE": int(ENV.get("AI_CACHE_SIZE", 256)),
+    "MAX_CONCURRENCY": int(ENV.get("AI_MAX_CONCURRENCY", 8)),
+    "REQUESTS_PER_MINUTE": float(ENV.get("AI_REQUESTS_PER_MINUTE", 60)),
+    "RPM_BURST": int(ENV.get("AI_RPM_BURST", 1)),
+    "CHUNK_PAGES": int(ENV.get("AI_CHUNK_PAGES", 10)),
+    "CHUNK_PARALLELISM": int(ENV.get("AI_CHUNK_PARALLELISM", 4)),
+    "CALL_TIMEOUT": float(ENV.get("AI_CALL_TIMEOUT", 120)),
+    "MAX_RETRIES": int(ENV.get("AI_MAX_RETRIES", 3)),
+    "RETRY_BASE_DELAY": float(ENV.get("AI_RETRY_BASE_DELAY", 1.0)),
+    "RETRY_MAX_DELAY": float(ENV.get("AI_RETRY_MAX_DELAY", 20)),
+    "BREAKER_WINDOW": int(ENV.get("AI_BREAKER_WINDOW", 20)),
+    "BREAKER_ERROR_RATE": float(ENV.get("AI_BREAKER_ERROR_RATE", 0.5)),
+    "BREAKER_MIN_CALLS": int(ENV.get("AI_BREAKER_MIN_CALLS", 5)),
+    "BREAKER_RESET_SECONDS": float(ENV.get("AI_BREAKER_RESET_SECONDS", 30)),
+}
+
+# Pages are downscaled to MAX_DIMENSION pixels on the long side, optionally
+# made grayscale and re-encoded as JPEG at QUALITY before being sent to the
+# model. Derivatives are cached under CACHE_DIR by source hash and settings.
+PREPROCESS_CONFIG = {
+    "ENABLED": ENV.get("PREPROCESS_ENABLED", "1") == "1",
+    "MAX_DIMENSION": int(ENV.get("PREPROCESS_MAX_DIMENSION", 2048)),
+    "GRAYSCALE": ENV.get("PREPROCESS_GRAYSCALE", "0") == "1",
+    "QUALITY": int(ENV.get("PREPROCESS_QUALITY", 80)),
+    "WORKERS": int(ENV.get("PREPROCESS_WORKERS", 2)),
+    "CACHE_DIR": ENV.get("PREPROCESS_CACHE_DIR", "uploads/derived"),
+}
+
+# Gallery thumbnails: at most SIZE pixels on the long side, JPEG at QUALITY,
+# generated on WORKERS processes (0 = inline) and stored under DIR. With
+# ON_UPLOAD they are made right after upload, otherwise on first request.
+THUMBNAIL_CONFIG = {
+    "SIZE": int(ENV.get("THUMBNAIL_SIZE", 320)),
+    "QUALITY": int(ENV.get("THUMBNAIL_QUALITY", 75)),
+    "WORKERS": int(ENV.get("THUMBNAIL_WORKERS", 1)),
+    "DIR": ENV.get("THUMBNAIL_DIR", "uploads/thumbs"),
+    "ON_UPLOAD": ENV.get("THUMBNAIL_ON_UPLOAD", "1") == "1",
+}
+
+# Transcription jobs run on WORKERS background workers (deployment-wide, at
+# least one per server worker); at most QUEUE_SIZE jobs wait in each
+# worker's memory before submissions are refused; a bigger backlog found
+# on startup is loaded a queueful at a time. Jobs left "running" for
+# STALE_SECONDS (e.g. by a crashed process) are requeued on startup.
+# On shutdown, running jobs get DRAIN_SECONDS to finish; the rest go back
+# to the queue for the next process.
+JOB_CONFIG = {
+    "WORKERS": int(ENV.get("JOB_WORKERS", 4)),
+    "QUEUE_SIZE": int(ENV.get("JOB_QUEUE_SIZE", 100)),
+    "STALE_SECONDS": float(ENV.get("JOB_STALE_SECONDS", 900)),
+    "DRAIN_SECONDS": float(ENV.get("JOB_DRAIN_SECONDS", 20)),
+}
+
+# bcrypt runs in a bounded worker pool so logins never block the event loop.
+# HASH_EXECUTOR is "thread" or "process"; HASH_WORKERS=0 hashes inline.
+# Verified tokens are cached in-process for at most TOKEN_CACHE_TTL seconds;
+# logouts reach every worker's cache through the token_revocations feed.
+# TOKEN_MODE "signed" issues HMAC tokens verified in memory instead of opaque
+# DB-backed ones. TOKEN_SIGNING_KEYS is "kid:secret,kid2:secret2"; to rotate,
+# add a key, make it active, and drop the old one after TOKEN_TTL_MINUTES.
+# Expired opaque tokens are deleted every TOKEN_REAP_INTERVAL seconds (0 =
+# never), TOKEN_REAP_BATCH rows per transaction.
+AUTH_CONFIG = {
+    "HASH_EXECUTOR": ENV.get("AUTH_HASH_EXECUTOR", "thread"),
+    "HASH_WORKERS": int(ENV.get("AUTH_HASH_WORKERS", 4)),
+    "HASH_QUEUE_SIZE": int(ENV.get("AUTH_HASH_QUEUE_SIZE", 64)),
+    "TOKEN_CACHE_SIZE": int(ENV.get("AUTH_TOKEN_CACHE_SIZE", 10000)),
+    "TOKEN_CACHE_TTL": float(ENV.get("AUTH_TOKEN_CACHE_TTL", 30)),
+    "TOKEN_TTL_MINUTES": int(ENV.get("AUTH_TOKEN_TTL_MINUTES", 60)),
+    "TOKEN_MODE": ENV.get("AUTH_TOKEN_MODE", "opaque"),
+    "TOKEN_SIGNING_KEYS": ENV.get("AUTH_TOKEN_SIGNING_KEYS", ""),
+    "TOKEN_ACTIVE_KEY_ID": ENV.get("AUTH_TOKEN_ACTIVE_KEY_ID", ""),
+    "TOKEN_REVOCATION_SIZE": int(ENV.get("AUTH_TOKEN_REVOCATION_SIZE", 100000)),
+    "TOKEN_REAP_INTERVAL": float(ENV.get("AUTH_TOKEN_REAP_INTERVAL", 300)),
+    "TOKEN_REAP_BATCH": int(ENV.get("AUTH_TOKEN_REAP_BATCH", 1000)),
+}
+
+
+# Uploads are streamed to disk in CHUNK_SIZE pieces. MAX_REQUEST_BYTES caps a
+# single /upload request and MAX_INFLIGHT_BYTES (deployment-wide, 0 = no
+# limit) caps all uploads in progress.
+UPLOAD_CONFIG = {
+    "CHUNK_SIZE": int(ENV.get("UPLOAD_CHUNK_SIZE", 1024 * 1024)),
+    "MAX_FILE_BYTES": int(ENV.get("UPLOAD_MAX_FILE_BYTES", 25 * 1024 * 1024)),
+    "MAX_REQUEST_BYTES": int(ENV.get("UPLOAD_MAX_REQUEST_BYTES", 512 * 1024 * 1024)),
+    "MAX_INFLIGHT_BYTES": int(ENV.get("UPLOAD_MAX_INFLIGHT_BYTES", 2 * 1024 * 1024 * 1024)),
+}
+
+# Every response carries a Server-Timing header (phase durations) unless
+# SERVER_TIMING is off. A request sent with "X-Profile: <ADMIN_TOKEN>" is
+# also profiled by sampling every SAMPLE_INTERVAL seconds, and the profile is
+# written to DIR; profiling is disabled while ADMIN_TOKEN is empty.
+PROFILING_CONFIG = {
+    "SERVER_TIMING": ENV.get("PROFILING_SERVER_TIMING", "1") == "1",
+    "ADMIN_TOKEN": ENV.get("PROFILING_ADMIN_TOKEN", ""),
+    "SAMPLE_INTERVAL": float(ENV.get("PROFILING_SAMPLE_INTERVAL", 0.005)),
+    "DIR": ENV.get("PROFILING_DIR", "profiles"),
+}
@@ -1,9 +1,27 @@
 from backend.constants import AI_CONFIG
 
 from pathlib import Path
-from google import genai
-from google.genai import types
+from starlette.concurrency import run_in_threadpool
+from backend.core.latex_merge import merge_documents
+from backend.core.metrics import registry
+from backend.core.ratelimit import ModelLimiter
+from backend.core.resilience import CircuitBreaker, ModelUnavailable, backoff_delay, is_retryable
+from backend.core.timing import FILE, MODEL, phase
+from backend.core.workers import worker_share
+import asyncio
+import logging
 import os
+import time
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, AsyncIterator
+
+# google.genai takes about half a second to import, so it is loaded on first
+# use (or by the startup warm-up in core/startup.py), not with this module
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
+
+logger = logging.getLogger(__name__)
 
 PROMPT = r"""
 You are a LaTeX transcription engine.
@@ -22,6 +40,13 @@ Requirements:
 - DO NOT EVER PUT IMAGES IN THE LATEX.
 """
 
+class EmptyTranscription(RuntimeError):
+    """The model answered without any text (e.g. the response was blocked).
+
+    Retrying the same pages won't help, and the result must not be cached.
+    """
+
+
 def guess_mime(path: Path) -> str:
     ext = path.suffix.lower()
     if ext in (".jpg", ".jpeg"):
@@ -32,20 +57,65 @@ def guess_mime(path: Path) -> str:
         return "image/webp"
     raise ValueError(f"Unsupported image type: {ext}")
 
-def generate_latex_from_images(image_files):
+_client: "genai.Client | None" = None
+
+# Shared by every model call in this process; the configured limits are
+# for the whole deployment, so each worker process gets its share
+model_limiter = ModelLimiter(
+    max_concurrency=worker_share(AI_CONFIG["MAX_CONCURRENCY"], "AI_MAX_CONCURRENCY"),
+    requests_per_minute=worker_share(AI_CONFIG["REQUESTS_PER_MINUTE"], "AI_REQUESTS_PER_MINUTE"),
+    burst=worker_share(AI_CONFIG["RPM_BURST"], "AI_RPM_BURST"),
+)
+
+model_breaker = CircuitBreaker(
+    window=AI_CONFIG["BREAKER_WINDOW"],
+    error_rate=AI_CONFIG["BREAKER_ERROR_RATE"],
+    min_calls=AI_CONFIG["BREAKER_MIN_CALLS"],
+    reset_seconds=AI_CONFIG["BREAKER_RESET_SECONDS"],
+)
+
+model_call_duration = registry.histogram(
+    "model_call_duration_seconds",
+    "Model API attempts (for streams, until the first text), by outcome.",
+    ("method", "outcome"),
+)
+model_request_bytes = registry.counter("model_request_bytes_total", "Image bytes sent inline to the model.", ("method",))
+model_response_bytes = registry.counter("model_response_bytes_total", "LaTeX bytes received from the model.", ("method",))
+model_tokens = registry.counter("model_tokens_total", "Tokens reported by the model API.", ("kind",))
+registry.callback("model_calls_in_flight", "gauge", "Model calls holding a slot.", lambda: model_limiter.in_flight)
+registry.callback("model_calls_waiting", "gauge", "Model calls waiting for a slot.", lambda: model_limiter.waiting)
+registry.callback(
+    "model_breaker_open", "gauge", "1 while the model circuit breaker is not closed.",
+    lambda: int(model_breaker.state != model_breaker.CLOSED),
+)
 
-    """
-    image_files: ordered iterable of file paths (str or Path)
-                 ordering defines page order
-    returns: LaTeX source (str)
-    """
 
-    # Prefer key from constants; fallback to env var for compatibility
-    api_key = AI_CONFIG.get("API_KEY") or os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing API key. Set AI_API_KEY in .env or GEMINI_API_KEY in environment.")
+def get_client() -> "genai.Client":
+    """The process-wide Gemini client, created on first use."""
+    global _client
+    if _client is None:
+        from google import genai
+        from google.genai import types
 
-    client = genai.Client(api_key=api_key)
+        # Prefer key from constants; fallback to env var for compatibility
+        api_key = AI_CONFIG.get("API_KEY") or os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("Missing API key. Set AI_API_KEY in .env or GEMINI_API_KEY in environment.")
+        http_options = types.HttpOptions(base_url=AI_CONFIG["BASE_URL"]) if AI_CONFIG["BASE_URL"] else None
+        _client = genai.Client(api_key=api_key, http_options=http_options)
+    return _client
+
+
+async def close_client():
+    """Close the shared client's connections (app shutdown)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aio.aclose()
+
+
+def _build_parts(image_files) -> "list[types.Part]":
+    from google.genai import types
 
     parts = [types.Part(text=PROMPT)]
 
@@ -64,11 +134,200 @@ def generate_latex_from_images(image_files):
                 )
             )
         )
+    return parts
+
+
+def _payload_bytes(parts: "list[types.Part]") -> int:
+    return sum(len(part.inline_data.data) for part in parts if part.inline_data)
+
+
+def _record_usage(usage):
+    if usage is None:
+        return
+    model_tokens.inc("prompt", amount=usage.prompt_token_count or 0)
+    model_tokens.inc("output", amount=usage.candidates_token_count or 0)
+
+
+def _no_text_reason(resp) -> str:
+    feedback = resp.prompt_feedback
+    if feedback is not None and feedback.block_reason:
+        return f"prompt blocked ({feedback.block_reason})"
+    if resp.candidates and resp.candidates[0].finish_reason:
+        return f"finish reason {resp.candidates[0].finish_reason}"
+    return "empty response"
+
+
+def _request(parts: "list[types.Part]") -> dict:
+    from google.genai import types
+
+    return {
+        "model": AI_CONFIG["MODEL_NAME"],
+        "contents": [types.Content(role="user", parts=parts)],
+        "config": types.GenerateContentConfig(temperature=0.2),
+    }
+
+
+async def _with_retries(call, method: str):
+    """Run call() (one model request) with retries, backoff and the breaker.
+
+    Each attempt is timed into model_call_duration under method.
+
+    Raises:
+        CircuitOpen: if the breaker is open.
+        ModelUnavailable: if every attempt failed with a transient error.
+        Non-transient errors (e.g. a rejected request) are raised as-is.
+    """
+    retries = AI_CONFIG["MAX_RETRIES"]
+    for attempt in range(retries + 1):
+        model_breaker.before_call()
+        start = time.perf_counter()
+        try:
+            with phase(MODEL):
+                result = await call()
+        except asyncio.CancelledError:
+            model_breaker.release()
+            raise
+        except Exception as exc:
+            if not is_retryable(exc):
+                # The service answered; the request itself was bad
+                model_call_duration.observe(time.perf_counter() - start, method, "rejected")
+                model_breaker.record_success()
+                raise
+            model_call_duration.observe(time.perf_counter() - start, method, "failed")
+            model_breaker.record_failure()
+            if attempt == retries:
+                raise ModelUnavailable(f"Model call failed after {attempt + 1} attempts: {exc!r}") from exc
+            delay = backoff_delay(attempt, AI_CONFIG["RETRY_BASE_DELAY"], AI_CONFIG["RETRY_MAX_DELAY"])
+            logger.warning("Model call failed (%r); retry %d/%d in %.2fs", exc, attempt + 1, retries, delay)
+            await asyncio.sleep(delay)
+        else:
+            model_call_duration.observe(time.perf_counter() - start, method, "ok")
+            model_breaker.record_success()
+            return result
+
+
+async def _transcribe(image_files) -> str:
+    # One model call for one set of pages
+    client = get_client()
+    with phase(FILE):
+        parts = await run_in_threadpool(_build_parts, image_files)
+
+    payload = _payload_bytes(parts)
+
+    async def call():
+        async with model_limiter.slot():
+            model_request_bytes.inc("generate", amount=payload)
+            async with asyncio.timeout(AI_CONFIG["CALL_TIMEOUT"]):
+                return await client.aio.models.generate_content(**_request(parts))
+
+    resp = await _with_retries(call, "generate")
+    text = resp.text or ""
+    model_response_bytes.inc("generate", amount=len(text.encode("utf-8")))
+    _record_usage(resp.usage_metadata)
+    if not text.strip():
+        raise EmptyTranscription(f"Model returned no text: {_no_text_reason(resp)}")
+    return text
+
+
+async def stream_latex_from_images(image_files) -> AsyncIterator[str]:
+    """Yield LaTeX text for the pages as the model produces it.
+
+    Streams always use a single model call (no chunking, since merging
+    needs every chunk's preamble first); the model slot is held until the
+    stream ends. Opening the stream is retried like any call, but once text
+    has been yielded a failure raises ModelUnavailable. CALL_TIMEOUT applies
+    to each wait for the next piece of text. A stream that ends without
+    any text raises EmptyTranscription.
+    """
+    client = get_client()
+    with phase(FILE):
+        parts = await run_in_threadpool(_build_parts, list(image_files))
+    timeout = AI_CONFIG["CALL_TIMEOUT"]
+
+    payload = _payload_bytes(parts)
+
+    async def open_stream():
+        # Each attempt takes its own slot and rate token, and backoff sleeps
+        # hold neither; the successful attempt keeps its slot (and closes
+        # its stream) when the stack is closed at the end of the stream
+        stack = AsyncExitStack()
+        await stack.enter_async_context(model_limiter.slot())
+        try:
+            model_request_bytes.inc("stream", amount=payload)
+            async with asyncio.timeout(timeout):
+                stream = await client.aio.models.generate_content_stream(**_request(parts))
+                stack.push_async_callback(stream.aclose)
+                return stack, stream, await anext(stream, None)
+        except BaseException:
+            await stack.aclose()
+            raise
+
+    stack, stream, chunk = await _with_retries(open_stream, "stream")
+    async with stack:
+        usage = None
+        produced = False
+        try:
+            while chunk is not None:
+                # Each chunk reports the running totals; keep the last
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    model_response_bytes.inc("stream", amount=len(chunk.text.encode("utf-8")))
+                    produced = produced or bool(chunk.text.strip())
+                    yield chunk.text
+                try:
+                    async with asyncio.timeout(timeout):
+                        chunk = await anext(stream, None)
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        raise
+                    model_breaker.record_failure()
+                    raise ModelUnavailable(f"Model stream failed: {exc!r}") from exc
+            if not produced:
+                raise EmptyTranscription("Model stream ended without text")
+        finally:
+            _record_usage(usage)
+
+
+async def generate_latex_from_images(image_files, chunk_pages=None, parallelism=None):
+
+    """
+    image_files: ordered iterable of file paths (str or Path)
+                 ordering defines page order
+    chunk_pages: pages per model call (default AI_CONFIG["CHUNK_PAGES"]);
+                 longer notebooks are split, transcribed concurrently and
+                 merged into one document. 0 sends everything in one call.
+    parallelism: chunks transcribed at once per notebook
+                 (default AI_CONFIG["CHUNK_PARALLELISM"])
+    returns: LaTeX source (str)
+    raises: EmptyTranscription if the model gave no text for some pages
+
+    Every call also waits for a slot in model_limiter.
+    """
+
+    image_files = list(image_files)
+    chunk_pages = AI_CONFIG["CHUNK_PAGES"] if chunk_pages is None else chunk_pages
+    if chunk_pages <= 0 or len(image_files) <= chunk_pages:
+        return await _transcribe(image_files)
+
+    limit = asyncio.Semaphore(max(1, parallelism or AI_CONFIG["CHUNK_PARALLELISM"]))
+    chunks = [image_files[i:i + chunk_pages] for i in range(0, len(image_files), chunk_pages)]
 
-    resp = client.models.generate_content(
-        model=AI_CONFIG["MODEL_NAME"],
-        contents=[types.Content(role="user", parts=parts)],
-        config=types.GenerateContentConfig(temperature=0.2),
-    )
+    async def transcribe_chunk(chunk):
+        async with limit:
+            return await _transcribe(chunk)
 
-    return resp.text or ""
\ No newline at end of file
+    tasks = [asyncio.create_task(transcribe_chunk(chunk)) for chunk in chunks]
+    try:
+        documents = await asyncio.gather(*tasks)
+    except BaseException:
+        # One failed chunk fails the notebook; stop the others rather than
+        # let them spend model slots, quota and breaker budget on it
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    labels = [
+        f"Pages {start + 1}-{min(start + chunk_pages, len(image_files))}"
+        for start in range(0, len(image_files), chunk_pages)
+    ]
+    return merge_documents(documents, labels)
@@ -1,13 +1,47 @@
-"""Core authentication functions using database connections/cursors.
+"""Core authentication functions using async database connections/cursors.
 
 These functions perform SQL queries for user management.
 Assumes a 'users' table with columns: id (serial), username (text), password_hash (text), email (text).
 """
 
 import bcrypt
+import logging
 import secrets
+import time
 from datetime import datetime, timedelta, timezone
-from psycopg2.extras import RealDictCursor
+from psycopg.rows import dict_row
+from backend.constants import AUTH_CONFIG
+from backend.core.cache import TTLCache
+from backend.core.hashing import hashing_pool
+from backend.core.metrics import registry
+from backend.core.signed_tokens import RevocationList, TokenSigner, parse_signing_keys
+
+logger = logging.getLogger(__name__)
+
+# token -> user dict for recently verified tokens. Entries never outlive the
+# token itself and are dropped on logout/user deletion, in every worker (see
+# core/revocation_feed.py).
+token_cache = TTLCache(
+    maxsize=AUTH_CONFIG["TOKEN_CACHE_SIZE"],
+    ttl_seconds=AUTH_CONFIG["TOKEN_CACHE_TTL"],
+)
+registry.cache("auth_token_cache", "Verified tokens", lambda: token_cache.stats())
+
+
+def _build_token_signer() -> TokenSigner:
+    keys = parse_signing_keys(AUTH_CONFIG["TOKEN_SIGNING_KEYS"])
+    if not keys:
+        if AUTH_CONFIG["TOKEN_MODE"] == "signed":
+            # A per-process key would reject tokens minted by other workers
+            # (and by this one before a restart)
+            raise RuntimeError("AUTH_TOKEN_MODE=signed requires AUTH_TOKEN_SIGNING_KEYS")
+        # Opaque mode never issues signed tokens; this key only rejects them
+        keys = {"ephemeral": secrets.token_bytes(32)}
+    active_kid = AUTH_CONFIG["TOKEN_ACTIVE_KEY_ID"] or next(iter(keys))
+    return TokenSigner(keys, active_kid, RevocationList(AUTH_CONFIG["TOKEN_REVOCATION_SIZE"]))
+
+
+token_signer = _build_token_signer()
 
 
 def hash_password(password: str) -> tuple[str, str]:
@@ -21,11 +55,11 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash."""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
-def get_token(conn, user_id: int, ttl_minutes: int = 60) -> str:
+async def get_token(conn, user_id: int, ttl_minutes: int = 60) -> str:
     """Issue a new opaque access token for a user and persist it.
 
     Args:
-        conn: psycopg2 connection.
+        conn: Async database connection.
         user_id: ID of the user to issue the token for.
         ttl_minutes: Token time-to-live in minutes.
 
@@ -34,27 +68,64 @@ def get_token(conn, user_id: int, ttl_minutes: int = 60) -> str:
     """
     token = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
-    with conn.cursor() as cur:
-        cur.execute(
+    async with conn.cursor() as cur:
+        await cur.execute(
             "INSERT INTO tokens (user_id, token, expires_at) VALUES (%s, %s, %s)",
             (user_id, token, expires_at)
         )
-        conn.commit()
+        await conn.commit()
     return token
 
 
-def verify_token(conn, token: str) -> dict | None:
+def is_signed_token(token: str) -> bool:
+    """Signed tokens contain dots; opaque token_urlsafe values never do."""
+    return "." in token
+
+
+def issue_signed_token(user: dict, ttl_minutes: int = 60) -> str:
+    """Issue a stateless HMAC-signed token for a user.
+
+    Args:
+        user: User dict with id, username and email.
+        ttl_minutes: Token time-to-live in minutes.
+
+    Returns:
+        The signed token string. Nothing is written to the DB.
+    """
+    return token_signer.issue(user, ttl_seconds=ttl_minutes * 60)
+
+
+def verify_signed_token(token: str) -> dict | None:
+    """Verify a signed token in memory (signature, expiry, revocation).
+
+    Returns:
+        A user dict (id, username, email) if valid, else None.
+    """
+    claims = token_signer.verify(token)
+    if claims is None:
+        return None
+    return {"id": claims["sub"], "username": claims["usr"], "email": claims["eml"]}
+
+
+async def verify_token(conn, token: str) -> dict | None:
     """Verify an opaque token against the DB and expiration.
 
+    Valid tokens are added to token_cache so callers can skip the DB on
+    subsequent requests. Signed tokens are checked in memory instead and
+    conn is not used.
+
     Args:
-        conn: psycopg2 connection.
+        conn: Async database connection.
         token: Token string to validate.
 
     Returns:
         A user dict (id, username, email) if valid, else None.
     """
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
+    if is_signed_token(token):
+        return verify_signed_token(token)
+
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(
             """
             SELECT u.id, u.username, u.email, t.expires_at
             FROM tokens t
@@ -63,7 +134,7 @@ def verify_token(conn, token: str) -> dict | None:
             """,
             (token,)
         )
-        row = cur.fetchone()
+        row = await cur.fetchone()
         if not row:
             return None
         # Check expiration
@@ -73,19 +144,150 @@ def verify_token(conn, token: str) -> dict | None:
             # Treat naive timestamps as UTC
             expires_at = expires_at.replace(tzinfo=timezone.utc) if expires_at else now
         if now >= expires_at:
-            # Optionally delete expired token
-            cur.execute("DELETE FROM tokens WHERE token = %s", (token,))
-            conn.commit()
+            # Left for the background reaper; the request path only reads
+            token_cache.invalidate(token)
             return None
         # Return user fields
-        return {"id": row["id"], "username": row["username"], "email": row["email"]}
+        user = {"id": row["id"], "username": row["username"], "email": row["email"]}
+        token_cache.put(token, user, ttl_seconds=(expires_at - now).total_seconds())
+        return user
+
+
+# Tells every worker's revocation feed to apply the new token_revocations row
+REVOCATION_CHANNEL = "token_revocations"
+
+
+async def revoke_token(conn, token: str) -> bool:
+    """Revoke a token so it can no longer be used, in any worker.
+
+    Opaque tokens are deleted; signed tokens are added to the revocation
+    list. Either way a token_revocations row is recorded and announced, so
+    other workers drop the token from their memory as well.
+
+    Args:
+        conn: Async database connection.
+        token: Token string to revoke.
+
+    Returns:
+        True if a valid token was revoked, False otherwise.
+    """
+    token_cache.invalidate(token)
+    async with conn.cursor() as cur:
+        if is_signed_token(token):
+            claims = token_signer.decode(token)
+            if claims is None:
+                return False
+            token_signer.revocations.revoke(claims["jti"], claims["exp"])
+            await cur.execute(
+                f"""
+                WITH recorded AS (
+                    INSERT INTO token_revocations (jti, expires_at)
+                    VALUES (%s, to_timestamp(%s) AT TIME ZONE 'UTC') RETURNING id
+                )
+                SELECT pg_notify('{REVOCATION_CHANNEL}', id::text) FROM recorded
+                """,
+                (claims["jti"], claims["exp"]),
+            )
+            await conn.commit()
+            return True
+        await cur.execute(
+            f"""
+            WITH deleted AS (
+                DELETE FROM tokens WHERE token = %s RETURNING token, expires_at
+            ), recorded AS (
+                INSERT INTO token_revocations (token, expires_at)
+                SELECT token, expires_at FROM deleted RETURNING id
+            )
+            SELECT pg_notify('{REVOCATION_CHANNEL}', id::text) FROM recorded
+            """,
+            (token,),
+        )
+        await conn.commit()
+        return cur.rowcount > 0
 
 
-def create_user(conn, username: str, password: str, email: str = None) -> int:
+async def load_revocations(conn, ids: list[int] | None = None) -> list[dict]:
+    """Unexpired token_revocations rows, all of them or just ids.
+
+    Times are returned as unix seconds.
+    """
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(
+            """
+            SELECT id, token, jti, user_id,
+                   extract(epoch FROM revoked_at)::bigint AS revoked_at,
+                   extract(epoch FROM expires_at)::bigint AS expires_at
+            FROM token_revocations
+            WHERE expires_at > CURRENT_TIMESTAMP AT TIME ZONE 'UTC'
+              AND (%s::bigint[] IS NULL OR id = ANY(%s::bigint[]))
+            ORDER BY id
+            """,
+            (ids, ids),
+        )
+        return await cur.fetchall()
+
+
+def apply_revocation(row: dict):
+    """Forget the token(s) a token_revocations row revokes in this worker."""
+    if row["token"] is not None:
+        token_cache.invalidate(row["token"])
+    if row["jti"] is not None:
+        token_signer.revocations.revoke(row["jti"], row["expires_at"])
+    if row["user_id"] is not None:
+        user_id = row["user_id"]
+        token_cache.invalidate_where(lambda user: user["id"] == user_id)
+        token_signer.revocations.revoke_user(user_id, until=row["expires_at"], revoked_at=row["revoked_at"])
+
+
+async def delete_expired_tokens(conn, batch_size: int) -> int:
+    """Delete up to batch_size expired tokens, oldest first, and commit.
+
+    Rows another session has locked are skipped rather than waited on, so
+    several processes can sweep at once.
+
+    Returns:
+        The number of tokens deleted.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            DELETE FROM tokens WHERE id IN (
+                SELECT id FROM tokens
+                WHERE expires_at < CURRENT_TIMESTAMP
+                ORDER BY expires_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            """,
+            (batch_size,),
+        )
+        await conn.commit()
+        return cur.rowcount
+
+
+async def delete_expired_revocations(conn) -> int:
+    """Delete token_revocations rows whose tokens have expired, and commit.
+
+    Returns:
+        The number of rows deleted.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "DELETE FROM token_revocations WHERE expires_at < CURRENT_TIMESTAMP AT TIME ZONE 'UTC'"
+        )
+        await conn.commit()
+        return cur.rowcount
+
+
+async def create_user(db, username: str, password: str, email: str = None) -> int:
     """Create a new user in the database.
 
+    The password is hashed in the shared hashing pool, off the event loop.
+    Takes the DatabaseManager rather than a connection so that no pooled
+    connection is held while bcrypt runs.
+
     Args:
-        conn: Database connection object.
+        db: DatabaseManager to borrow a connection from.
         username: Unique username.
         password: Plain text password (will be hashed).
         email: Optional email.
@@ -94,86 +296,113 @@ def create_user(conn, username: str, password: str, email: str = None) -> int:
         The new user's ID.
 
     Raises:
+        HashingPoolFull if the hashing pool is saturated.
         Exception if username already exists or other DB error.
     """
-    hashed, salt = hash_password(password)
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "INSERT INTO users (username, password_hash, password_salt, email) VALUES (%s, %s, %s, %s) RETURNING id",
-            (username, hashed, salt, email)
-        )
-        result = cur.fetchone()
-        conn.commit()
-        return result['id'] if result else None
-
-
-def authenticate_user(conn, username: str, password: str) -> dict:
+    hashed, salt = await hashing_pool.run(hash_password, password)
+    async with db.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                "INSERT INTO users (username, password_hash, password_salt, email) VALUES (%s, %s, %s, %s) RETURNING id",
+                (username, hashed, salt, email)
+            )
+            result = await cur.fetchone()
+            await conn.commit()
+            return result['id'] if result else None
+
+
+async def authenticate_user(db, username: str, password: str) -> dict:
     """Authenticate a user by username and password.
 
+    The bcrypt check runs in the shared hashing pool, off the event loop,
+    after the connection used for the lookup is back in the pool.
+
     Args:
-        conn: Database connection object.
+        db: DatabaseManager to borrow a connection from.
         username: Username to check.
         password: Plain text password.
 
     Returns:
         User dict if authenticated, else None.
-    """
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "SELECT id, username, password_hash, email FROM users WHERE username = %s",
-            (username,)
-        )
-        user = cur.fetchone()
-        if user and verify_password(password, user['password_hash']):
-            # Remove password_hash from response
-            user.pop('password_hash', None)
-            return user
-        return None
 
-
-def get_user_by_id(conn, user_id: int) -> dict:
+    Raises:
+        HashingPoolFull if the hashing pool is saturated.
+    """
+    async with db.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                "SELECT id, username, password_hash, email FROM users WHERE username = %s",
+                (username,)
+            )
+            user = await cur.fetchone()
+    if user and await hashing_pool.run(verify_password, password, user['password_hash']):
+        # Remove password_hash from response
+        user.pop('password_hash', None)
+        return user
+    return None
+
+
+async def get_user_by_id(conn, user_id: int) -> dict:
     """Get user details by ID.
 
     Args:
-        conn: Database connection object.
+        conn: Async database connection.
         user_id: User ID.
 
     Returns:
         User dict or None.
     """
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT id, username, email FROM users WHERE id = %s", (user_id,))
-        return cur.fetchone()
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute("SELECT id, username, email FROM users WHERE id = %s", (user_id,))
+        return await cur.fetchone()
 
 
-def update_user_email(conn, user_id: int, new_email: str) -> bool:
+async def update_user_email(conn, user_id: int, new_email: str) -> bool:
     """Update a user's email.
 
     Args:
-        conn: Database connection object.
+        conn: Async database connection.
         user_id: User ID.
         new_email: New email address.
 
     Returns:
         True if updated, False otherwise.
     """
-    with conn.cursor() as cur:
-        cur.execute("UPDATE users SET email = %s WHERE id = %s", (new_email, user_id))
-        conn.commit()
+    async with conn.cursor() as cur:
+        await cur.execute("UPDATE users SET email = %s WHERE id = %s", (new_email, user_id))
+        await conn.commit()
         return cur.rowcount > 0
 
 
-def delete_user(conn, user_id: int) -> bool:
+async def delete_user(conn, user_id: int) -> bool:
     """Delete a user by ID.
 
     Args:
-        conn: Database connection object.
+        conn: Async database connection.
         user_id: User ID.
 
     Returns:
         True if deleted, False otherwise.
     """
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
-        conn.commit()
-        return cur.rowcount > 0
\ No newline at end of file
+    ttl_minutes = AUTH_CONFIG["TOKEN_TTL_MINUTES"]
+    async with conn.cursor() as cur:
+        await cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        deleted = cur.rowcount > 0
+        # Tokens go with the user (ON DELETE CASCADE); every worker also has
+        # to forget cached and signed ones, which may live up to ttl_minutes
+        await cur.execute(
+            f"""
+            WITH recorded AS (
+                INSERT INTO token_revocations (user_id, expires_at)
+                VALUES (%s, CURRENT_TIMESTAMP AT TIME ZONE 'UTC' + make_interval(mins => %s))
+                RETURNING id
+            )
+            SELECT pg_notify('{REVOCATION_CHANNEL}', id::text) FROM recorded
+            """,
+            (user_id, ttl_minutes),
+        )
+        await conn.commit()
+    token_cache.invalidate_where(lambda user: user["id"] == user_id)
+    token_signer.revocations.revoke_user(user_id, until=int(time.time()) + ttl_minutes * 60)
+    return deleted
+
@@ -0,0 +1,95 @@
+"""Small in-process caches.
+
+TTLCache is a bounded LRU whose entries also expire. It is thread-safe so it
+can be shared between the event loop and worker threads, and it keeps
+hit/miss/eviction counters for monitoring.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl_seconds: float | None = None):
+        """
+        Args:
+            maxsize: Maximum number of entries; least recently used go first.
+            ttl_seconds: Default lifetime of an entry, or None for no expiry.
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, deadline = entry
+                if deadline is None or deadline > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: float | None = None):
+        """Cache value under key.
+
+        Args:
+            ttl_seconds: Lifetime for this entry. It is capped by the cache's
+                default TTL, so callers can only shorten it (e.g. to honour a
+                token's own expiry). Non-positive values skip caching.
+        """
+        ttl = self.ttl_seconds
+        if ttl_seconds is not None:
+            ttl = ttl_seconds if ttl is None else min(ttl, ttl_seconds)
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+        deadline = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop key from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate; returns the count."""
+        with self._lock:
+            stale = [k for k, (value, _) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Return a snapshot of size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,88 @@
+"""Bounded worker pool for password hashing.
+
+bcrypt is deliberately slow (hundreds of milliseconds per call), so running it
+inside an async route freezes the whole event loop. Calls are dispatched to a
+thread or process pool instead. The pool only admits `workers + queue_size`
+calls at a time; anything beyond that is rejected with HashingPoolFull so a
+login storm turns into fast 503s instead of an unbounded backlog.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from backend.constants import AUTH_CONFIG
+
+
+class HashingPoolFull(RuntimeError):
+    """Raised when the hashing pool and its queue are both full."""
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported hashing executor: {kind}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.kind = kind
+        self._executor: Executor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of calls running or waiting at once."""
+        return self.workers + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        """Number of calls currently running or queued."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hashing"
+                    )
+            return self._executor
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool and return its result.
+
+        With zero workers the call runs inline on the event loop, which is
+        only useful for benchmarking the difference.
+
+        Raises:
+            HashingPoolFull: if the pool has no room for another call.
+        """
+        if self.workers <= 0:
+            return fn(*args)
+
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise HashingPoolFull("Password hashing pool is full")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        """Stop the underlying executor; it is recreated on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+hashing_pool = HashingPool(
+    workers=AUTH_CONFIG["HASH_WORKERS"],
+    queue_size=AUTH_CONFIG["HASH_QUEUE_SIZE"],
+    kind=AUTH_CONFIG["HASH_EXECUTOR"],
+)
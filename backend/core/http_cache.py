@@ -0,0 +1,58 @@
+"""Conditional GET helpers (RFC 9110 section 13)."""
+
+from email.utils import parsedate_to_datetime
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+# For content that never changes at its URL (content-addressed files).
+# Private because everything served this way belongs to one user.
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches etag.
+
+    Uses weak comparison, as If-None-Match requires: W/"x" matches "x".
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def not_modified(headers: Headers, etag: str, last_modified: float | None = None) -> bool:
+    """Whether a GET with these request headers can be answered with 304.
+
+    If-None-Match wins when present; If-Modified-Since is only consulted
+    without it, and compared at the one-second resolution of HTTP dates.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+
+class ContentFileResponse(FileResponse):
+    """FileResponse that honours If-Range against the ETag it was given.
+
+    Starlette only accepts If-Range values matching the ETag it derives from
+    mtime and size, so a client resuming with our content-hash ETag would
+    get the whole file back. A strong match is let through to the range
+    handling by dropping the already-checked If-Range header.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if_range = Headers(scope=scope).get("if-range")
+        if if_range is not None and if_range == self.headers.get("etag"):
+            scope = {**scope, "headers": [(k, v) for k, v in scope["headers"] if k != b"if-range"]}
+        await super().__call__(scope, receive, send)
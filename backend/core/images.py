@@ -0,0 +1,38 @@
+"""SQL helpers for the images table.
+
+These take a cursor rather than a connection so callers decide the
+transaction boundary (e.g. a batch row plus all of its images in one commit).
+"""
+
+# Rows per INSERT statement; keeps bind parameters far below Postgres' 65535 cap.
+INSERT_PAGE_SIZE = 1000
+
+
+async def insert_images(cur, user_id: int, stored_files, batch_id: int | None = None) -> list[int]:
+    """Insert one images row per stored file using multi-row INSERTs.
+
+    Args:
+        cur: Database cursor; the caller commits.
+        user_id: Owner of the images.
+        stored_files: StoredFile objects, in page order.
+        batch_id: Optional image_batches id for every row.
+
+    Returns:
+        The new image ids, in the same order as stored_files.
+    """
+    ids = []
+    stored_files = list(stored_files)
+    for start in range(0, len(stored_files), INSERT_PAGE_SIZE):
+        page = stored_files[start:start + INSERT_PAGE_SIZE]
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(page))
+        params = []
+        for stored in page:
+            params.extend((user_id, str(stored.path), stored.content_hash, batch_id))
+        await cur.execute(
+            f"INSERT INTO images (user_id, file_path, content_hash, batch_id) VALUES {values} RETURNING id",
+            params,
+        )
+        # RETURNING order is not guaranteed, but serial ids are drawn in VALUES
+        # order within one statement, so sorting restores input order.
+        ids.extend(sorted(row[0] for row in await cur.fetchall()))
+    return ids
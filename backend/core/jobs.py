@@ -0,0 +1,296 @@
+"""Background transcription jobs.
+
+Turning a notebook into LaTeX takes tens of seconds of model time, far longer
+than a request should stay open. Clients instead submit a job, which is
+persisted in the transcription_jobs table and queued in memory; a fixed number
+of worker tasks pick jobs up, shrink the pages, call the model (unless the
+transcription cache already has the answer) and store the result in
+tex_codes. Model calls from all workers and routes also share the global
+limits in core/agent. Status and result reads only touch the table, so they are
+cheap and survive restarts.
+
+Job lifecycle: queued -> running -> done | failed.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from psycopg.rows import dict_row
+
+from backend.constants import JOB_CONFIG
+from backend.core import transcriptions
+from backend.core.agent import generate_latex_from_images
+from backend.core.preprocess import image_preprocessor
+from backend.core.workers import worker_share
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when no more jobs can be queued."""
+
+
+async def create_job(conn, user_id: int, image_ids: list[int], paths: list[str], warning: str | None = None) -> int:
+    """Persist a new queued job and return its ID."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            INSERT INTO transcription_jobs (user_id, status, image_ids, file_paths, warning)
+            VALUES (%s, %s, %s, %s, %s) RETURNING id
+            """,
+            (user_id, QUEUED, image_ids, paths, warning),
+        )
+        row = await cur.fetchone()
+        await conn.commit()
+    return row[0]
+
+
+async def get_job(conn, job_id: int, user_id: int) -> dict | None:
+    """Fetch a job owned by user_id, including its LaTeX once done."""
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(
+            """
+            SELECT j.id, j.status, j.image_ids, j.warning, j.error,
+                   j.created_at, j.started_at, j.finished_at, t.code
+            FROM transcription_jobs j
+            LEFT JOIN tex_codes t ON t.id = j.tex_code_id
+            WHERE j.id = %s AND j.user_id = %s
+            """,
+            (job_id, user_id),
+        )
+        return await cur.fetchone()
+
+
+async def fail_job(conn, job_id: int, error: str):
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            UPDATE transcription_jobs
+            SET status = %s, error = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            """,
+            (FAILED, error, job_id),
+        )
+        await conn.commit()
+
+
+class JobQueue:
+    def __init__(self, transcribe: Callable[[list[str]], Awaitable[str]], workers: int, queue_size: int):
+        """
+        Args:
+            transcribe: Coroutine function turning ordered image paths into LaTeX.
+            workers: Number of jobs transcribed at once.
+            queue_size: Jobs allowed to wait in memory for a worker.
+        """
+        self.transcribe = transcribe
+        self.workers = workers
+        self.queue_size = queue_size
+        self.db = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Worker task -> the job it is running
+        self._busy: dict[asyncio.Task, int] = {}
+        self._draining = False
+        # While queued jobs may be left in the table because the queue was
+        # full when they were loaded: the highest job id loaded so far
+        self._backlog_after: int | None = None
+        self._refill_lock: asyncio.Lock | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, db, stale_seconds: float = JOB_CONFIG["STALE_SECONDS"]):
+        """Start the workers and requeue jobs a previous process left behind."""
+        self.db = db
+        self._draining = False
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._refill_lock = asyncio.Lock()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"transcription-worker-{i}")
+            for i in range(self.workers)
+        ]
+        async with db.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE transcription_jobs SET status = %s, started_at = NULL
+                    WHERE status = %s AND started_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                    """,
+                    (QUEUED, RUNNING, stale_seconds),
+                )
+        self._backlog_after = 0
+        loaded = await self._refill()
+        if loaded:
+            logger.info("Requeued %d unfinished transcription jobs", loaded)
+
+    async def _refill(self) -> int:
+        """Move queued jobs from the table into the free queue slots.
+
+        Only does anything while a backlog may be left in the table; the
+        workers call it whenever they empty the queue.
+
+        Returns:
+            The number of jobs queued.
+        """
+        async with self._refill_lock:
+            room = self._queue.maxsize - self._queue.qsize()
+            if self._backlog_after is None or room <= 0:
+                return 0
+            async with self.db.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "SELECT id FROM transcription_jobs WHERE status = %s AND id > %s ORDER BY id LIMIT %s",
+                        (QUEUED, self._backlog_after, room),
+                    )
+                    pending = [row[0] for row in await cur.fetchall()]
+            queued = 0
+            for job_id in pending:
+                try:
+                    self._queue.put_nowait(job_id)
+                except asyncio.QueueFull:
+                    # Submissions took the room meanwhile; the rest wait
+                    break
+                self._backlog_after = job_id
+                queued += 1
+            if queued == len(pending) < room:
+                self._backlog_after = None
+            return queued
+
+    def submit(self, job_id: int):
+        """Queue a persisted job for a worker.
+
+        Raises:
+            JobQueueFull: if the queue is full or the workers are not running.
+        """
+        if self._queue is None or self._draining:
+            raise JobQueueFull("Transcription workers are not running")
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            raise JobQueueFull("Transcription queue is full") from None
+
+    async def _worker(self):
+        task = asyncio.current_task()
+        while not self._draining:
+            job_id = await self._queue.get()
+            self._busy[task] = job_id
+            try:
+                if self._queue.empty() and self._backlog_after is not None:
+                    try:
+                        await self._refill()
+                    except Exception:
+                        logger.exception("Could not load queued transcription jobs; retrying after the next job")
+                await self._process(job_id)
+            except Exception:
+                logger.exception("Transcription job %s crashed", job_id)
+            finally:
+                del self._busy[task]
+                self._queue.task_done()
+
+    async def _process(self, job_id: int):
+        # Claim the job; the status check keeps another process from running it too
+        async with self.db.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE transcription_jobs SET status = %s, started_at = CURRENT_TIMESTAMP
+                    WHERE id = %s AND status = %s
+                    RETURNING user_id, file_paths
+                    """,
+                    (RUNNING, job_id, QUEUED),
+                )
+                row = await cur.fetchone()
+        if row is None:
+            return
+        user_id, paths = row
+
+        # From here on any error (model, files or the DB) fails the job, so
+        # it never stays "running" until it goes stale
+        try:
+            await self._run(job_id, user_id, paths)
+        except Exception as exc:
+            logger.warning("Transcription job %s failed: %s", job_id, exc)
+            try:
+                async with self.db.connection() as conn:
+                    await fail_job(conn, job_id, str(exc) or type(exc).__name__)
+            except Exception:
+                logger.exception("Could not mark job %s failed; it is requeued once stale", job_id)
+
+    async def _run(self, job_id: int, user_id: int, paths: list[str]):
+        key = await transcriptions.transcription_key_for(paths, image_preprocessor.variant)
+        async with self.db.connection() as conn:
+            latex = await transcriptions.lookup(conn, key)
+        if latex is None:
+            pages = await image_preprocessor.prepare(list(paths))
+            latex = await self.transcribe(pages)
+
+        async with self.db.connection() as conn:
+            tex_code_id = await transcriptions.store(conn, user_id, key, latex)
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    UPDATE transcription_jobs
+                    SET status = %s, tex_code_id = %s, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                    """,
+                    (DONE, tex_code_id, job_id),
+                )
+            await conn.commit()
+
+    async def drain(self, timeout: float = JOB_CONFIG["DRAIN_SECONDS"]):
+        """Stop taking jobs and give the running ones up to timeout seconds.
+
+        Idle workers exit at once; jobs waiting in memory are still queued in
+        the table, so the next start() (in any process) picks them up. Jobs
+        still running after timeout are cancelled and marked queued again
+        rather than left to go stale.
+        """
+        self._draining = True
+        busy = dict(self._busy)
+        for task in self._tasks:
+            if task not in busy:
+                task.cancel()
+        if busy:
+            logger.info("Waiting up to %.0fs for %d running transcription jobs", timeout, len(busy))
+            _done, pending = await asyncio.wait(busy, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            unfinished = [busy[task] for task in pending]
+            if unfinished:
+                await self._requeue(unfinished)
+        await self.stop()
+
+    async def _requeue(self, job_ids: list[int]):
+        try:
+            async with self.db.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "UPDATE transcription_jobs SET status = %s, started_at = NULL WHERE id = ANY(%s) AND status = %s",
+                        (QUEUED, job_ids, RUNNING),
+                    )
+                await conn.commit()
+        except Exception:
+            logger.exception("Could not requeue interrupted jobs %s; they are retried once stale", job_ids)
+        else:
+            logger.info("Requeued interrupted transcription jobs %s", job_ids)
+
+    async def stop(self):
+        """Cancel the workers. Jobs they were running stay "running" and are
+        requeued by a later start() once stale; drain() avoids that."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+
+job_queue = JobQueue(
+    transcribe=generate_latex_from_images,
+    workers=worker_share(JOB_CONFIG["WORKERS"], "JOB_WORKERS"),
+    queue_size=JOB_CONFIG["QUEUE_SIZE"],
+)
@@ -0,0 +1,112 @@
+"""Merge LaTeX documents transcribed chunk by chunk into one document.
+
+Each chunk of pages comes back from the model as a complete document with its
+own preamble. merge_documents keeps one \\documentclass, loads every package
+once (options from all chunks combined), keeps the first definition of each
+command/environment/theorem so nothing is defined twice, and concatenates the
+bodies in chunk order.
+"""
+
+import re
+
+BEGIN_DOCUMENT = r"\begin{document}"
+END_DOCUMENT = r"\end{document}"
+DEFAULT_CLASS = r"\documentclass{article}"
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*\n|\n\s*```\s*$")
+_DOCUMENTCLASS = re.compile(r"^\s*\\documentclass\b")
+_USEPACKAGE = re.compile(r"^\s*\\usepackage\s*(?:\[([^\]]*)\])?\s*\{([^}]*)\}\s*$")
+_DEFINITION = re.compile(
+    r"^\s*\\(newcommand|renewcommand|providecommand|DeclareMathOperator|newenvironment|newtheorem)\*?"
+    r"\s*\{?\s*\\?([A-Za-z@]+)"
+)
+_SINGLETON = re.compile(r"^\s*\\(title|author|date)\b")
+
+
+def strip_fences(text: str) -> str:
+    """Remove a markdown code fence the model sometimes wraps output in."""
+    return _FENCE.sub("", text.strip())
+
+
+def split_document(text: str) -> tuple[str, str]:
+    """Split LaTeX source into (preamble, body).
+
+    Text without \\begin{document} is treated as body only.
+    """
+    text = strip_fences(text)
+    begin = text.find(BEGIN_DOCUMENT)
+    if begin < 0:
+        return "", text.strip()
+    end = text.rfind(END_DOCUMENT)
+    body = text[begin + len(BEGIN_DOCUMENT):end if end > begin else None]
+    return text[:begin], body.strip()
+
+
+def _preamble_statements(preamble: str) -> list[str]:
+    # Group lines until braces balance so multi-line definitions stay whole
+    statements, current, depth = [], [], 0
+    for line in preamble.splitlines():
+        code = re.sub(r"(?<!\\)%.*", "", line)
+        if not current and not code.strip():
+            continue
+        current.append(line)
+        depth += code.count("{") - code.count("}")
+        if depth <= 0:
+            statements.append("\n".join(current).strip())
+            current, depth = [], 0
+    if current:
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def merge_documents(documents: list[str], labels: list[str] | None = None) -> str:
+    """Merge complete (or body-only) LaTeX documents into one.
+
+    Args:
+        documents: LaTeX sources in page order.
+        labels: Optional comment placed before each document's body.
+
+    Returns:
+        A single compilable document.
+    """
+    documentclass = None
+    packages: dict[str, list[str]] = {}
+    # Everything else, first occurrence wins, in original order (so e.g.
+    # \theoremstyle still precedes the \newtheorem it applies to)
+    statements: dict[tuple[str, str], str] = {}
+    bodies = []
+
+    for i, document in enumerate(documents):
+        preamble, body = split_document(document)
+        for statement in _preamble_statements(preamble):
+            if _DOCUMENTCLASS.match(statement):
+                documentclass = documentclass or statement
+            elif match := _USEPACKAGE.match(statement):
+                options = [o.strip() for o in (match.group(1) or "").split(",") if o.strip()]
+                for name in (n.strip() for n in match.group(2).split(",")):
+                    if name:
+                        merged = packages.setdefault(name, [])
+                        merged.extend(o for o in options if o not in merged)
+            elif match := _DEFINITION.match(statement):
+                # Theorems are environments; everything else defines a command
+                kind = "env" if match.group(1) in ("newenvironment", "newtheorem") else "cmd"
+                statements.setdefault((kind, match.group(2)), statement)
+            elif match := _SINGLETON.match(statement):
+                statements.setdefault(("meta", match.group(1)), statement)
+            else:
+                statements.setdefault(("line", statement), statement)
+        if i > 0:
+            body = re.sub(r"^\s*\\maketitle\s*$", "", body, flags=re.MULTILINE).strip()
+        if labels:
+            body = f"% {labels[i]}\n{body}"
+        bodies.append(body)
+
+    lines = [documentclass or DEFAULT_CLASS]
+    for name, options in packages.items():
+        lines.append(f"\\usepackage[{','.join(options)}]{{{name}}}" if options else f"\\usepackage{{{name}}}")
+    lines.extend(statements.values())
+    lines.append("")
+    lines.append(BEGIN_DOCUMENT)
+    lines.append("\n\n".join(bodies))
+    lines.append(END_DOCUMENT)
+    return "\n".join(lines) + "\n"
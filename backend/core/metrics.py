@@ -0,0 +1,197 @@
+"""In-process metric primitives.
+
+Histogram keeps cumulative bucket counts plus a running sum and count, the
+same shape Prometheus uses, so snapshots can be exported as-is or reduced to
+quick summaries for health/debug endpoints. Counter and LabeledHistogram add
+labels, and Registry renders everything in the Prometheus text format for
+/metrics. All of them are thread-safe; updates take one short lock.
+"""
+
+import bisect
+import threading
+
+# Seconds; spans sub-millisecond pool hits up to pool-timeout stalls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Sorted upper bounds; an implicit +Inf bucket is added.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+            self._max = max(self._max, value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts keyed by upper bound, plus sum/count/max."""
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + (float("inf"),), self._counts):
+                running += n
+                cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+            return {
+                "buckets": cumulative,
+                "sum": round(self._sum, 6),
+                "count": self._count,
+                "max": round(self._max, 6),
+            }
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(total)}")
+        return lines
+
+
+class LabeledHistogram:
+    """One Histogram per combination of label values."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children: dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues) -> Histogram:
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(render_histogram(self.name, child.snapshot(), self.labelnames, values))
+        return lines
+
+
+def render_histogram(name: str, snapshot: dict, labelnames=(), labelvalues=()) -> list[str]:
+    """Exposition lines for a Histogram.snapshot()."""
+    lines = []
+    for bound, count in snapshot["buckets"].items():
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {count}")
+    labels = _format_labels(labelnames, labelvalues)
+    lines.append(f"{name}_sum{labels} {_format_value(float(snapshot['sum']))}")
+    lines.append(f"{name}_count{labels} {snapshot['count']}")
+    return lines
+
+
+class Registry:
+    """Metrics exported together in the Prometheus text format.
+
+    Counters and histograms are updated as things happen; callbacks are
+    evaluated at scrape time for values some other object already tracks
+    (e.g. pool occupancy), so they cost nothing between scrapes.
+    """
+
+    def __init__(self):
+        self._renderers: list = []
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._renderers.append(metric.render)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> LabeledHistogram:
+        metric = LabeledHistogram(name, help, labelnames, buckets)
+        self._renderers.append(metric.render)
+        return metric
+
+    def callback(self, name: str, kind: str, help: str, fn):
+        """Export fn()'s value at scrape time.
+
+        kind is "gauge" or "counter" (fn returns a number) or "histogram"
+        (fn returns a Histogram). Nothing is exported while fn returns None.
+        """
+        def render() -> list[str]:
+            value = fn()
+            if value is None:
+                return []
+            lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            if kind == "histogram":
+                return lines + render_histogram(name, value.snapshot())
+            return lines + [f"{name} {_format_value(value)}"]
+        self._renderers.append(render)
+
+    def cache(self, prefix: str, what: str, stats):
+        """Export a cache's stats() (see TTLCache) as <prefix>_* metrics.
+
+        stats is called at scrape time, like any callback.
+        """
+        for key, kind, help in (
+            ("size", "gauge", f"{what} currently cached."),
+            ("maxsize", "gauge", f"Most {what} the cache holds."),
+            ("hits", "counter", f"Lookups that found cached {what}."),
+            ("misses", "counter", f"Lookups that found no cached {what}."),
+            ("evictions", "counter", f"Cached {what} dropped to make room."),
+        ):
+            suffix = "_total" if kind == "counter" else ""
+            self.callback(f"{prefix}_{key}{suffix}", kind, help, lambda key=key: stats()[key])
+
+    def render(self) -> str:
+        lines = []
+        for render in self._renderers:
+            lines.extend(render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served at /metrics
+registry = Registry()
@@ -0,0 +1,31 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor records the sort key of the last row on a page, here
+(uploaded_at, id), so the next page can start with
+``WHERE (uploaded_at, id) < (%s, %s)`` and walk the index straight to it,
+however deep it is, instead of counting past OFFSET rows.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+
+def encode_cursor(uploaded_at: datetime, row_id: int) -> str:
+    """Encode the sort key of a row into a URL-safe cursor string."""
+    raw = f"{uploaded_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor from encode_cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        uploaded_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(uploaded_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
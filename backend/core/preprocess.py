@@ -0,0 +1,155 @@
+"""Shrink page images before they are sent to the model.
+
+Phone photos are typically 12+ megapixels and 5-12 MB each, far more detail
+than handwriting recognition needs, and every byte is uploaded inline with
+the request. Each page is EXIF-rotated, downscaled so its long side is at most
+max_dimension, optionally converted to grayscale and re-encoded as JPEG.
+
+The work is CPU-bound, so it runs in a process pool. Derivatives are stored
+next to the originals' hash:
+
+    <cache_dir>/ab/cd/<source sha256>-<settings tag>.jpg
+
+so each page is only processed once per settings combination and changing
+the settings never serves a stale derivative.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from backend.constants import PREPROCESS_CONFIG
+from backend.core.storage import content_path, file_content_hash
+from backend.core.timing import PREPROCESS, phase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PreprocessSettings:
+    max_dimension: int
+    grayscale: bool
+    quality: int
+
+    @property
+    def tag(self) -> str:
+        """Short name for these settings, used in file names and cache keys."""
+        return f"{self.max_dimension}{'g' if self.grayscale else 'c'}q{self.quality}"
+
+
+def preprocess_image(src: str, cache_dir: str, settings: PreprocessSettings) -> str:
+    """Return the path of the preprocessed derivative of src, creating it if needed."""
+    source_hash = file_content_hash(Path(src))
+    if source_hash is None:
+        raise FileNotFoundError(src)
+    dest = content_path(Path(cache_dir), source_hash, f"-{settings.tag}.jpg")
+    if dest.exists():
+        return str(dest)
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > settings.max_dimension:
+            img.thumbnail((settings.max_dimension, settings.max_dimension), Image.Resampling.LANCZOS)
+        img = img.convert("L" if settings.grayscale else "RGB")
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=".derive-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                img.save(out, format="JPEG", quality=settings.quality, optimize=True)
+            os.replace(tmp_name, dest)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    return str(dest)
+
+
+class ImagePreprocessor:
+    def __init__(self, settings: PreprocessSettings, cache_dir: str, workers: int, enabled: bool = True):
+        """
+        Args:
+            settings: Resize/encode settings applied to every page.
+            cache_dir: Root of the on-disk derivative cache.
+            workers: Worker processes; 0 processes inline (tests, benchmarks).
+            enabled: When False, prepare() returns the paths unchanged.
+        """
+        self.settings = settings
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.enabled = enabled
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def variant(self) -> str:
+        """Identifies the preprocessing applied, for transcription cache keys."""
+        return self.settings.tag if self.enabled else ""
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    async def derive(self, path) -> str:
+        """Path of the derivative of one image, creating it in the pool if needed."""
+        if self.workers <= 0:
+            return preprocess_image(str(path), self.cache_dir, self.settings)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), preprocess_image, str(path), self.cache_dir, self.settings
+        )
+
+    def warm(self, paths: list):
+        """Start deriving paths in the background without waiting for them."""
+        for path in paths:
+            task = asyncio.create_task(self.derive(path))
+            self._background.add(task)
+            task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background derivative failed: %s", task.exception())
+
+    async def _prepare_one(self, path):
+        try:
+            return await self.derive(path)
+        except Exception as exc:
+            # Send the original rather than fail the whole transcription
+            logger.warning("Preprocessing %s failed, sending original: %s", path, exc)
+            return path
+
+    async def prepare(self, paths: list) -> list:
+        """Preprocessed paths for the given pages, in the same order."""
+        if not self.enabled:
+            return list(paths)
+        with phase(PREPROCESS):
+            return list(await asyncio.gather(*(self._prepare_one(p) for p in paths)))
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes; they are restarted on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+image_preprocessor = ImagePreprocessor(
+    PreprocessSettings(
+        max_dimension=PREPROCESS_CONFIG["MAX_DIMENSION"],
+        grayscale=PREPROCESS_CONFIG["GRAYSCALE"],
+        quality=PREPROCESS_CONFIG["QUALITY"],
+    ),
+    cache_dir=PREPROCESS_CONFIG["CACHE_DIR"],
+    workers=PREPROCESS_CONFIG["WORKERS"],
+    enabled=PREPROCESS_CONFIG["ENABLED"],
+)
@@ -0,0 +1,63 @@
+"""A small sampling profiler for capturing one request.
+
+A background thread snapshots the event-loop thread's Python stack every
+interval seconds and counts identical stacks. The result is written in the
+"folded" format (``outer;inner;leaf count`` per line) that flamegraph.pl,
+speedscope and inferno all read.
+
+Everything on the event loop is sampled, so requests running at the same
+time show up as well; capture on a quiet instance for a clean picture. Work
+handed to thread or process pools appears only as the await waiting for it.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+def _folded_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        Args:
+            thread_id: Thread to sample (the event loop's).
+            interval: Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_folded_stack(frame)] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, directory: Path, name: str) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{name}.folded"
+        path.write_text(self.folded(), encoding="utf-8")
+        return path
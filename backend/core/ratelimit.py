@@ -0,0 +1,94 @@
+"""Concurrency and rate limits for outbound model calls.
+
+The model API enforces a requests-per-minute quota and answers bursts over
+it with 429s. ModelLimiter combines a cap on calls in flight with a token
+bucket refilled at the quota rate, so callers wait their turn locally instead
+of being rejected remotely.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int | None = None):
+        """
+        Args:
+            rate_per_minute: Sustained rate; <= 0 disables limiting.
+            burst: Tokens that can accumulate while idle (default: one
+                second's worth); at least 1.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst if burst is not None else int(self.rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            0 on success, otherwise the seconds until one will be.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+
+class ModelLimiter:
+    def __init__(self, max_concurrency: int, requests_per_minute: float, burst: int | None = None):
+        """
+        Args:
+            max_concurrency: Calls in flight at once; <= 0 disables the cap.
+            requests_per_minute: Sustained call rate; <= 0 disables limiting.
+            burst: See TokenBucket.
+        """
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; tests and scripts may run several
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one model call slot: waits for both a free slot and a token."""
+        semaphore = self._get_semaphore() if self.max_concurrency > 0 else None
+        self.waiting += 1
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            await self.bucket.acquire()
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            if semaphore is not None:
+                semaphore.release()
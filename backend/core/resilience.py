@@ -0,0 +1,109 @@
+"""Timeouts, retries and a circuit breaker for calls to the model API.
+
+Transient failures (timeouts, dropped connections, 429/5xx) are retried with
+jittered exponential backoff. Every attempt's outcome feeds a CircuitBreaker;
+once too large a share of recent calls has failed, it opens and further calls
+fail immediately with CircuitOpen instead of each waiting out a timeout. After
+reset_seconds one trial call is let through: success closes the breaker,
+failure opens it again.
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import deque
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class ModelUnavailable(RuntimeError):
+    """The model could not be reached after retries."""
+
+
+class CircuitOpen(ModelUnavailable):
+    """The breaker is open; the call was not attempted."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model temporarily unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether exc is a transient failure worth another attempt."""
+    # The SDK is imported lazily; until it is, exc can't be one of its errors
+    genai_errors = sys.modules.get("google.genai.errors")
+    if genai_errors is not None and isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+    return isinstance(exc, (asyncio.TimeoutError, httpx.TransportError, ConnectionError))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window: int, error_rate: float, min_calls: int, reset_seconds: float):
+        """
+        Args:
+            window: Number of most recent outcomes considered.
+            error_rate: Failure share (0-1) in the window that opens the breaker.
+            min_calls: Outcomes required in the window before it can open.
+            reset_seconds: How long to fail fast before a trial call.
+        """
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpen(remaining)
+            self.state = self.HALF_OPEN
+        # Half-open: one trial call at a time
+        if self._trial_in_flight:
+            raise CircuitOpen(self.reset_seconds)
+        self._trial_in_flight = True
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            logger.info("Model circuit breaker closed")
+            self.state = self.CLOSED
+            self._outcomes.clear()
+        self._trial_in_flight = False
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        self._trial_in_flight = False
+        self._outcomes.append(False)
+        if self.state == self.HALF_OPEN or self._should_open():
+            if self.state != self.OPEN:
+                logger.warning("Model circuit breaker opened")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def _should_open(self) -> bool:
+        if self.state != self.CLOSED or len(self._outcomes) < self.min_calls:
+            return False
+        failures = self._outcomes.count(False)
+        return failures / len(self._outcomes) >= self.error_rate
+
+    def release(self):
+        """Give up a half-open trial slot without recording an outcome."""
+        self._trial_in_flight = False
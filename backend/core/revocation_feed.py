@@ -0,0 +1,92 @@
+"""Applies logouts and user deletions from every worker to this one.
+
+Each server worker keeps verified tokens in memory: the token cache for
+opaque tokens and the revocation list for signed ones. A logout handled by
+one worker records a token_revocations row and NOTIFYs its id on
+REVOCATION_CHANNEL when the transaction commits (core/authentication.py);
+this task LISTENs on its own connection and applies each announced row, so
+the token stops working in every worker within a round trip.
+
+On every (re)connect it first loads all unexpired rows, which covers
+revocations made before the worker started or while it was disconnected.
+Until that first load finishes, and while reconnecting, other workers'
+revocations may be missed for up to AUTH_TOKEN_CACHE_TTL seconds (opaque)
+or until the token expires (signed); the connection is retried with
+backoff.
+"""
+
+import asyncio
+import logging
+
+import psycopg
+
+from backend.constants import DB_CONFIG
+from backend.core.authentication import REVOCATION_CHANNEL, apply_revocation, load_revocations
+from backend.core.resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationFeed:
+    def __init__(self, retry_max_delay: float):
+        """
+        Args:
+            retry_max_delay: Longest wait between reconnection attempts.
+        """
+        self.retry_max_delay = retry_max_delay
+        self.connected = False
+        self.applied = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, conninfo: str):
+        self._task = asyncio.create_task(self._run(conninfo), name="revocation-feed")
+
+    async def _run(self, conninfo: str):
+        attempt = 0
+        while True:
+            try:
+                await self._listen(conninfo)
+            except Exception as exc:
+                if self.connected:
+                    attempt, self.connected = 0, False
+                delay = backoff_delay(attempt, 1.0, self.retry_max_delay)
+                logger.warning("Revocation feed disconnected (%s); retrying in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _listen(self, conninfo: str):
+        conn = await psycopg.AsyncConnection.connect(
+            conninfo, autocommit=True, connect_timeout=int(DB_CONFIG["CONNECT_TIMEOUT"])
+        )
+        async with conn:
+            # LISTEN first, so nothing committed after the full load is missed
+            await conn.execute(f"LISTEN {REVOCATION_CHANNEL}")
+            self._apply(await load_revocations(conn))
+            self.connected = True
+            while True:
+                # Leave the generator before querying; notifications that
+                # arrive meanwhile are kept for the next round
+                ids = [int(notify.payload) async for notify in conn.notifies(stop_after=1)]
+                self._apply(await load_revocations(conn, ids))
+
+    def _apply(self, rows: list[dict]):
+        for row in rows:
+            apply_revocation(row)
+        self.applied += len(rows)
+
+    def stats(self) -> dict:
+        return {"running": self.running, "connected": self.connected, "applied": self.applied}
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self.connected = False
+
+
+revocation_feed = RevocationFeed(retry_max_delay=DB_CONFIG["STARTUP_RETRY_MAX_DELAY"])
@@ -0,0 +1,196 @@
+"""HMAC-signed access tokens that verify without touching the database.
+
+A token is `<kid>.<payload>.<signature>`: the payload is base64url JSON claims
+(sub, usr, eml, iat, exp, jti) and the signature is HMAC-SHA256 over
+`<kid>.<payload>` with the key named by kid. Several keys may be configured so
+they can be rotated: the active key signs new tokens, every configured key is
+accepted for verification until it is removed.
+
+Revocation is handled in memory by RevocationList, which remembers revoked
+token ids (and per-user "revoked before" marks) only until the affected tokens
+would have expired anyway, so it stays small.
+"""
+
+import base64
+import hashlib
+import heapq
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def parse_signing_keys(spec: str) -> dict[str, bytes]:
+    """Parse "kid1:secret1,kid2:secret2" into {kid: secret_bytes}."""
+    keys = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, sep, secret = item.partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("Signing keys must look like 'kid:secret,kid2:secret2'")
+        if "." in kid:
+            raise ValueError(f"Signing key id may not contain '.': {kid}")
+        keys[kid] = secret.encode("utf-8")
+    return keys
+
+
+class RevocationList:
+    def __init__(self, maxsize: int):
+        """
+        Args:
+            maxsize: Entries (tokens plus users) expected at most. Live
+                entries are never dropped to stay under it: the list grows
+                past it instead, with a warning.
+        """
+        self.maxsize = maxsize
+        self._tokens: dict[str, int] = {}
+        self._users: dict[int, tuple[int, int]] = {}
+        # (expiry, key) in expiry order, so pruning only visits expired
+        # entries; superseded pairs are skipped when they come up
+        self._token_expiry: list[tuple[int, str]] = []
+        self._user_expiry: list[tuple[int, int]] = []
+        self._over_capacity = False
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: int):
+        """Revoke one token until its expiry (unix seconds)."""
+        with self._lock:
+            self._tokens[jti] = expires_at
+            heapq.heappush(self._token_expiry, (expires_at, jti))
+            self._check_size()
+
+    def revoke_user(self, user_id: int, until: int, revoked_at: int | None = None):
+        """Revoke every token for user_id issued up to revoked_at (default now)."""
+        with self._lock:
+            self._users[user_id] = (int(time.time()) if revoked_at is None else revoked_at, until)
+            heapq.heappush(self._user_expiry, (until, user_id))
+            self._check_size()
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims["jti"] in self._tokens:
+            return True
+        mark = self._users.get(claims["sub"])
+        return mark is not None and claims["iat"] <= mark[0]
+
+    def prune(self) -> int:
+        """Forget entries whose tokens have expired; returns the count."""
+        with self._lock:
+            return self._prune(int(time.time()))
+
+    def _check_size(self):
+        if len(self) <= self.maxsize:
+            self._over_capacity = False
+            return
+        self._prune(int(time.time()))
+        if len(self) > self.maxsize and not self._over_capacity:
+            # Dropping a live entry would make a revoked token valid again
+            logger.warning(
+                "Revocation list holds %d live entries, over its size of %d; growing",
+                len(self), self.maxsize,
+            )
+        self._over_capacity = len(self) > self.maxsize
+
+    def _prune(self, now: int) -> int:
+        removed = 0
+        while self._token_expiry and self._token_expiry[0][0] <= now:
+            exp, jti = heapq.heappop(self._token_expiry)
+            if self._tokens.get(jti) == exp:
+                del self._tokens[jti]
+                removed += 1
+        while self._user_expiry and self._user_expiry[0][0] <= now:
+            until, uid = heapq.heappop(self._user_expiry)
+            mark = self._users.get(uid)
+            if mark is not None and mark[1] == until:
+                del self._users[uid]
+                removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._users)
+
+
+class TokenSigner:
+    def __init__(self, keys: dict[str, bytes], active_kid: str, revocations: RevocationList):
+        if active_kid not in keys:
+            raise ValueError(f"Active signing key {active_kid!r} is not configured")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.revocations = revocations
+
+    def _sign(self, key: bytes, signing_input: str) -> str:
+        return _b64encode(hmac.new(key, signing_input.encode("utf-8"), hashlib.sha256).digest())
+
+    def issue(self, user: dict, ttl_seconds: int) -> str:
+        """Issue a token for user (id, username, email) valid for ttl_seconds."""
+        now = int(time.time())
+        claims = {
+            "sub": user["id"],
+            "usr": user.get("username"),
+            "eml": user.get("email"),
+            "iat": now,
+            "exp": now + ttl_seconds,
+            "jti": secrets.token_urlsafe(12),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        signing_input = f"{self.active_kid}.{payload}"
+        return f"{signing_input}.{self._sign(self.keys[self.active_kid], signing_input)}"
+
+    def decode(self, token: str) -> dict | None:
+        """Return the claims of a correctly signed, unexpired token, else None.
+
+        Revocation is not checked here; see verify().
+        """
+        try:
+            kid, payload, signature = token.split(".")
+        except ValueError:
+            return None
+        key = self.keys.get(kid)
+        if key is None:
+            return None
+        # Tokens come straight from a header and may hold any characters;
+        # compare bytes, since compare_digest rejects non-ASCII str
+        try:
+            expected = self._sign(key, f"{kid}.{payload}").encode("ascii")
+            presented = signature.encode("utf-8")
+        except UnicodeError:
+            return None
+        if not hmac.compare_digest(expected, presented):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or not isinstance(claims.get("exp"), (int, float)):
+            return None
+        if claims["exp"] <= time.time():
+            return None
+        return claims
+
+    def verify(self, token: str) -> dict | None:
+        """Return the claims of a valid, unrevoked token, else None."""
+        claims = self.decode(token)
+        if claims is None or self.revocations.is_revoked(claims):
+            return None
+        return claims
+
+    def revoke(self, token: str) -> bool:
+        """Revoke a token; returns False if it was not valid to begin with."""
+        claims = self.decode(token)
+        if claims is None:
+            return False
+        self.revocations.revoke(claims["jti"], claims["exp"])
+        return True
@@ -0,0 +1,95 @@
+"""Background bring-up of the database and the model client.
+
+The lifespan opens the pool without waiting and hands over to Startup, so
+the process accepts connections (and answers /health) within a second even
+while Postgres is still booting. Startup then applies migrations and checks
+a connection, retrying with backoff until both succeed, and only then
+starts the job workers, token reaper and revocation feed. Meanwhile it
+imports the model SDK in a worker thread so the first transcription
+doesn't pay for it.
+
+/ready reports the state; until the database is up, requests that need it
+wait on the pool like any other and may time out.
+"""
+
+import asyncio
+import importlib
+import logging
+
+from backend.constants import DB_CONFIG
+from backend.core import agent
+from backend.core.jobs import job_queue
+from backend.core.resilience import backoff_delay
+from backend.core.revocation_feed import revocation_feed
+from backend.core.token_reaper import token_reaper
+from backend.db.migrate import migrate
+
+logger = logging.getLogger(__name__)
+
+
+def _describe(exc: BaseException) -> str:
+    return str(exc) or type(exc).__name__
+
+
+class Startup:
+    def __init__(self, migrate_on_startup: bool, retry_max_delay: float):
+        """
+        Args:
+            migrate_on_startup: Apply pending migrations before going ready.
+            retry_max_delay: Longest wait between database attempts.
+        """
+        self.migrate_on_startup = migrate_on_startup
+        self.retry_max_delay = retry_max_delay
+        self.db_ready = False
+        self.db_error: str | None = None
+        self.model_ready = False
+        self.model_error: str | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, db):
+        """Bring up db (if any) and the model client in the background."""
+        if db is not None:
+            self._tasks.append(asyncio.create_task(self._bring_up_db(db), name="startup-db"))
+        self._tasks.append(asyncio.create_task(self._bring_up_model(), name="startup-model"))
+
+    async def _bring_up_db(self, db):
+        attempt = 0
+        while True:
+            try:
+                if self.migrate_on_startup:
+                    await migrate(db.conninfo)
+                await db.ping(timeout=DB_CONFIG["CONNECT_TIMEOUT"])
+                break
+            except Exception as exc:
+                self.db_error = _describe(exc)
+                delay = backoff_delay(attempt, 1.0, self.retry_max_delay)
+                logger.warning("Database not ready (%s); retrying in %.1fs", self.db_error, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+        await job_queue.start(db)
+        token_reaper.start(db)
+        revocation_feed.start(db.conninfo)
+        self.db_ready, self.db_error = True, None
+        logger.info("Database ready")
+
+    async def _bring_up_model(self):
+        try:
+            await asyncio.to_thread(importlib.import_module, "google.genai")
+            agent.get_client()
+        except Exception as exc:
+            self.model_error = _describe(exc)
+            logger.warning("Model client not ready: %s", self.model_error)
+        else:
+            self.model_ready = True
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+startup = Startup(
+    migrate_on_startup=DB_CONFIG["MIGRATE_ON_STARTUP"],
+    retry_max_delay=DB_CONFIG["STARTUP_RETRY_MAX_DELAY"],
+)
@@ -0,0 +1,175 @@
+"""Streaming, content-addressed storage for uploaded files.
+
+Uploads are copied to a temporary file in fixed-size chunks, in a worker
+thread, while their SHA-256 is computed. The file is then atomically renamed
+to a path derived from that hash:
+
+    <root>/ab/cd/abcdef...<64 hex chars><ext>
+
+Identical uploads therefore share one file on disk (later copies are simply
+discarded), different files with the same name can never overwrite each
+other, and the two levels of 256-way sharding keep every directory small even
+with millions of files. Readers never see a partially written file and memory
+use per upload is one chunk regardless of the file size.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from backend.constants import UPLOAD_CONFIG
+from backend.core.metrics import registry
+from backend.core.timing import FILE, phase
+from backend.core.workers import worker_share
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an uploaded file exceeds the configured size limit."""
+
+
+class ByteBudget:
+    """Thread-safe counter of bytes reserved against a fixed limit."""
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Bytes that may be reserved at once; <= 0 disables the limit.
+        """
+        self.limit = limit
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, n: int) -> bool:
+        """Reserve n bytes; returns False (reserving nothing) if over the limit."""
+        with self._lock:
+            if 0 < self.limit < self.in_use + n:
+                return False
+            self.in_use += n
+            return True
+
+    def release(self, n: int):
+        with self._lock:
+            self.in_use = max(0, self.in_use - n)
+
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+# Shared by every in-flight upload request in this process: its share of
+# the deployment-wide budget, but always room for one maximal request.
+upload_budget = ByteBudget(
+    worker_share(
+        UPLOAD_CONFIG["MAX_INFLIGHT_BYTES"], "UPLOAD_MAX_INFLIGHT_BYTES", minimum=UPLOAD_CONFIG["MAX_REQUEST_BYTES"]
+    )
+)
+
+upload_files = registry.counter("upload_files_total", "Files stored, by whether they were duplicates.", ("deduplicated",))
+upload_bytes = registry.counter("upload_bytes_total", "Bytes received in stored files.", ("deduplicated",))
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: Path
+    content_hash: str
+    size: int
+    deduplicated: bool
+
+
+def content_path(root: Path, content_hash: str, suffix: str) -> Path:
+    """Sharded location of a file with the given SHA-256 hex digest."""
+    return root / content_hash[:2] / content_hash[2:4] / f"{content_hash}{suffix}"
+
+
+def file_content_hash(path: Path) -> str | None:
+    """SHA-256 hex digest of the file at path, or None if it doesn't exist.
+
+    Files in the store are named after their hash, so those are not re-read.
+    """
+    path = Path(path)
+    if len(path.stem) == 64 and set(path.stem) <= _HEX_DIGITS:
+        return path.stem
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(UPLOAD_CONFIG["CHUNK_SIZE"]):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_suffix(filename: str | None) -> str:
+    """Lower-cased file extension of filename, or ".bin" if it has none."""
+    suffix = Path(filename or "").suffix.lower()
+    if not suffix[1:].isalnum() or len(suffix) > 8:
+        return ".bin"
+    return suffix
+
+
+def _stream_to_store(src, root: Path, suffix: str, max_bytes: int, chunk_size: int) -> StoredFile:
+    src.seek(0)
+    root.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=root, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(chunk_size):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"File exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        content_hash = digest.hexdigest()
+        dest = content_path(root, content_hash, suffix)
+        if dest.exists():
+            # Same bytes already stored; keep the existing copy
+            Path(tmp_name).unlink()
+            return StoredFile(dest, content_hash, written, deduplicated=True)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return StoredFile(dest, content_hash, written, deduplicated=False)
+
+
+async def store_upload(
+    file: UploadFile,
+    root: Path,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> StoredFile:
+    """Stream an uploaded file into the content-addressed store under root.
+
+    Args:
+        file: The incoming upload.
+        root: Root directory of the store.
+        max_bytes: Maximum accepted file size (default MAX_FILE_BYTES).
+        chunk_size: Bytes copied per read/write (default CHUNK_SIZE).
+
+    Returns:
+        The StoredFile (path, SHA-256 hex digest, size, whether it was
+        already present).
+
+    Raises:
+        UploadTooLarge: if the file is bigger than max_bytes. Nothing is left
+            on disk in that case.
+    """
+    with phase(FILE):
+        stored = await run_in_threadpool(
+            _stream_to_store,
+            file.file,
+            root,
+            normalize_suffix(file.filename),
+            max_bytes or UPLOAD_CONFIG["MAX_FILE_BYTES"],
+            chunk_size or UPLOAD_CONFIG["CHUNK_SIZE"],
+        )
+    deduplicated = "true" if stored.deduplicated else "false"
+    upload_files.inc(deduplicated)
+    upload_bytes.inc(deduplicated, amount=stored.size)
+    return stored
@@ -0,0 +1,26 @@
+"""Small JPEG previews of uploaded images for gallery screens.
+
+Thumbnails are derivatives like the model's preprocessed pages (see
+core/preprocess.py), just much smaller, and are stored the same way, keyed
+by the original's content hash and the thumbnail settings. Since both are
+fixed for a given image, a thumbnail never changes once made, which is what
+lets clients cache it forever under a strong ETag.
+"""
+
+from backend.constants import THUMBNAIL_CONFIG
+from backend.core.preprocess import ImagePreprocessor, PreprocessSettings
+
+thumbnailer = ImagePreprocessor(
+    PreprocessSettings(
+        max_dimension=THUMBNAIL_CONFIG["SIZE"],
+        grayscale=False,
+        quality=THUMBNAIL_CONFIG["QUALITY"],
+    ),
+    cache_dir=THUMBNAIL_CONFIG["DIR"],
+    workers=THUMBNAIL_CONFIG["WORKERS"],
+)
+
+
+def thumbnail_etag(content_hash: str) -> str:
+    """Strong ETag for the thumbnail of the image with this content hash."""
+    return f'"{content_hash}-{thumbnailer.settings.tag}"'
@@ -0,0 +1,62 @@
+"""Per-request phase timings for the Server-Timing header.
+
+ServerTimingMiddleware starts a collector for each request; code on the
+request path wraps its work in ``with phase("db"):`` and the elapsed time is
+added to that phase. Outside a request (background jobs, startup) phase()
+does nothing.
+
+Phases are sums, not a partition of the request: a phase entered from
+several concurrent tasks (e.g. chunked model calls) adds up all of them, and
+phases may nest (auth includes the db lookup behind it).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Names used across the app, in the order they are reported
+AUTH, DB, FILE, PREPROCESS, MODEL, ENCODE = "auth", "db", "file", "preprocess", "model", "encode"
+
+
+class PhaseTimings:
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, total: float | None = None) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        entries = [
+            f'{name};dur={seconds * 1000:.1f};desc="{self.counts[name]}x"'
+            for name, seconds in self.durations.items()
+        ]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[PhaseTimings | None] = ContextVar("phase_timings", default=None)
+
+
+def start_request() -> PhaseTimings:
+    """Begin collecting phases for the current request (middleware only)."""
+    timings = PhaseTimings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def phase(name: str):
+    """Add the time spent in the block to the current request's phase."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
@@ -0,0 +1,96 @@
+"""Periodic deletion of expired opaque tokens and token revocations.
+
+verify_token only rejects an expired token; it never writes. Tokens that are
+never presented again would otherwise stay in the table (and its unique
+index) forever, so this task sweeps them in bounded batches: each batch is
+its own short transaction, and the sweep yields between batches so a large
+backlog doesn't hold a pool connection or row locks for long. Revocation
+records (core/revocation_feed.py) are only needed until their token
+expires and are dropped in the same sweep.
+"""
+
+import asyncio
+import logging
+import time
+
+from backend.constants import AUTH_CONFIG
+from backend.core.authentication import delete_expired_revocations, delete_expired_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenReaper:
+    def __init__(self, interval: float, batch_size: int):
+        """
+        Args:
+            interval: Seconds between sweeps; 0 disables the reaper.
+            batch_size: Tokens deleted per transaction.
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.db = None
+        self.last_removed = 0
+        self.total_removed = 0
+        self.last_sweep_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, db):
+        if self.interval <= 0:
+            return
+        self.db = db
+        self._task = asyncio.create_task(self._run(), name="token-reaper")
+
+    async def sweep(self) -> int:
+        """Delete every currently expired token, one batch at a time.
+
+        Returns:
+            The number of tokens deleted.
+        """
+        removed = 0
+        while True:
+            async with self.db.connection() as conn:
+                deleted = await delete_expired_tokens(conn, self.batch_size)
+            removed += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(0)
+        async with self.db.connection() as conn:
+            await delete_expired_revocations(conn)
+        self.last_removed = removed
+        self.total_removed += removed
+        self.last_sweep_at = time.time()
+        if removed:
+            logger.info("Deleted %d expired tokens", removed)
+        return removed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Expired token sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "last_removed": self.last_removed,
+            "total_removed": self.total_removed,
+            "last_sweep_at": self.last_sweep_at,
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+token_reaper = TokenReaper(
+    interval=AUTH_CONFIG["TOKEN_REAP_INTERVAL"],
+    batch_size=AUTH_CONFIG["TOKEN_REAP_BATCH"],
+)
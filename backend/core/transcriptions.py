@@ -0,0 +1,113 @@
+"""Content-keyed cache of finished transcriptions.
+
+A transcription depends only on the page images (in order), how they are
+preprocessed and grouped into model calls, the prompt and the model, so the
+cache key is a SHA-256 over exactly those. Results are persisted in
+tex_codes.cache_key (indexed), which makes them shared between processes
+and restarts, and the most recent ones are also kept in an in-process LRU
+so repeats skip the query too. Editing PROMPT, switching MODEL_NAME or
+changing the preprocessing settings changes every key: old results are
+simply never looked up again.
+"""
+
+import hashlib
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.constants import AI_CONFIG
+from backend.core.agent import PROMPT
+from backend.core.cache import TTLCache
+from backend.core.metrics import registry
+from backend.core.storage import file_content_hash
+from backend.core.timing import FILE, phase
+
+# cache key -> LaTeX
+latex_cache = TTLCache(maxsize=AI_CONFIG["CACHE_SIZE"])
+registry.cache("transcription_cache", "Transcriptions", lambda: latex_cache.stats())
+
+
+def image_content_hashes(paths) -> list[str] | None:
+    """SHA-256 of each image in order, or None if any file is missing."""
+    hashes = []
+    for path in paths:
+        content_hash = file_content_hash(path)
+        if content_hash is None:
+            return None
+        hashes.append(content_hash)
+    return hashes
+
+
+def transcription_key(
+    content_hashes: list[str],
+    prompt: str = PROMPT,
+    model: str | None = None,
+    variant: str = "",
+    chunk_pages: int | None = None,
+) -> str:
+    """Cache key for transcribing these images with this prompt and model.
+
+    variant names anything else that changes what the model is sent, such
+    as the image preprocessing settings. chunk_pages is the number of pages
+    per model call (default AI_CONFIG["CHUNK_PAGES"]; 0 for one call, as
+    streaming makes).
+    """
+    digest = hashlib.sha256()
+    # Chunking changes how pages are grouped into calls, so it is part of
+    # the key; notebooks short enough for one call key the same either way
+    if chunk_pages is None:
+        chunk_pages = AI_CONFIG["CHUNK_PAGES"]
+    chunking = str(chunk_pages if 0 < chunk_pages < len(content_hashes) else 0)
+    for part in (model or AI_CONFIG["MODEL_NAME"], prompt, chunking, variant, *content_hashes):
+        digest.update(part.encode("utf-8"))
+        # Separator so ("ab", "c") and ("a", "bc") differ
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def transcription_key_for(paths, variant: str = "", chunk_pages: int | None = None) -> str | None:
+    """Cache key for the images at paths, or None if they can't be hashed."""
+    with phase(FILE):
+        hashes = await run_in_threadpool(image_content_hashes, list(paths))
+    if hashes is None:
+        return None
+    return transcription_key(hashes, variant=variant, chunk_pages=chunk_pages)
+
+
+async def lookup(conn, key: str | None) -> str | None:
+    """Cached LaTeX for key, from memory or tex_codes."""
+    if key is None:
+        return None
+    latex = latex_cache.get(key)
+    if latex is not None:
+        return latex
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "SELECT code FROM tex_codes WHERE cache_key = %s ORDER BY id DESC LIMIT 1",
+            (key,),
+        )
+        row = await cur.fetchone()
+    if row is None or not row[0].strip():
+        # Empty results were once stored; treat them as a miss
+        return None
+    latex_cache.put(key, row[0])
+    return row[0]
+
+
+async def store(conn, user_id: int, key: str | None, latex: str) -> int:
+    """Save a transcription for the user and cache it under key.
+
+    Empty text is saved without a key, so it is never served from the
+    cache. The caller commits.
+
+    Returns:
+        The new tex_codes ID.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "INSERT INTO tex_codes (user_id, code, cache_key) VALUES (%s, %s, %s) RETURNING id",
+            (user_id, latex, key if latex.strip() else None),
+        )
+        tex_code_id = (await cur.fetchone())[0]
+    if key is not None and latex.strip():
+        latex_cache.put(key, latex)
+    return tex_code_id
@@ -0,0 +1,37 @@
+"""Splitting host-wide limits between the server's worker processes.
+
+Limits such as the model RPM quota or the upload byte budget are configured
+for the whole deployment, but every worker process enforces its own copy.
+Each worker therefore takes an equal share, based on the worker count that
+python -m backend exports as SERVER_WORKERS (1 when run any other way).
+Shares are static: a busy worker can't borrow an idle one's.
+"""
+
+import logging
+
+from backend.constants import SERVER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+WORKERS = max(1, SERVER_CONFIG["WORKERS"])
+
+
+def worker_share(total: float, name: str, minimum: float = 1, workers: int = WORKERS) -> float:
+    """This worker's part of the limit called name, shared by all workers.
+
+    A limit of 0 (or less) is returned unchanged; for the model and upload
+    limits it means "no limit". Integer totals give
+    integer shares. A share is never below minimum, so with more workers
+    than the total allows the deployment as a whole exceeds it; that is
+    logged as a warning.
+    """
+    if total <= 0:
+        return total
+    share = total // workers if isinstance(total, int) else total / workers
+    if share < minimum:
+        logger.warning(
+            "%s=%s is less than %s per worker; %d workers allow %s in total",
+            name, total, minimum, workers, minimum * workers,
+        )
+        return minimum
+    return share
@@ -1,49 +1,192 @@
-import time
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+import asyncio
+import logging
 import os
-import psycopg2
-from psycopg2 import pool
-from backend.constants import DB_CONFIG
+import time
+from contextlib import asynccontextmanager
+from backend.constants import DB_CONFIG, SERVER_CONFIG
+from backend.core.metrics import Histogram, registry
+from backend.core.timing import DB, phase
+
+logger = logging.getLogger(__name__)
+
+
+def build_conninfo() -> str:
+    return make_conninfo(
+        host=DB_CONFIG["DB_HOST"],
+        port=DB_CONFIG["DB_PORT"],
+        dbname=DB_CONFIG["DB_NAME"],
+        user=DB_CONFIG["DB_USER"],
+        password=DB_CONFIG["DB_PASSWORD"],
+    )
+
+
+def worker_pool_size(
+    workers: int = SERVER_CONFIG["WORKERS"],
+    budget: int = DB_CONFIG["MAX_CONNECTIONS"],
+    pool_max: int = DB_CONFIG["POOL_MAX_SIZE"],
+) -> int:
+    """Maximum pool size for one server worker.
+
+    Each worker gets pool_max connections or its equal share of budget
+    less one for the revocation feed's LISTEN connection, whichever is
+    smaller (but at least one), so N workers never hold more than budget
+    connections between them; startup migrations briefly use one more per
+    worker. A budget of 0 disables the split.
+    """
+    if budget <= 0:
+        return pool_max
+    return max(1, min(pool_max, budget // max(1, workers) - 1))
 
 
 class DatabaseManager:
-    def __init__(self):
-        self._pool = None
-        self._init_pool_with_retry()
-
-    def _init_pool_with_retry(self, retries: int = 30, delay: float = 1.0):
-        last_err = None
-        for _ in range(retries):
-            try:
-                self._pool = pool.SimpleConnectionPool(
-                    minconn=1,
-                    maxconn=10,
-                    user=DB_CONFIG["DB_USER"],
-                    password=DB_CONFIG["DB_PASSWORD"],
-                    host=DB_CONFIG["DB_HOST"],
-                    port=DB_CONFIG["DB_PORT"],
-                    database=DB_CONFIG["DB_NAME"],
+    """Async connection pool (psycopg 3) with instrumented leases.
+
+    The pool is created closed so constructing it does no I/O; the FastAPI
+    lifespan opens it on startup and closes it on shutdown. Every lease is
+    timed (wait for a connection, time held) and leases held longer than
+    lease_warn_seconds are logged while still open, so leaks show up before
+    the pool runs dry.
+    """
+
+    def __init__(
+        self,
+        conninfo: str | None = None,
+        min_size: int = DB_CONFIG["POOL_MIN_SIZE"],
+        max_size: int = DB_CONFIG["POOL_MAX_SIZE"],
+        timeout: float = DB_CONFIG["POOL_TIMEOUT"],
+        statement_timeout_ms: int = DB_CONFIG["STATEMENT_TIMEOUT_MS"],
+        lease_warn_seconds: float = DB_CONFIG["LEASE_WARN_SECONDS"],
+    ):
+        self.conninfo = conninfo or build_conninfo()
+        self._pool = AsyncConnectionPool(
+            self.conninfo,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            timeout=timeout,
+            kwargs={"options": f"-c statement_timeout={statement_timeout_ms}"},
+            open=False,
+        )
+        self.lease_warn_seconds = lease_warn_seconds
+        self.in_use = 0
+        self.leases = 0
+        self.leak_warnings = 0
+        self.wait_time = Histogram()
+        self.lease_duration = Histogram()
+
+    async def open(self, wait: bool = True, timeout: float = DB_CONFIG["CONNECT_TIMEOUT"]):
+        """Open the pool.
+
+        With wait, block up to timeout seconds for min_size connections
+        (closing the pool and raising PoolTimeout if they don't come up).
+        Without it, return at once and let the pool connect, and keep
+        reconnecting, in the background.
+        """
+        await self._pool.open(wait=wait, timeout=timeout)
+
+    async def ping(self, timeout: float = DB_CONFIG["READY_TIMEOUT"]):
+        """Run SELECT 1 on a pooled connection.
+
+        Raises:
+            psycopg_pool.PoolTimeout if no connection is available within
+            timeout, or the psycopg error if the query fails.
+        """
+        async with self._pool.connection(timeout=timeout) as conn:
+            await conn.execute("SELECT 1")
+
+    @asynccontextmanager
+    async def connection(self):
+        """Lease a connection as an async context manager.
+
+        The transaction is committed when the block exits normally, rolled
+        back if it raises, and the connection always goes back to the pool.
+
+        Raises:
+            psycopg_pool.PoolTimeout if no connection frees up within the
+            pool timeout.
+        """
+        # Waiting for and holding the lease both count as db time
+        with phase(DB):
+            requested = time.perf_counter()
+            async with self._pool.connection() as conn:
+                acquired = time.perf_counter()
+                self.wait_time.observe(acquired - requested)
+                self.in_use += 1
+                self.leases += 1
+                watchdog = asyncio.get_running_loop().call_later(
+                    self.lease_warn_seconds, self._warn_leak, _current_task_name(), acquired
                 )
-                return
-            except Exception as e:
-                last_err = e
-                time.sleep(delay)
-        raise last_err
+                try:
+                    yield conn
+                finally:
+                    watchdog.cancel()
+                    self.in_use -= 1
+                    self.lease_duration.observe(time.perf_counter() - acquired)
+
+    def _warn_leak(self, holder: str, acquired: float):
+        self.leak_warnings += 1
+        logger.warning(
+            "DB connection leased by %s still held after %.1fs (in use %d/%d)",
+            holder, time.perf_counter() - acquired, self.in_use, self._pool.max_size,
+        )
+
+    def stats(self) -> dict:
+        """Pool occupancy and lease timings, for health checks and metrics."""
+        pool_stats = self._pool.get_stats()
+        return {
+            "max_size": self._pool.max_size,
+            "size": pool_stats.get("pool_size", 0),
+            "in_use": self.in_use,
+            "idle": pool_stats.get("pool_available", 0),
+            "waiting": pool_stats.get("requests_waiting", 0),
+            "leases": self.leases,
+            "leak_warnings": self.leak_warnings,
+            "wait_seconds": self.wait_time.snapshot(),
+            "lease_seconds": self.lease_duration.snapshot(),
+        }
 
-    def get_conn(self):
-        return self._pool.getconn()
+    async def close_all(self):
+        await self._pool.close()
+
+
+def _current_task_name() -> str:
+    task = asyncio.current_task()
+    return task.get_name() if task else "<no task>"
 
-    def put_conn(self, conn):
-        self._pool.putconn(conn)
 
-    def close_all(self):
-        self._pool.closeall()
-    
 """
 Initialize a global database manager instance.
 In test environments, set environment variable DISABLE_DB_INIT=1 to skip
-initializing a real connection pool (tests will monkeypatch 'pg').
+creating a connection pool (tests will monkeypatch 'pg').
 """
 if os.environ.get("DISABLE_DB_INIT") == "1":
     pg = None
 else:
-    pg = DatabaseManager()
\ No newline at end of file
+    pg = DatabaseManager(max_size=worker_pool_size())
+
+
+def _pool_stat(key: str):
+    # Read at scrape time from whatever pg is then (tests swap it out)
+    def read():
+        return None if pg is None else pg.stats()[key]
+    return read
+
+
+for _key, _kind, _help in (
+    ("max_size", "gauge", "Maximum connections in the pool."),
+    ("size", "gauge", "Connections currently open."),
+    ("in_use", "gauge", "Connections leased to requests."),
+    ("waiting", "gauge", "Requests waiting for a connection."),
+    ("leases", "counter", "Connections leased since startup."),
+    ("leak_warnings", "counter", "Leases held past the leak warning threshold."),
+):
+    registry.callback(f"db_pool_{_key}{'_total' if _kind == 'counter' else ''}", _kind, _help, _pool_stat(_key))
+registry.callback(
+    "db_pool_wait_seconds", "histogram", "Time spent waiting for a pooled connection.",
+    lambda: None if pg is None else pg.wait_time,
+)
+registry.callback(
+    "db_pool_lease_seconds", "histogram", "Time a leased connection was held.",
+    lambda: None if pg is None else pg.lease_duration,
+)
@@ -0,0 +1,169 @@
+"""Versioned schema migrations, applied at startup.
+
+db/schema.sql is only run when the Postgres container is first initialised,
+so changes to it never reach an existing database. Numbered files in
+db/migrations (``0001_name.sql``) carry those changes instead; each is
+applied once, in order, and recorded in schema_migrations.
+
+A migration runs in one transaction unless its first line is
+``-- migrate: no-transaction``. Those run statement by statement in
+autocommit mode, which CREATE INDEX CONCURRENTLY requires; they should be
+written to be safe to re-run (IF NOT EXISTS), since a failure part-way
+leaves the earlier statements applied. An advisory lock makes concurrent
+workers starting together wait for one of them to finish migrating. They
+poll for it between statements rather than block in pg_advisory_lock: a
+session blocked there counts as an open transaction, which the lock
+holder's CREATE INDEX CONCURRENTLY would wait on (a deadlock).
+
+Usage:
+    python -m backend.db.migrate
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import psycopg
+
+from backend.core.resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+# Arbitrary key for pg_advisory_lock, shared by every process running migrations
+LOCK_KEY = 0x70686F746578
+# Longest wait between attempts to take it
+LOCK_POLL_MAX_DELAY = 2.0
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CONCURRENT_INDEX = re.compile(r"INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """All migrations in directory, ordered by version."""
+    migrations = []
+    for path in directory.glob("*.sql"):
+        match = _FILENAME.match(path.name)
+        if not match:
+            raise ValueError(f"Bad migration filename: {path.name}")
+        migrations.append(Migration(int(match[1]), match[2], path.read_text(encoding="utf-8")))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a migration into statements (on ``;`` at the end of a line).
+
+    Comment-only chunks are dropped. This is deliberately simple: statements
+    in no-transaction migrations must not contain ``;`` at a line end.
+    """
+    statements = []
+    for chunk in re.split(r";[ \t]*$", sql, flags=re.MULTILINE):
+        code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+        if code.strip():
+            statements.append(chunk.strip())
+    return statements
+
+
+async def _drop_invalid_indexes(conn: psycopg.AsyncConnection, sql: str):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+    # which IF NOT EXISTS would then skip; drop it so the build is retried
+    names = _CONCURRENT_INDEX.findall(sql)
+    if not names:
+        return
+    cur = await conn.execute(
+        """
+        SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relname = ANY(%s) AND pg_table_is_visible(i.indrelid)
+        """,
+        (names,),
+    )
+    for (name,) in await cur.fetchall():
+        logger.warning("Dropping invalid index %s left by an earlier failed build", name)
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+async def _lock(conn: psycopg.AsyncConnection):
+    attempt = 0
+    while True:
+        cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+        if (await cur.fetchone())[0]:
+            return
+        if attempt == 0:
+            logger.info("Waiting for another process to finish migrating")
+        await asyncio.sleep(backoff_delay(attempt, 0.1, LOCK_POLL_MAX_DELAY))
+        attempt += 1
+
+
+async def applied_versions(conn: psycopg.AsyncConnection) -> set[int]:
+    cur = await conn.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in await cur.fetchall()}
+
+
+async def migrate(conninfo: str, directory: Path = MIGRATIONS_DIR) -> list[int]:
+    """Apply pending migrations.
+
+    Returns:
+        The versions applied by this call, in order.
+    """
+    migrations = load_migrations(directory)
+    applied = []
+    async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+        await _lock(conn)
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            done = await applied_versions(conn)
+            for migration in migrations:
+                if migration.version in done:
+                    continue
+                logger.info("Applying migration %04d_%s", migration.version, migration.name)
+                record = ("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                          (migration.version, migration.name))
+                if migration.transactional:
+                    async with conn.transaction():
+                        await conn.execute(migration.sql)
+                        await conn.execute(*record)
+                else:
+                    await _drop_invalid_indexes(conn, migration.sql)
+                    for statement in split_statements(migration.sql):
+                        await conn.execute(statement)
+                    await conn.execute(*record)
+                applied.append(migration.version)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    return applied
+
+
+if __name__ == "__main__":
+    from backend.db.database import build_conninfo
+
+    logging.basicConfig(level=logging.INFO)
+    versions = asyncio.run(migrate(build_conninfo()))
+    print(f"Applied {len(versions)} migration(s): {versions}" if versions else "Database is up to date")
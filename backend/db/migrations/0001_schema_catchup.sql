@@ -0,0 +1,24 @@
+-- Columns and tables added to schema.sql since databases were first
+-- initialised from it. Everything is conditional, so on a fresh database
+-- (where schema.sql already created them) this is a no-op.
+
+ALTER TABLE images ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
+UPDATE images SET uploaded_at = CURRENT_TIMESTAMP WHERE uploaded_at IS NULL;
+ALTER TABLE images ALTER COLUMN uploaded_at SET NOT NULL;
+
+ALTER TABLE tex_codes ADD COLUMN IF NOT EXISTS cache_key CHAR(64);
+
+CREATE TABLE IF NOT EXISTS transcription_jobs (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    image_ids INT[] NOT NULL,
+    file_paths TEXT[] NOT NULL,
+    warning TEXT,
+    error TEXT,
+    tex_code_id INT REFERENCES tex_codes(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
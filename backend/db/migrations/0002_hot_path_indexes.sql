@@ -0,0 +1,31 @@
+-- migrate: no-transaction
+-- Index every predicate the routers and background workers filter on, plus
+-- the foreign keys that ON DELETE CASCADE / SET NULL have to look up when a
+-- user (or their tex_codes) is deleted. Built CONCURRENTLY so live traffic
+-- keeps writing to these tables while they build.
+
+-- GET /tex/images (keyset and offset); its leading column also serves
+-- images.user_id lookups, so there is no separate single-column index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_user_uploaded_idx
+    ON images (user_id, uploaded_at DESC, id DESC) INCLUDE (file_path, batch_id);
+
+-- GET /tex/images?batch_id=, and cascading image_batches deletes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_batch_uploaded_idx
+    ON images (batch_id, uploaded_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS image_batches_user_id_idx ON image_batches (user_id);
+
+-- Cascading user deletes, and the expired-token sweep
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tokens_user_id_idx ON tokens (user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tokens_expires_at_idx ON tokens (expires_at);
+
+-- Transcription cache lookups, and cascading user deletes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tex_codes_cache_key_idx ON tex_codes (cache_key);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tex_codes_user_id_idx ON tex_codes (user_id);
+
+-- Job polling and cascades; the partial index keeps the startup requeue
+-- scan proportional to unfinished jobs only
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transcription_jobs_user_id_idx ON transcription_jobs (user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transcription_jobs_tex_code_id_idx ON transcription_jobs (tex_code_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transcription_jobs_unfinished_idx
+    ON transcription_jobs (status, id) WHERE status IN ('queued', 'running');
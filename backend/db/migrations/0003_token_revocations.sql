@@ -0,0 +1,16 @@
+-- Logouts and user deletions, shared between server workers. Each worker
+-- keeps verified tokens in memory (the token cache, the signed-token
+-- revocation list); a row here plus a NOTIFY on token_revocations tells the
+-- others to forget them. Rows are dropped once the token has expired.
+-- Times are UTC, like the rest of the schema.
+
+CREATE TABLE IF NOT EXISTS token_revocations (
+    id BIGSERIAL PRIMARY KEY,
+    token VARCHAR(255),
+    jti VARCHAR(64),
+    user_id INT,
+    revoked_at TIMESTAMP NOT NULL DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC'),
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS token_revocations_expires_at_idx ON token_revocations (expires_at);
@@ -26,13 +26,54 @@ CREATE TABLE images (
     id SERIAL PRIMARY KEY,
     user_id INT REFERENCES users(id) ON DELETE CASCADE,
     file_path VARCHAR(255) NOT NULL,
-    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    content_hash CHAR(64),
+    uploaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     batch_id INT REFERENCES image_batches(id) ON DELETE CASCADE
 );
 
+
 CREATE TABLE tex_codes (
     id SERIAL PRIMARY KEY,
     user_id INT REFERENCES users(id) ON DELETE CASCADE,
     code TEXT NOT NULL,
+    cache_key CHAR(64),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+CREATE TABLE transcription_jobs (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    image_ids INT[] NOT NULL,
+    file_paths TEXT[] NOT NULL,
+    warning TEXT,
+    error TEXT,
+    tex_code_id INT REFERENCES tex_codes(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Logged-out tokens and deleted users (one of token, jti, user_id per row),
+-- broadcast to every server worker; see core/revocation_feed.py
+CREATE TABLE token_revocations (
+    id BIGSERIAL PRIMARY KEY,
+    token VARCHAR(255),
+    jti VARCHAR(64),
+    user_id INT,
+    revoked_at TIMESTAMP NOT NULL DEFAULT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC'),
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Indexes (kept in step with db/migrations, which adds them to older databases)
+CREATE INDEX images_user_uploaded_idx ON images (user_id, uploaded_at DESC, id DESC) INCLUDE (file_path, batch_id);
+CREATE INDEX images_batch_uploaded_idx ON images (batch_id, uploaded_at DESC, id DESC);
+CREATE INDEX image_batches_user_id_idx ON image_batches (user_id);
+CREATE INDEX tokens_user_id_idx ON tokens (user_id);
+CREATE INDEX tokens_expires_at_idx ON tokens (expires_at);
+CREATE INDEX token_revocations_expires_at_idx ON token_revocations (expires_at);
+CREATE INDEX tex_codes_cache_key_idx ON tex_codes (cache_key);
+CREATE INDEX tex_codes_user_id_idx ON tex_codes (user_id);
+CREATE INDEX transcription_jobs_user_id_idx ON transcription_jobs (user_id);
+CREATE INDEX transcription_jobs_tex_code_id_idx ON transcription_jobs (tex_code_id);
+CREATE INDEX transcription_jobs_unfinished_idx ON transcription_jobs (status, id) WHERE status IN ('queued', 'running');
@@ -0,0 +1,47 @@
+"""ASGI middleware recording request latency and status per route.
+
+Requests are labelled by the matched route's path template (e.g.
+/images/{image_id}), never the raw path, so the number of series stays
+fixed however many ids are requested. Unmatched paths share one label.
+Latency runs until the response is fully sent, streaming bodies included.
+"""
+
+import time
+
+from backend.core.metrics import registry
+
+UNMATCHED = "<unmatched>"
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to send the full response.", ("method", "route")
+)
+requests_total = registry.counter(
+    "http_requests_total", "Responses sent, by status code.", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", UNMATCHED)
+            request_duration.observe(time.perf_counter() - start, scope["method"], route)
+            requests_total.inc(scope["method"], route, str(status))
@@ -0,0 +1,87 @@
+"""ASGI middleware adding a Server-Timing header and opt-in request profiles.
+
+Each request gets a fresh phase collector (core/timing.py); when the
+response starts, the phases recorded so far are sent as Server-Timing
+(browsers show them in the network panel), plus "total" up to that point.
+Work done while a streaming body is being sent comes after the header and
+is not included.
+
+A request carrying ``X-Profile: <PROFILING_ADMIN_TOKEN>`` is additionally
+profiled with the sampling profiler (core/profiling.py). The profile is
+written to PROFILING_DIR when the response finishes, and its file name is
+returned in the X-Profile-Id header.
+"""
+
+import hmac
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from backend.constants import PROFILING_CONFIG
+from backend.core.profiling import SamplingProfiler
+from backend.core.timing import start_request
+
+
+class ServerTimingMiddleware:
+    def __init__(
+        self,
+        app,
+        enabled: bool = PROFILING_CONFIG["SERVER_TIMING"],
+        admin_token: str = PROFILING_CONFIG["ADMIN_TOKEN"],
+        profile_dir: str = PROFILING_CONFIG["DIR"],
+        sample_interval: float = PROFILING_CONFIG["SAMPLE_INTERVAL"],
+    ):
+        self.app = app
+        self.enabled = enabled
+        self.admin_token = admin_token
+        self.profile_dir = Path(profile_dir)
+        self.sample_interval = sample_interval
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.admin_token:
+            return False
+        presented = Headers(scope=scope).get("x-profile")
+        # Compare bytes: compare_digest rejects non-ASCII str
+        return presented is not None and hmac.compare_digest(
+            presented.encode("utf-8"), self.admin_token.encode("utf-8")
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = profile_id = None
+        if self._wants_profile(scope):
+            profile_id = secrets.token_hex(6)
+            profiler = SamplingProfiler(threading.get_ident(), self.sample_interval).start()
+        if not self.enabled and profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if self.enabled:
+                    headers.append("Server-Timing", timings.header(total=time.perf_counter() - start))
+                if profile_id is not None:
+                    headers.append("X-Profile-Id", profile_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                # Joining the sampler thread and writing the file both block
+                await run_in_threadpool(self._finish_profile, profiler, profile_id)
+
+    def _finish_profile(self, profiler: SamplingProfiler, profile_id: str):
+        profiler.stop()
+        profiler.save(self.profile_dir, profile_id)
@@ -0,0 +1,81 @@
+"""ASGI middleware enforcing request-size limits on upload routes.
+
+Runs before FastAPI parses the multipart body, so an oversized request is
+rejected from its Content-Length alone. Requests without a Content-Length are
+counted as they stream in. Each request also reserves its bytes from the
+process's share of the upload budget, so many concurrent uploads cannot
+together spool more than MAX_INFLIGHT_BYTES to memory/disk.
+"""
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from backend.constants import UPLOAD_CONFIG
+from backend.core.storage import ByteBudget, upload_budget
+
+
+class UploadLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        path_prefix: str = "/upload",
+        max_request_bytes: int = UPLOAD_CONFIG["MAX_REQUEST_BYTES"],
+        budget: ByteBudget = upload_budget,
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_request_bytes = max_request_bytes
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        declared = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    pass
+                break
+
+        if declared is not None and declared > self.max_request_bytes:
+            await JSONResponse({"detail": "Upload too large"}, status_code=413)(scope, receive, send)
+            return
+
+        reserved = declared or 0
+        if not self.budget.try_reserve(reserved):
+            await JSONResponse(
+                {"detail": "Server busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            # Raised HTTPExceptions surface from FastAPI's body parsing as-is
+            nonlocal received, reserved
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_request_bytes:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+                if received > reserved:
+                    extra = received - reserved
+                    if not self.budget.try_reserve(extra):
+                        raise HTTPException(
+                            status_code=503,
+                            detail="Server busy, please retry",
+                            headers={"Retry-After": "1"},
+                        )
+                    reserved += extra
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            self.budget.release(reserved)
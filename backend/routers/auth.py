@@ -1,15 +1,34 @@
 # Author: Duncan Truitt
 # Date: 12-13-2025
 
-from fastapi import APIRouter, HTTPException, Request
-from backend.core.authentication import create_user, authenticate_user, get_token
+from fastapi import APIRouter, Depends, HTTPException, Request
+from backend.constants import AUTH_CONFIG
+from backend.core.authentication import (
+    create_user,
+    authenticate_user,
+    get_token,
+    issue_signed_token,
+    revoke_token,
+)
+from backend.core.hashing import HashingPoolFull
 from backend.db.database import pg
+from backend.routers.dependencies import bearer_token
 
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
 )
 
+
+def _server_busy() -> HTTPException:
+    # Password hashing pool is saturated; ask the client to back off briefly.
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register")
 async def register(request: Request):
     """
@@ -31,13 +50,15 @@ async def register(request: Request):
         if not username or not password:
             raise HTTPException(status_code=400, detail="Username and password are required")
         
-        with pg.get_conn() as conn:
-            user_id = create_user(conn, username, password, email)
+        user_id = await create_user(pg, username, password, email)
             
         return {"message": "User registered successfully", "user_id": user_id}
 
     except HTTPException:
         raise
+
+    except HashingPoolFull:
+        raise _server_busy()
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -67,24 +88,37 @@ async def login(request: Request):
         if not username or not password:
             raise HTTPException(status_code=400, detail="Username and password are required")
         
-        with pg.get_conn() as conn:
-            user = authenticate_user(conn, username, password)
-            if user:
-                token = get_token(conn, user["id"], ttl_minutes=60)
-                return {"message": "Login successful", "user": user, "token": token}
-            else:
-                raise HTTPException(status_code=401, detail="Invalid credentials")
+        user = await authenticate_user(pg, username, password)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        ttl_minutes = AUTH_CONFIG["TOKEN_TTL_MINUTES"]
+        if AUTH_CONFIG["TOKEN_MODE"] == "signed":
+            # Stateless token: verified in memory, nothing stored
+            token = issue_signed_token(user, ttl_minutes=ttl_minutes)
+        else:
+            async with pg.connection() as conn:
+                token = await get_token(conn, user["id"], ttl_minutes=ttl_minutes)
+        return {"message": "Login successful", "user": user, "token": token}
     except HTTPException:
         raise
+    except HashingPoolFull:
+        raise _server_busy()
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/logout")
-def logout():
+async def logout(token: str = Depends(bearer_token)):
     """
     Logout a user.
     
-    For now, just a placeholder.
+    Requires Authorization: Bearer <token>. Opaque tokens are deleted;
+    signed tokens are added to the revocation list. Either way the token
+    stops working immediately in this worker, and in the other workers as
+    soon as their revocation feed hears of it (normally milliseconds).
+    
+    Returns: {"message": "Logged out"}
     """
-    # TODO: Implement logout logic (e.g., invalidate token)
+    async with pg.connection() as conn:
+        await revoke_token(conn, token)
     return {"message": "Logged out"}
\ No newline at end of file
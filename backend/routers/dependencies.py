@@ -0,0 +1,40 @@
+# Shared FastAPI dependencies for the routers.
+
+from typing import Optional
+from fastapi import Depends, Header, HTTPException
+from backend.core.authentication import (
+    is_signed_token,
+    token_cache,
+    verify_signed_token,
+    verify_token,
+)
+from backend.core.timing import AUTH, phase
+from backend.db.database import pg
+
+
+def bearer_token(authorization: Optional[str] = Header(None)) -> str:
+    """Extract the token from an `Authorization: Bearer <token>` header."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    return authorization.split(" ", 1)[1]
+
+
+async def get_current_user(token: str = Depends(bearer_token)) -> dict:
+    """Resolve the authenticated user for this request.
+
+    Signed tokens are verified in memory. Recently verified opaque tokens are
+    served from token_cache; only a miss costs a DB lookup. FastAPI caches
+    the result per request, so routes and sub-dependencies share a single
+    resolution.
+    """
+    with phase(AUTH):
+        if is_signed_token(token):
+            user = verify_signed_token(token)
+        else:
+            user = token_cache.get(token)
+            if user is None:
+                async with pg.connection() as conn:
+                    user = await verify_token(conn, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return user
@@ -0,0 +1,90 @@
+# Routes that serve a user's stored images.
+
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.http_cache import PRIVATE_IMMUTABLE, ContentFileResponse, not_modified
+from backend.core.storage import file_content_hash
+from backend.core.thumbnails import thumbnail_etag, thumbnailer
+from backend.db.database import pg
+from backend.routers.dependencies import get_current_user
+
+router = APIRouter(
+    prefix="/images",
+    tags=["images"]
+)
+
+
+async def _owned_image(image_id: int, user_id: int) -> tuple[Path, str]:
+    """(path, content hash) of an image the user owns; 404 otherwise."""
+    async with pg.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT file_path, content_hash FROM images WHERE id = %s AND user_id = %s",
+                (image_id, user_id),
+            )
+            row = await cur.fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, content_hash = Path(row[0]), row[1]
+    if content_hash is None:
+        # Rows from before content hashes were recorded
+        content_hash = await run_in_threadpool(file_content_hash, path)
+    if content_hash is None:
+        raise HTTPException(status_code=404, detail="Image file missing")
+    return path, content_hash
+
+
+@router.get("/{image_id}")
+async def get_image(
+    image_id: int,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """The original upload. Supports Range (and If-Range) for resumed
+    downloads, and If-None-Match / If-Modified-Since revalidation."""
+    path, content_hash = await _owned_image(image_id, user["id"])
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file missing")
+    # An image's bytes never change, so the content hash is a strong ETag
+    headers = {
+        "ETag": f'"{content_hash}"',
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": PRIVATE_IMMUTABLE,
+    }
+
+    if not_modified(request.headers, headers["ETag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    # Streamed in 64 KiB reads on a worker thread. Neither Starlette 0.41
+    # (pinned by FastAPI 0.115) nor uvicorn implements http.response.pathsend,
+    # so there is no zero-copy path; put a reverse proxy in front for that.
+    return ContentFileResponse(path, headers=headers, stat_result=stat_result)
+
+
+@router.get("/{image_id}/thumb")
+async def get_thumbnail(
+    image_id: int,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    path, content_hash = await _owned_image(image_id, user["id"])
+    headers = {"ETag": thumbnail_etag(content_hash), "Cache-Control": PRIVATE_IMMUTABLE}
+
+    # The ETag is known without touching the file, so revalidation is free
+    if not_modified(request.headers, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        thumb = await thumbnailer.derive(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file missing")
+    except OSError:
+        # Pillow raises UnidentifiedImageError (an OSError) for non-images
+        raise HTTPException(status_code=415, detail="Image cannot be thumbnailed")
+    return ContentFileResponse(thumb, media_type="image/jpeg", headers=headers)
@@ -3,7 +3,15 @@
 #
 # This file just defines some basic routes for the api.
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from backend.core.agent import model_breaker
+from backend.core.metrics import registry
+from backend.core.revocation_feed import revocation_feed
+from backend.core.startup import startup
+from backend.core.token_reaper import token_reaper
+from backend.db import database
 
 router = APIRouter(
     prefix="",
@@ -16,4 +24,47 @@ def root():
 
 @router.get("/health")
 def health_check():
+    # Liveness: the process is serving requests, whatever its dependencies
     return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    # Readiness: 200 once startup finished and the database answers now,
+    # else 503. An open model breaker is reported but doesn't fail the
+    # probe, since every instance shares the same upstream.
+    if database.pg is None:
+        db = {"ready": False, "error": "Database not configured"}
+    elif not startup.db_ready:
+        db = {"ready": False, "error": startup.db_error or "Starting"}
+    else:
+        try:
+            await database.pg.ping()
+            db = {"ready": True}
+        except Exception as exc:
+            db = {"ready": False, "error": str(exc) or type(exc).__name__}
+    model = {
+        "ready": startup.model_ready,
+        "error": startup.model_error,
+        "breaker": model_breaker.state,
+    }
+    ready = db["ready"] and model["ready"]
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", "db": db, "model": model},
+        status_code=200 if ready else 503,
+    )
+
+@router.get("/health/db")
+def db_pool_stats():
+    # Connection pool occupancy and lease timings
+    if database.pg is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return {
+        **database.pg.stats(),
+        "token_reaper": token_reaper.stats(),
+        "revocation_feed": revocation_feed.stats(),
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
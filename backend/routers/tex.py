@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi import Query
-from fastapi.responses import StreamingResponse
-from typing import Optional, List
+from fastapi.responses import Response, StreamingResponse
+from typing import AsyncIterator, Optional, List
+import logging
+import math
 from pydantic import BaseModel
-from backend.core.authentication import verify_token
 from backend.db.database import pg
-from backend.core.agent import generate_latex_from_images
+from backend.core import transcriptions
+from backend.core.agent import EmptyTranscription, generate_latex_from_images, stream_latex_from_images
+from backend.core.pagination import decode_cursor, encode_cursor
+from backend.core.preprocess import image_preprocessor
+from backend.core.resilience import ModelUnavailable
+from backend.core.timing import ENCODE, phase
+from backend.core.jobs import DONE, FAILED, JobQueueFull, create_job, fail_job, get_job, job_queue
+from backend.routers.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/tex",
@@ -16,119 +26,290 @@ class ImagesToLatexRequest(BaseModel):
     image_ids: List[int]
 
 
-@router.post("/images-to-latex")
-async def images_to_latex(
-    payload: ImagesToLatexRequest,
-    authorization: Optional[str] = Header(None),
-):
-    # Require Bearer token
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ", 1)[1]
-
-    if not payload.image_ids:
+async def _owned_image_paths(image_ids: list[int], user_id: int) -> tuple[list[int], list[str], str | None]:
+    """Resolve image IDs owned by the user to (ids, paths, warning), in ID order."""
+    if not image_ids:
         raise HTTPException(status_code=400, detail="No image IDs provided")
 
-    conn = pg.get_conn()
-    try:
-        user = verify_token(conn, token)
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-        # Fetch paths for provided image IDs that belong to the user
-        with conn.cursor() as cur:
-            cur.execute(
+    # Fetch paths for provided image IDs that belong to the user
+    async with pg.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
                 SELECT id, file_path FROM images
                 WHERE id = ANY(%s) AND user_id = %s
                 ORDER BY id
                 """,
-                (payload.image_ids, user["id"]),
+                (image_ids, user_id),
             )
-            rows = cur.fetchall()
-
-        if not rows:
-            raise HTTPException(status_code=404, detail="No matching images found for user")
-
-        # Check for missing IDs
-        found_ids = {row[0] for row in rows}
-        missing = [i for i in payload.image_ids if i not in found_ids]
-        if missing:
-            # Not fatal; return LaTeX for those found and warn
-            warning = f"Some image IDs not found or not owned: {missing}"
-        else:
-            warning = None
-
-        paths = [row[1] for row in rows]
-        latex = generate_latex_from_images(paths)
-
-        # Return as a downloadable .tex file
-        filename = "images_includes.tex"
-        headers = {
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+            rows = await cur.fetchall()
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="No matching images found for user")
+
+    # Check for missing IDs
+    found_ids = {row[0] for row in rows}
+    missing = [i for i in image_ids if i not in found_ids]
+    if missing:
+        # Not fatal; return LaTeX for those found and warn
+        warning = f"Some image IDs not found or not owned: {missing}"
+    else:
+        warning = None
+
+    return [row[0] for row in rows], [row[1] for row in rows], warning
+
+
+def _tex_download(latex: str) -> Response:
+    # The whole text is known, so send it with a Content-Length
+    with phase(ENCODE):
+        body = latex.encode("utf-8")
+    return Response(
+        body,
+        media_type="application/x-tex",
+        headers={"Content-Disposition": "attachment; filename=images_includes.tex"},
+    )
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def _sse_event(data: str, event: str | None = None) -> bytes:
+    # Multi-line payloads become one "data:" line each, per the SSE format
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+async def _sse_body(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    try:
+        async for text in chunks:
+            yield _sse_event(text)
+    except Exception as exc:
+        logger.warning("LaTeX stream failed: %s", exc)
+        yield _sse_event(str(exc) or type(exc).__name__, event="error")
+        return
+    yield _sse_event("", event="done")
+
+
+async def _raw_body(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    async for text in chunks:
+        yield text.encode("utf-8")
+
+
+def _tex_stream(chunks: AsyncIterator[str], sse: bool) -> StreamingResponse:
+    if sse:
         return StreamingResponse(
-            iter([latex.encode("utf-8")]),
-            media_type="application/x-tex",
-            headers=headers,
+            _sse_body(chunks),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-    finally:
-        pg.put_conn(conn)
+    # Return as a downloadable .tex file
+    filename = "images_includes.tex"
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}"
+    }
+    return StreamingResponse(
+        _raw_body(chunks),
+        media_type="application/x-tex",
+        headers=headers,
+    )
+
+
+def _model_unavailable(exc: ModelUnavailable) -> HTTPException:
+    retry_after = math.ceil(getattr(exc, "retry_after", 5))
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(retry_after)})
+
+
+async def _primed(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    # Pull the first item now so errors surface before the response starts
+    first = await anext(chunks, None)
+
+    async def rest():
+        if first is not None:
+            yield first
+        async for text in chunks:
+            yield text
+
+    return rest()
+
+
+async def _stream_and_cache(pages: list, user_id: int, key: str | None) -> AsyncIterator[str]:
+    # Forward model output as it arrives; cache the whole text once complete
+    parts = []
+    async for text in stream_latex_from_images(pages):
+        parts.append(text)
+        yield text
+    latex = "".join(parts)
+    if not latex.strip():
+        return
+    async with pg.connection() as conn:
+        await transcriptions.store(conn, user_id, key, latex)
+        await conn.commit()
+
+
+@router.post("/images-to-latex")
+async def images_to_latex(
+    payload: ImagesToLatexRequest,
+    request: Request,
+    stream: bool = Query(False),
+    user: dict = Depends(get_current_user),
+):
+    # Synchronous variant kept for existing clients; the model is called
+    # after the DB connection is released. Prefer POST /tex/jobs for large
+    # notebooks. With ?stream=true text is sent as the model generates it,
+    # as a chunked .tex download or, if the client accepts
+    # text/event-stream, as server-sent events ending in a "done" event.
+    _ids, paths, _warning = await _owned_image_paths(payload.image_ids, user["id"])
+    sse = stream and "text/event-stream" in request.headers.get("accept", "")
+
+    # Streaming sends every page in one call, unlike the chunked
+    # generate_latex_from_images, so its results are cached separately
+    key = await transcriptions.transcription_key_for(
+        paths, image_preprocessor.variant, chunk_pages=0 if stream else None
+    )
+    async with pg.connection() as conn:
+        latex = await transcriptions.lookup(conn, key)
+    if latex is not None:
+        return _tex_stream(_single(latex), sse)
+
+    pages = await image_preprocessor.prepare(paths)
+    try:
+        if stream:
+            # Wait for the first text so an unavailable model is still a 503
+            # and an empty answer a 502
+            chunks = await _primed(_stream_and_cache(pages, user["id"], key))
+            return _tex_stream(chunks, sse)
+        latex = await generate_latex_from_images(pages)
+    except ModelUnavailable as exc:
+        raise _model_unavailable(exc)
+    except EmptyTranscription as exc:
+        # Nothing to return or cache; the same pages would get the same answer
+        raise HTTPException(status_code=502, detail=str(exc))
+
+    async with pg.connection() as conn:
+        await transcriptions.store(conn, user["id"], key, latex)
+        await conn.commit()
+    return _tex_download(latex)
+
+
+@router.post("/jobs", status_code=202)
+async def submit_latex_job(
+    payload: ImagesToLatexRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Queue a transcription job and return its ID immediately."""
+    ids, paths, warning = await _owned_image_paths(payload.image_ids, user["id"])
+    if not job_queue.running:
+        raise HTTPException(status_code=503, detail="Transcription workers unavailable")
+
+    async with pg.connection() as conn:
+        job_id = await create_job(conn, user["id"], ids, paths, warning)
+        try:
+            job_queue.submit(job_id)
+        except JobQueueFull as exc:
+            await fail_job(conn, job_id, str(exc))
+            raise HTTPException(
+                status_code=503, detail="Too many transcription jobs queued", headers={"Retry-After": "5"}
+            )
+
+    return {"job_id": job_id, "status": "queued", "warning": warning}
+
+
+async def _load_job(job_id: int, user_id: int) -> dict:
+    async with pg.connection() as conn:
+        job = await get_job(conn, job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_latex_job(job_id: int, user: dict = Depends(get_current_user)):
+    job = await _load_job(job_id, user["id"])
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "image_ids": job["image_ids"],
+        "warning": job["warning"],
+        "error": job["error"],
+        "created_at": job["created_at"].isoformat() if job["created_at"] else None,
+        "started_at": job["started_at"].isoformat() if job["started_at"] else None,
+        "finished_at": job["finished_at"].isoformat() if job["finished_at"] else None,
+    }
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_latex_job_result(job_id: int, user: dict = Depends(get_current_user)):
+    job = await _load_job(job_id, user["id"])
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return _tex_download(job["code"])
 
 
 @router.get("/images")
 async def list_user_images(
-    authorization: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    after: Optional[str] = None,
     batch_id: Optional[int] = None,
 ):
-    # Require Bearer token
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ", 1)[1]
+    """List the user's images, newest first.
 
-    conn = pg.get_conn()
-    try:
-        user = verify_token(conn, token)
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-        with conn.cursor() as cur:
-            if batch_id is not None:
-                cur.execute(
-                    """
-                    SELECT id, file_path, uploaded_at, batch_id
-                    FROM images
-                    WHERE user_id = %s AND batch_id = %s
-                    ORDER BY uploaded_at DESC, id DESC
-                    LIMIT %s OFFSET %s
-                    """,
-                    (user["id"], batch_id, limit, offset),
-                )
-            else:
-                cur.execute(
-                    """
-                    SELECT id, file_path, uploaded_at, batch_id
-                    FROM images
-                    WHERE user_id = %s
-                    ORDER BY uploaded_at DESC, id DESC
-                    LIMIT %s OFFSET %s
-                    """,
-                    (user["id"], limit, offset),
-                )
-            rows = cur.fetchall()
-
-        images = [
-            {
-                "id": r[0],
-                "file_path": r[1],
-                "uploaded_at": r[2].isoformat() if r[2] else None,
-                "batch_id": r[3],
-            }
-            for r in rows
-        ]
-
-        return {"count": len(images), "images": images, "limit": limit, "offset": offset, "batch_id": batch_id}
-    finally:
-        pg.put_conn(conn)
+    Pass the previous page's next_cursor as ``after`` to page through by
+    keyset; offset is still accepted for existing clients but gets slower
+    the deeper it goes.
+    """
+    conditions = ["user_id = %s"]
+    params: list = [user["id"]]
+    if batch_id is not None:
+        conditions.append("batch_id = %s")
+        params.append(batch_id)
+    if after is not None:
+        if offset:
+            raise HTTPException(status_code=400, detail="Use either after or offset, not both")
+        try:
+            params.extend(decode_cursor(after))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        conditions.append("(uploaded_at, id) < (%s, %s)")
+
+    # One extra row tells us whether there is a next page
+    async with pg.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"""
+                SELECT id, file_path, uploaded_at, batch_id
+                FROM images
+                WHERE {" AND ".join(conditions)}
+                ORDER BY uploaded_at DESC, id DESC
+                LIMIT %s OFFSET %s
+                """,
+                (*params, limit + 1, offset),
+            )
+            rows = await cur.fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+    images = [
+        {
+            "id": r[0],
+            "file_path": r[1],
+            "uploaded_at": r[2].isoformat() if r[2] else None,
+            "batch_id": r[3],
+            "url": f"/images/{r[0]}",
+            "thumbnail_url": f"/images/{r[0]}/thumb",
+        }
+        for r in rows[:limit]
+    ]
+
+    return {
+        "count": len(images),
+        "images": images,
+        "limit": limit,
+        "offset": offset,
+        "batch_id": batch_id,
+        "next_cursor": next_cursor,
+    }
@@ -3,11 +3,16 @@
 #
 # These routes will handle file uploads.
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Header
+import asyncio
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from pathlib import Path
 from typing import Optional
-from backend.core.authentication import verify_token
+from backend.core.images import insert_images
+from backend.constants import THUMBNAIL_CONFIG
+from backend.core.storage import StoredFile, UploadTooLarge, store_upload
+from backend.core.thumbnails import thumbnailer
 from backend.db.database import pg
+from backend.routers.dependencies import get_current_user
 
 UPLOAD_DIR = Path("uploads/images")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -17,85 +22,72 @@ router = APIRouter(
     tags=["upload"]
 )
 
+
+async def _store_or_413(file: UploadFile) -> StoredFile:
+    # Streamed into the content-addressed store off the event loop; see core/storage.py
+    try:
+        return await store_upload(file, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
 @router.post("/image")
 async def upload_image(
     file: UploadFile = File(...),
-    authorization: Optional[str] = Header(None)
+    user: dict = Depends(get_current_user),
 ):
-    # Expect Authorization: Bearer <token>
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ", 1)[1]
-
-    # Verify token and get user
-    with pg.get_conn() as conn:
-        user = verify_token(conn, token)
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-        # Save file to uploads directory
-        suffix = Path(file.filename).suffix or ".bin"
-        safe_name = f"user_{user['id']}_{file.filename}"
-        dest_path = UPLOAD_DIR / safe_name
-
-        content = await file.read()
-        dest_path.write_bytes(content)
+    # Save file to the content-addressed store
+    stored = await _store_or_413(file)
 
+    async with pg.connection() as conn:
         # Record image metadata in DB
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO images (user_id, file_path) VALUES (%s, %s) RETURNING id",
-                (user["id"], str(dest_path))
-            )
-            img_id = cur.fetchone()[0]
-            conn.commit()
+        async with conn.cursor() as cur:
+            img_id = (await insert_images(cur, user["id"], [stored]))[0]
+        await conn.commit()
 
-    return {"message": "Upload successful", "image_id": img_id, "path": str(dest_path)}
+    if THUMBNAIL_CONFIG["ON_UPLOAD"]:
+        thumbnailer.warm([stored.path])
+
+    return {
+        "message": "Upload successful",
+        "image_id": img_id,
+        "path": str(stored.path),
+        "content_hash": stored.content_hash,
+    }
 
 
 @router.post("/batch")
 async def upload_batch(
     files: list[UploadFile] = File(...),
-    authorization: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user),
     batch_name: Optional[str] = None,
 ):
-    # Expect Authorization: Bearer <token>
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ", 1)[1]
-
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    with pg.get_conn() as conn:
-        user = verify_token(conn, token)
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
+    # Write all files concurrently before touching the DB
+    stored_files = await asyncio.gather(*(_store_or_413(f) for f in files))
 
-        # Optional: create a batch record
-        batch_id = None
-        if batch_name:
-            with conn.cursor() as cur:
-                cur.execute(
+    # Batch row and every image row go in one transaction
+    async with pg.connection() as conn:
+        async with conn.cursor() as cur:
+            # Optional: create a batch record
+            batch_id = None
+            if batch_name:
+                await cur.execute(
                     "INSERT INTO image_batches (user_id, batch_name) VALUES (%s, %s) RETURNING id",
                     (user["id"], batch_name)
                 )
-                batch_id = cur.fetchone()[0]
-                conn.commit()
-
-        saved = []
-        for f in files:
-            safe_name = f"user_{user['id']}_{f.filename}"
-            dest_path = UPLOAD_DIR / safe_name
-            content = await f.read()
-            dest_path.write_bytes(content)
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO images (user_id, file_path, batch_id) VALUES (%s, %s, %s) RETURNING id",
-                    (user["id"], str(dest_path), batch_id)
-                )
-                img_id = cur.fetchone()[0]
-                conn.commit()
-            saved.append({"image_id": img_id, "path": str(dest_path)})
+                batch_id = (await cur.fetchone())[0]
+
+            image_ids = await insert_images(cur, user["id"], stored_files, batch_id)
+        await conn.commit()
+
+    if THUMBNAIL_CONFIG["ON_UPLOAD"]:
+        thumbnailer.warm([stored.path for stored in stored_files])
 
-    return {"message": "Batch upload successful", "batch_id": batch_id, "items": saved}
\ No newline at end of file
+    saved = [
+        {"image_id": img_id, "path": str(stored.path), "content_hash": stored.content_hash}
+        for img_id, stored in zip(image_ids, stored_files)
+    ]
+    return {"message": "Batch upload successful", "batch_id": batch_id, "items": saved}
@@ -3,7 +3,12 @@ from fastapi.testclient import TestClient
 import sys
 from pathlib import Path
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
+import secrets
+
+import psycopg
+from psycopg.conninfo import make_conninfo
 
 # Ensure project root is on sys.path so 'backend' package imports work
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -12,13 +17,20 @@ if str(PROJECT_ROOT) not in sys.path:
 
 # Disable real DB pool initialization for tests
 os.environ.setdefault("DISABLE_DB_INIT", "1")
+# Preprocess pages inline rather than spawning worker processes
+os.environ.setdefault("PREPROCESS_WORKERS", "0")
+os.environ.setdefault("THUMBNAIL_WORKERS", "0")
+os.environ.setdefault("THUMBNAIL_ON_UPLOAD", "0")
 
 from backend.db import database as db_module
+from backend.db.migrate import MIGRATIONS_DIR
 from backend.core import authentication as auth_module
 from backend.api import create_app
 import backend.routers.tex as tex_router
+import backend.routers.images as images_router
 import backend.routers.upload as upload_router
 import backend.routers.auth as auth_router
+import backend.routers.dependencies as deps_router
 
 
 class FakeCursor:
@@ -27,7 +39,7 @@ class FakeCursor:
         self._base_rows = list(rows or [])
         self._rows = list(self._base_rows)
 
-    def execute(self, query, params=None):
+    async def execute(self, query, params=None):
         self._last_query = (query, params)
         self._rows = self._apply_query(query, params)
 
@@ -41,6 +53,10 @@ class FakeCursor:
         p = params or ()
         rows = list(self._base_rows)
 
+        # Transcription cache lookups: nothing cached unless a test says so
+        if "from tex_codes" in q:
+            return []
+
         # /tex/images-to-latex: SELECT id, file_path ... WHERE id = ANY(%s) AND user_id = %s ORDER BY id
         if "where id = any" in q and p:
             wanted = set(p[0] or [])
@@ -48,24 +64,16 @@ class FakeCursor:
             rows.sort(key=lambda r: r[0])
             return rows
 
-        # /tex/images: list images, optional batch filter, plus LIMIT/OFFSET and ORDER BY uploaded_at DESC, id DESC
+        # /tex/images: list images, optional batch filter and keyset cursor, plus LIMIT/OFFSET and ORDER BY uploaded_at DESC, id DESC
         if "from images" in q and "where user_id" in q and p:
-            batch_id = None
-            limit = None
-            offset = 0
-
-            if "batch_id = %s" in q:
-                # (user_id, batch_id, limit, offset)
-                if len(p) >= 4:
-                    batch_id = p[1]
-                    limit = p[2]
-                    offset = p[3]
-            else:
-                # (user_id, limit, offset)
-                if len(p) >= 3:
-                    limit = p[1]
-                    offset = p[2]
-
+            # (user_id, [batch_id], [after_uploaded_at, after_id], limit, offset)
+            rest = list(p[1:])
+            batch_id = rest.pop(0) if "batch_id = %s" in q else None
+            after = (rest.pop(0), rest.pop(0)) if "(uploaded_at, id) <" in q else None
+            limit, offset = (rest + [None, 0])[:2]
+
+            if after is not None:
+                rows = [r for r in rows if (r[2] or datetime.min, r[0]) < after]
             if batch_id is not None:
                 rows = [r for r in rows if len(r) >= 4 and r[3] == batch_id]
 
@@ -98,16 +106,16 @@ class FakeCursor:
 
         return list(self._base_rows)
 
-    def fetchall(self):
+    async def fetchall(self):
         return self._rows
 
-    def fetchone(self):
+    async def fetchone(self):
         return self._rows[0] if self._rows else None
 
-    def __enter__(self):
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc, tb):
+    async def __aexit__(self, exc_type, exc, tb):
         return False
 
 
@@ -118,14 +126,11 @@ class FakeConn:
     def cursor(self, *args, **kwargs):
         return FakeCursor(self._rows)
 
-    def commit(self):
+    async def commit(self):
         pass
 
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        return False
+    async def rollback(self):
+        pass
 
 
 class FakePG:
@@ -134,10 +139,12 @@ class FakePG:
         self._rows = []
 
     def get_conn(self):
+        # Tests may replace this to hand out a custom connection
         return FakeConn(self._rows)
 
-    def put_conn(self, conn):
-        pass
+    @asynccontextmanager
+    async def connection(self):
+        yield self.get_conn()
 
 
 @pytest.fixture()
@@ -147,22 +154,62 @@ def fake_pg():
 
 @pytest.fixture()
 def fake_verify_token():
-    def _verify(_conn, token):
+    async def _verify(_conn, token):
         if token == "valid":
             return {"id": 1, "username": "tester"}
         return None
     return _verify
 
 
+@pytest.fixture()
+def upload_dir(tmp_path, monkeypatch):
+    # Route uploads into a per-test temp directory
+    monkeypatch.setattr(upload_router, "UPLOAD_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    auth_module.token_cache.clear()
+    yield
+    auth_module.token_cache.clear()
+
+
 @pytest.fixture()
 def client(monkeypatch, fake_pg, fake_verify_token):
     # Apply monkeypatches BEFORE app creation so routers get patched deps
     monkeypatch.setattr(db_module, "pg", fake_pg)
     # Patch router-local references to pg and verify_token as they were imported directly
     monkeypatch.setattr(tex_router, "pg", fake_pg)
+    monkeypatch.setattr(images_router, "pg", fake_pg)
     monkeypatch.setattr(upload_router, "pg", fake_pg)
     monkeypatch.setattr(auth_router, "pg", fake_pg)
-    monkeypatch.setattr(tex_router, "verify_token", fake_verify_token)
-    monkeypatch.setattr(upload_router, "verify_token", fake_verify_token)
+    monkeypatch.setattr(deps_router, "pg", fake_pg)
+    monkeypatch.setattr(deps_router, "verify_token", fake_verify_token)
     app = create_app()
     return TestClient(app)
+
+
+SCHEMA_SQL = MIGRATIONS_DIR.parent / "schema.sql"
+
+# Real-database tests (marked needs_db) run only when a scratch Postgres is provided
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture()
+def scratch_schema():
+    """Conninfo for a fresh Postgres schema with the tables of schema.sql but
+    none of its indexes, i.e. a database from before the migrations."""
+    schema = f"migrate_test_{secrets.token_hex(4)}"
+    tables = "\n".join(
+        line for line in SCHEMA_SQL.read_text().splitlines() if not line.startswith("CREATE INDEX")
+    )
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"SET search_path TO {schema}")
+        conn.execute(tables)
+    try:
+        yield make_conninfo(TEST_DATABASE_URL, options=f"-c search_path={schema}")
+    finally:
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
@@ -0,0 +1,165 @@
+"""A local stand-in for the Gemini REST API.
+
+Serves generateContent and streamGenerateContent on 127.0.0.1 from a
+background thread so the real google-genai client can be pointed at it
+(AI_CONFIG["BASE_URL"]). Each request takes the next scripted Reply, or the
+default one when the script is empty, which makes it usable both for
+fault-injection tests and, with a fixed latency, for load tests.
+"""
+
+import json
+import re
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LATEX = "\\documentclass{article}\n\\begin{document}\nFake page.\n\\end{document}\n"
+
+_PATH = re.compile(r"^/[^/]+/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+
+
+@dataclass
+class Reply:
+    status: int = 200
+    delay: float = 0.0
+    text: str = DEFAULT_LATEX
+    # Streaming only: split text into this many pieces, chunk_delay apart
+    chunks: int = 3
+    chunk_delay: float = 0.0
+
+
+@dataclass
+class Request:
+    model: str
+    method: str
+    body: dict = field(repr=False)
+    size: int = 0
+
+
+def _response_json(text: str, prompt_bytes: int) -> dict:
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_bytes // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": prompt_bytes // 4 + len(text) // 4,
+        },
+    }
+
+
+class FakeGemini:
+    def __init__(self, default: Reply | None = None):
+        self.default = default or Reply()
+        self.script: deque[Reply] = deque()
+        self.requests: list[Request] = []
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def enqueue(self, *replies: Reply):
+        with self._lock:
+            self.script.extend(replies)
+
+    def _next_reply(self, request: Request) -> Reply:
+        with self._lock:
+            self.requests.append(request)
+            return self.script.popleft() if self.script else self.default
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeGemini":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Small responses are written in pieces; don't let Nagle delay them
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                match = _PATH.match(self.path)
+                if not match:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                    return
+                request = Request(match["model"], match["method"], json.loads(raw or b"{}"), len(raw))
+                reply = fake._next_reply(request)
+                time.sleep(reply.delay)
+                if reply.status != 200:
+                    self._send_json(reply.status, {
+                        "error": {"code": reply.status, "message": "Injected failure", "status": "UNAVAILABLE"},
+                    })
+                elif request.method == "generateContent":
+                    self._send_json(200, _response_json(reply.text, request.size))
+                else:
+                    self._send_stream(reply, request.size)
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, reply: Reply, prompt_bytes: int):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                step = max(1, -(-len(reply.text) // max(1, reply.chunks)))
+                for start in range(0, len(reply.text), step):
+                    payload = _response_json(reply.text[start:start + step], prompt_bytes)
+                    self.wfile.write(f"data: {json.dumps(payload)}\r\n\r\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(reply.chunk_delay)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeGemini":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Standalone mode for load tests: python -m backend.tests.fake_gemini --latency 2
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake Gemini API server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    args = parser.parse_args()
+    server = FakeGemini(Reply(delay=args.latency)).start(port=args.port)
+    print(f"Fake Gemini listening on {server.url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -11,7 +11,7 @@ def test_register_requires_username_and_password(client):
 def test_register_success_returns_user_id(client, monkeypatch):
 	import backend.routers.auth as auth_router
 
-	def fake_create_user(conn, username, password, email=None):
+	async def fake_create_user(conn, username, password, email=None):
 		assert username == "alice"
 		assert password == "pw"
 		assert email == "a@example.com"
@@ -32,7 +32,7 @@ def test_register_success_returns_user_id(client, monkeypatch):
 def test_register_duplicate_username_or_email_returns_400(client, monkeypatch):
 	import backend.routers.auth as auth_router
 
-	def fake_create_user(_conn, _username, _password, _email=None):
+	async def fake_create_user(_conn, _username, _password, _email=None):
 		raise Exception("duplicate key value violates unique constraint")
 
 	monkeypatch.setattr(auth_router, "create_user", fake_create_user)
@@ -51,7 +51,7 @@ def test_login_requires_username_and_password(client):
 def test_login_invalid_credentials_returns_401(client, monkeypatch):
 	import backend.routers.auth as auth_router
 
-	def fake_authenticate_user(_conn, _username, _password):
+	async def fake_authenticate_user(_conn, _username, _password):
 		return None
 
 	monkeypatch.setattr(auth_router, "authenticate_user", fake_authenticate_user)
@@ -64,12 +64,12 @@ def test_login_invalid_credentials_returns_401(client, monkeypatch):
 def test_login_success_returns_user_and_token(client, monkeypatch):
 	import backend.routers.auth as auth_router
 
-	def fake_authenticate_user(_conn, username, password):
+	async def fake_authenticate_user(_conn, username, password):
 		assert username == "alice"
 		assert password == "pw"
 		return {"id": 1, "username": "alice", "email": "a@example.com"}
 
-	def fake_get_token(_conn, user_id, ttl_minutes=60):
+	async def fake_get_token(_conn, user_id, ttl_minutes=60):
 		assert user_id == 1
 		assert ttl_minutes == 60
 		return "tok_123"
@@ -82,4 +82,17 @@ def test_login_success_returns_user_and_token(client, monkeypatch):
 	data = r.json()
 	assert data["message"] == "Login successful"
 	assert data["user"]["username"] == "alice"
-	assert data["token"] == "tok_123"
\ No newline at end of file
+	assert data["token"] == "tok_123"
+
+def test_login_returns_503_when_hashing_pool_is_full(client, monkeypatch):
+	import backend.routers.auth as auth_router
+	from backend.core.hashing import HashingPoolFull
+
+	async def fake_authenticate_user(_conn, _username, _password):
+		raise HashingPoolFull("full")
+
+	monkeypatch.setattr(auth_router, "authenticate_user", fake_authenticate_user)
+
+	r = client.post("/auth/login", json={"username": "alice", "password": "pw"})
+	assert r.status_code == 503
+	assert r.headers.get("retry-after") == "1"
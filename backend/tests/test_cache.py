@@ -0,0 +1,97 @@
+import time
+
+from backend.core.authentication import token_cache
+from backend.core.cache import TTLCache
+
+
+### ========= Tests for TTLCache ========== ###
+
+def test_ttl_cache_counts_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_entry_ttl_is_capped_by_default_ttl():
+    cache = TTLCache(maxsize=10, ttl_seconds=0.05)
+    cache.put("a", 1, ttl_seconds=3600)
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_skips_already_expired_entries():
+    cache = TTLCache(maxsize=10, ttl_seconds=60)
+    cache.put("a", 1, ttl_seconds=-5)
+    assert len(cache) == 0
+
+
+def test_ttl_cache_invalidate_where():
+    cache = TTLCache(maxsize=10, ttl_seconds=60)
+    cache.put("t1", {"id": 1})
+    cache.put("t2", {"id": 1})
+    cache.put("t3", {"id": 2})
+    assert cache.invalidate_where(lambda user: user["id"] == 1) == 2
+    assert cache.get("t3") == {"id": 2}
+
+
+### ========= Tests for the cached auth dependency ========== ###
+
+def test_cached_token_skips_verify_token(client, fake_pg, monkeypatch):
+    import backend.routers.dependencies as deps_router
+
+    calls = []
+
+    async def counting_verify(_conn, token):
+        calls.append(token)
+        user = {"id": 1, "username": "tester"}
+        token_cache.put(token, user)
+        return user
+
+    monkeypatch.setattr(deps_router, "verify_token", counting_verify)
+
+    for _ in range(3):
+        r = client.get("/tex/images", headers={"Authorization": "Bearer hot"})
+        assert r.status_code == 200
+    assert calls == ["hot"]
+    assert token_cache.stats()["hits"] == 2
+
+
+def test_logout_revokes_and_uncaches_token(client, monkeypatch):
+    import backend.routers.auth as auth_router
+
+    revoked = []
+
+    async def fake_revoke_token(_conn, token):
+        revoked.append(token)
+        token_cache.invalidate(token)
+        return True
+
+    monkeypatch.setattr(auth_router, "revoke_token", fake_revoke_token)
+    token_cache.put("tok", {"id": 1, "username": "tester"})
+
+    r = client.post("/auth/logout", headers={"Authorization": "Bearer tok"})
+    assert r.status_code == 200
+    assert revoked == ["tok"]
+    assert token_cache.get("tok") is None
+
+
+def test_logout_requires_auth(client):
+    r = client.post("/auth/logout")
+    assert r.status_code == 401
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import pytest
+
+from backend.db.database import DatabaseManager, worker_pool_size
+
+
+class FakePool:
+    max_size = 2
+
+    def __init__(self):
+        self.returned = []
+        self.rolled_back = []
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = object()
+        try:
+            yield conn
+        except BaseException:
+            self.rolled_back.append(conn)
+            raise
+        finally:
+            self.returned.append(conn)
+
+    def get_stats(self):
+        return {"pool_size": 2, "pool_available": 2 - len(self.returned)}
+
+
+def make_db(**kwargs):
+    db = DatabaseManager(conninfo="dbname=unused", **kwargs)
+    db._pool = FakePool()
+    return db
+
+
+def test_lease_returns_connection_and_records_timings():
+    db = make_db()
+
+    async def main():
+        async with db.connection():
+            assert db.in_use == 1
+
+    asyncio.run(main())
+    stats = db.stats()
+    assert stats["in_use"] == 0
+    assert stats["leases"] == 1
+    assert stats["wait_seconds"]["count"] == 1
+    assert stats["lease_seconds"]["count"] == 1
+    assert len(db._pool.returned) == 1
+
+
+def test_lease_rolls_back_and_returns_on_error():
+    db = make_db()
+
+    async def main():
+        async with db.connection():
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+    assert db.in_use == 0
+    assert len(db._pool.rolled_back) == 1
+    assert len(db._pool.returned) == 1
+
+
+def test_long_lease_logs_leak_warning(caplog):
+    db = make_db(lease_warn_seconds=0.01)
+
+    async def main():
+        async with db.connection():
+            await asyncio.sleep(0.05)
+
+    with caplog.at_level(logging.WARNING, logger="backend.db.database"):
+        asyncio.run(main())
+    assert db.leak_warnings == 1
+    assert "still held" in caplog.text
+
+
+def test_short_lease_does_not_warn():
+    db = make_db(lease_warn_seconds=5)
+
+    async def main():
+        async with db.connection():
+            pass
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert db.leak_warnings == 0
+
+
+def test_worker_pool_size_splits_connection_budget():
+    assert worker_pool_size(workers=2, budget=40, pool_max=10) == 10
+    # 40 // 6, less the revocation feed's connection
+    assert worker_pool_size(workers=6, budget=40, pool_max=10) == 5
+    assert worker_pool_size(workers=64, budget=40, pool_max=10) == 1
+    # A single worker still stops at the per-worker cap
+    assert worker_pool_size(workers=1, budget=90, pool_max=10) == 10
+    # 16 cores with the defaults stay under Postgres' max_connections=100,
+    # counting each worker's revocation feed connection
+    assert 16 * (worker_pool_size(workers=16, budget=90, pool_max=10) + 1) <= 90
+    # No budget: every worker gets the configured pool size
+    assert worker_pool_size(workers=8, budget=0, pool_max=10) == 10
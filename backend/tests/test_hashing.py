@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.core.authentication import hash_password, verify_password
+from backend.core.hashing import HashingPool, HashingPoolFull
+
+
+def test_hashing_pool_runs_off_the_event_loop():
+    pool = HashingPool(workers=2, queue_size=2)
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        worker_thread = await pool.run(lambda: threading.current_thread().name)
+        return loop_thread, worker_thread
+
+    try:
+        loop_thread, worker_thread = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert worker_thread != loop_thread
+    assert worker_thread.startswith("hashing")
+
+
+def test_hashing_pool_hashes_and_verifies():
+    pool = HashingPool(workers=1, queue_size=0)
+
+    async def main():
+        hashed, _salt = await pool.run(hash_password, "pw")
+        return await pool.run(verify_password, "pw", hashed)
+
+    try:
+        assert asyncio.run(main()) is True
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_pool_rejects_calls_beyond_capacity():
+    pool = HashingPool(workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def main():
+        blocked = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.pending == 2
+        with pytest.raises(HashingPoolFull):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(main())
+    finally:
+        release.set()
+        pool.shutdown()
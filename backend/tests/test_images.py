@@ -0,0 +1,120 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.core.http_cache import etag_matches, not_modified
+from backend.core.storage import content_path
+from backend.core.thumbnails import thumbnail_etag, thumbnailer
+
+AUTH = {"Authorization": "Bearer valid"}
+
+
+@pytest.fixture()
+def stored_image(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnailer, "cache_dir", str(tmp_path / "thumbs"))
+    content_hash = "ab" * 32
+    path = content_path(tmp_path / "images", content_hash, ".png")
+    path.parent.mkdir(parents=True)
+    Image.new("RGB", (2400, 1600), "white").save(path)
+    return path, content_hash
+
+
+def test_thumbnail_is_small_and_cacheable(client, fake_pg, stored_image):
+    path, content_hash = stored_image
+    fake_pg._rows = [(str(path), content_hash)]
+
+    r = client.get("/images/1/thumb", headers=AUTH)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/jpeg"
+    assert r.headers["etag"] == thumbnail_etag(content_hash)
+    assert "immutable" in r.headers["cache-control"]
+    thumb = Path(thumbnailer.cache_dir)
+    [saved] = list(thumb.rglob("*.jpg"))
+    assert len(r.content) == saved.stat().st_size < path.stat().st_size
+    with Image.open(saved) as img:
+        assert max(img.size) == thumbnailer.settings.max_dimension
+
+
+def test_thumbnail_revalidation_is_not_modified(client, fake_pg, stored_image):
+    path, content_hash = stored_image
+    fake_pg._rows = [(str(path), content_hash)]
+
+    r = client.get("/images/1/thumb", headers={**AUTH, "If-None-Match": thumbnail_etag(content_hash)})
+
+    assert r.status_code == 304
+    assert r.content == b""
+    # Answered from the ETag alone; nothing was generated
+    assert not Path(thumbnailer.cache_dir).exists()
+
+
+def test_thumbnail_of_unknown_image_is_404(client, fake_pg):
+    fake_pg._rows = []
+    assert client.get("/images/99/thumb", headers=AUTH).status_code == 404
+
+
+def test_warm_generates_in_background(stored_image):
+    path, _ = stored_image
+
+    async def main():
+        thumbnailer.warm([path])
+        await asyncio.gather(*thumbnailer._background)
+
+    asyncio.run(main())
+    assert len(list(Path(thumbnailer.cache_dir).rglob("*.jpg"))) == 1
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_original_download_and_revalidation(client, fake_pg, stored_image):
+    path, content_hash = stored_image
+    fake_pg._rows = [(str(path), content_hash)]
+
+    r = client.get("/images/1", headers=AUTH)
+    assert r.status_code == 200
+    assert r.content == path.read_bytes()
+    assert r.headers["etag"] == f'"{content_hash}"'
+    assert r.headers["accept-ranges"] == "bytes"
+
+    r = client.get("/images/1", headers={**AUTH, "If-None-Match": f'"{content_hash}"'})
+    assert r.status_code == 304
+
+    r = client.get("/images/1", headers={**AUTH, "If-Modified-Since": r.headers["last-modified"]})
+    assert r.status_code == 304
+
+
+def test_original_download_range_and_if_range(client, fake_pg, stored_image):
+    path, content_hash = stored_image
+    fake_pg._rows = [(str(path), content_hash)]
+    data = path.read_bytes()
+
+    r = client.get("/images/1", headers={**AUTH, "Range": "bytes=10-19"})
+    assert r.status_code == 206
+    assert r.content == data[10:20]
+    assert r.headers["content-range"] == f"bytes 10-19/{len(data)}"
+
+    # Resuming against our ETag gets the range; a stale ETag gets the whole file
+    r = client.get("/images/1", headers={**AUTH, "Range": "bytes=10-", "If-Range": f'"{content_hash}"'})
+    assert r.status_code == 206
+    assert r.content == data[10:]
+    r = client.get("/images/1", headers={**AUTH, "Range": "bytes=10-", "If-Range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == data
+
+
+def test_not_modified_prefers_if_none_match():
+    from starlette.datastructures import Headers
+
+    since = "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert not_modified(Headers({"if-modified-since": since}), '"a"', last_modified=1735689600)
+    assert not not_modified(Headers({"if-modified-since": since}), '"a"', last_modified=1735689601)
+    # A non-matching ETag means modified, whatever the date says
+    assert not not_modified(Headers({"if-none-match": '"b"', "if-modified-since": since}), '"a"', 0)
+    assert not not_modified(Headers({"if-modified-since": "garbage"}), '"a"', 0)
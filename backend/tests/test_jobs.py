@@ -0,0 +1,303 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+import backend.routers.tex as tex_router
+from backend.core.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, JobQueueFull, create_job
+
+
+class JobsCursor:
+    """Just enough of the transcription_jobs/tex_codes SQL for the queue."""
+
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    async def execute(self, query, params=None):
+        q = " ".join(query.split())
+        db = self.db
+        if q.startswith("INSERT INTO transcription_jobs"):
+            user_id, status, image_ids, paths, warning = params
+            job_id = len(db.jobs) + 1
+            db.jobs[job_id] = {
+                "user_id": user_id, "status": status, "image_ids": image_ids,
+                "file_paths": paths, "warning": warning, "error": None, "tex_code_id": None,
+            }
+            self._rows = [(job_id,)]
+        elif "SET status = %s, started_at = CURRENT_TIMESTAMP" in q:
+            status, job_id, expected = params
+            job = db.jobs.get(job_id)
+            if job and job["status"] == expected:
+                job["status"] = status
+                self._rows = [(job["user_id"], job["file_paths"])]
+            else:
+                self._rows = []
+        elif q.startswith("INSERT INTO tex_codes"):
+            db.tex_codes.append(params[1])
+            self._rows = [(len(db.tex_codes),)]
+        elif "SET status = %s, tex_code_id = %s" in q:
+            status, tex_code_id, job_id = params
+            db.jobs[job_id].update(status=status, tex_code_id=tex_code_id)
+        elif "SET status = %s, error = %s" in q:
+            status, error, job_id = params
+            db.jobs[job_id].update(status=status, error=error)
+        elif "SET status = %s, started_at = NULL WHERE id = ANY" in q:
+            status, job_ids, expected = params
+            for job_id in job_ids:
+                if db.jobs[job_id]["status"] == expected:
+                    db.jobs[job_id]["status"] = status
+        elif "SET status = %s, started_at = NULL" in q:
+            self._rows = []
+        elif q.startswith("SELECT id FROM transcription_jobs"):
+            status, after, limit = params
+            db.selects += 1
+            self._rows = [(i,) for i, job in sorted(db.jobs.items()) if job["status"] == status and i > after][:limit]
+        else:
+            raise AssertionError(f"unexpected query: {q}")
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return self._rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class JobsDB:
+    def __init__(self):
+        self.jobs = {}
+        self.tex_codes = []
+        self.selects = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self
+
+    def cursor(self, *args, **kwargs):
+        return JobsCursor(self)
+
+    async def commit(self):
+        pass
+
+
+def run_jobs(queue, db, *paths_per_job):
+    async def main():
+        await queue.start(db)
+        ids = []
+        for paths in paths_per_job:
+            job_id = await create_job(db, 1, [1], paths)
+            queue.submit(job_id)
+            ids.append(job_id)
+        await queue._queue.join()
+        await queue.stop()
+        return ids
+
+    return asyncio.run(main())
+
+
+def test_worker_transcribes_and_stores_result():
+    db = JobsDB()
+    async def transcribe(paths):
+        return "TEX:" + ",".join(paths)
+
+    queue = JobQueue(transcribe=transcribe, workers=2, queue_size=4)
+
+    ids = run_jobs(queue, db, ["a.png"], ["b.png", "c.png"])
+
+    assert [db.jobs[i]["status"] for i in ids] == [DONE, DONE]
+    assert sorted(db.tex_codes) == ["TEX:a.png", "TEX:b.png,c.png"]
+
+
+def test_worker_records_failure():
+    db = JobsDB()
+
+    async def broken(paths):
+        raise RuntimeError("model unavailable")
+
+    queue = JobQueue(transcribe=broken, workers=1, queue_size=1)
+    [job_id] = run_jobs(queue, db, ["a.png"])
+
+    assert db.jobs[job_id]["status"] == FAILED
+    assert db.jobs[job_id]["error"] == "model unavailable"
+
+
+def test_worker_fails_job_when_storing_result_fails(monkeypatch):
+    from backend.core import transcriptions
+
+    db = JobsDB()
+
+    async def transcribe(paths):
+        return "TEX"
+
+    async def broken_store(*_args):
+        raise RuntimeError("statement timeout")
+
+    monkeypatch.setattr(transcriptions, "store", broken_store)
+    queue = JobQueue(transcribe=transcribe, workers=1, queue_size=1)
+    [job_id] = run_jobs(queue, db, ["a.png"])
+
+    assert db.jobs[job_id]["status"] == FAILED
+    assert db.jobs[job_id]["error"] == "statement timeout"
+
+
+def test_start_requeues_pending_jobs():
+    db = JobsDB()
+    for job_id in range(1, 8):
+        db.jobs[job_id] = {"user_id": 1, "status": QUEUED, "image_ids": [1], "file_paths": [f"{job_id}.png"],
+                           "warning": None, "error": None, "tex_code_id": None}
+    async def transcribe(paths):
+        await asyncio.sleep(0)
+        return "TEX"
+
+    # A backlog bigger than the queue is loaded a queueful at a time
+    queue = JobQueue(transcribe=transcribe, workers=2, queue_size=3)
+
+    async def main():
+        await queue.start(db)
+        while any(job["status"] != DONE for job in db.jobs.values()):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+
+    assert len(db.tex_codes) == 7
+    assert queue._backlog_after is None
+    # 3 + 3 + 1, then the short load shows the backlog is gone
+    assert db.selects == 3
+
+
+def test_submit_rejects_when_full():
+    queue = JobQueue(transcribe=None, workers=0, queue_size=1)
+
+    async def main():
+        await queue.start(JobsDB())
+        queue.submit(1)
+        try:
+            queue.submit(2)
+        finally:
+            await queue.stop()
+
+    with pytest.raises(JobQueueFull):
+        asyncio.run(main())
+
+
+def drain_after_start(transcribe, timeout: float, jobs: int = 2):
+    # One worker: the first job is running when drain starts, the rest wait
+    db = JobsDB()
+    queue = JobQueue(transcribe=transcribe, workers=1, queue_size=4)
+
+    async def main():
+        await queue.start(db)
+        for _ in range(jobs):
+            queue.submit(await create_job(db, 1, [1], ["a.png"]))
+        while not queue._busy:
+            await asyncio.sleep(0.01)
+        await queue.drain(timeout=timeout)
+        with pytest.raises(JobQueueFull):
+            queue.submit(99)
+
+    asyncio.run(main())
+    return db
+
+
+def test_drain_lets_running_job_finish():
+    async def transcribe(paths):
+        await asyncio.sleep(0.05)
+        return "TEX"
+
+    db = drain_after_start(transcribe, timeout=5)
+
+    assert db.jobs[1]["status"] == DONE
+    # Never started; still queued in the table for the next process
+    assert db.jobs[2]["status"] == QUEUED
+
+
+def test_drain_requeues_jobs_still_running_at_timeout():
+    async def transcribe(paths):
+        await asyncio.sleep(60)
+
+    db = drain_after_start(transcribe, timeout=0.05, jobs=1)
+
+    assert db.jobs[1]["status"] == QUEUED
+
+
+### ========= Routes ========== ###
+
+class FakeQueue:
+    running = True
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, job_id):
+        self.submitted.append(job_id)
+
+
+def test_submit_job_returns_id(client, fake_pg, fake_verify_token, monkeypatch):
+    fake_pg._rows = [(1, "uploads/images/a.png")]
+    queue = FakeQueue()
+    monkeypatch.setattr(tex_router, "job_queue", queue)
+
+    async def fake_create_job(conn, user_id, image_ids, paths, warning=None):
+        assert (user_id, image_ids, paths) == (1, [1], ["uploads/images/a.png"])
+        assert warning == "Some image IDs not found or not owned: [2]"
+        return 42
+
+    monkeypatch.setattr(tex_router, "create_job", fake_create_job)
+
+    r = client.post("/tex/jobs", headers={"Authorization": "Bearer valid"}, json={"image_ids": [1, 2]})
+    assert r.status_code == 202
+    assert r.json()["job_id"] == 42
+    assert queue.submitted == [42]
+
+
+def test_submit_job_503_without_workers(client, fake_pg, fake_verify_token, monkeypatch):
+    fake_pg._rows = [(1, "uploads/images/a.png")]
+    queue = FakeQueue()
+    queue.running = False
+    monkeypatch.setattr(tex_router, "job_queue", queue)
+
+    r = client.post("/tex/jobs", headers={"Authorization": "Bearer valid"}, json={"image_ids": [1]})
+    assert r.status_code == 503
+
+
+def _fake_get_job(job):
+    async def _get(conn, job_id, user_id):
+        return job if job and job_id == job["id"] else None
+    return _get
+
+
+def test_job_status_and_result(client, fake_verify_token, monkeypatch):
+    job = {
+        "id": 7, "status": DONE, "image_ids": [1], "warning": None, "error": None,
+        "created_at": datetime(2025, 12, 14), "started_at": datetime(2025, 12, 14),
+        "finished_at": datetime(2025, 12, 14), "code": "\\documentclass{article}",
+    }
+    monkeypatch.setattr(tex_router, "get_job", _fake_get_job(job))
+    headers = {"Authorization": "Bearer valid"}
+
+    r = client.get("/tex/jobs/7", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["status"] == DONE
+
+    r = client.get("/tex/jobs/7/result", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-tex"
+    assert r.content == b"\\documentclass{article}"
+
+    assert client.get("/tex/jobs/8", headers=headers).status_code == 404
+
+
+def test_job_result_409_while_running(client, fake_verify_token, monkeypatch):
+    job = {"id": 7, "status": RUNNING, "error": None}
+    monkeypatch.setattr(tex_router, "get_job", _fake_get_job(job))
+
+    r = client.get("/tex/jobs/7/result", headers={"Authorization": "Bearer valid"})
+    assert r.status_code == 409
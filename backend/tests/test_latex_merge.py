@@ -0,0 +1,127 @@
+import asyncio
+
+from backend.core import agent
+from backend.core.latex_merge import merge_documents, split_document
+
+CHUNK_1 = r"""```latex
+\documentclass{article}
+\usepackage{amsmath,amssymb}
+\usepackage[margin=1in]{geometry}
+\theoremstyle{definition}
+\newtheorem{definition}{Definition}
+\newcommand{\R}{\mathbb{R}}
+\title{Lecture notes}
+\begin{document}
+\maketitle
+\section{Limits}
+Page one.
+\end{document}
+```"""
+
+CHUNK_2 = r"""\documentclass{article}
+\usepackage{amsmath}
+\usepackage[a4paper]{geometry}
+\usepackage{hyperref}
+\theoremstyle{definition}
+\newtheorem{definition}{Definition}
+\newcommand{\R}{\mathbb{R}}
+\newcommand{\abs}[1]{
+  \left| #1 \right|
+}
+\title{Lecture notes, part 2}
+\begin{document}
+\maketitle
+\section{Derivatives}
+Page two.
+\end{document}"""
+
+
+def test_split_document_handles_fences_and_bare_bodies():
+    preamble, body = split_document(CHUNK_1)
+    assert preamble.startswith(r"\documentclass{article}")
+    assert body.startswith(r"\maketitle") and body.endswith("Page one.")
+    assert split_document("Just text") == ("", "Just text")
+
+
+def test_merge_single_preamble_and_ordered_bodies():
+    merged = merge_documents([CHUNK_1, CHUNK_2], labels=["Pages 1-1", "Pages 2-2"])
+
+    assert merged.count(r"\documentclass") == 1
+    assert merged.count(r"\begin{document}") == 1
+    assert merged.count(r"\end{document}") == 1
+    assert merged.count(r"\usepackage{amsmath}") == 1
+    assert r"\usepackage[margin=1in,a4paper]{geometry}" in merged
+    assert merged.count(r"\newtheorem{definition}") == 1
+    assert merged.count(r"\newcommand{\R}") == 1
+    assert "\\newcommand{\\abs}[1]{\n  \\left| #1 \\right|\n}" in merged
+    assert r"\title{Lecture notes}" in merged and "part 2" not in merged
+    assert merged.count(r"\maketitle") == 1
+    # theoremstyle must stay ahead of the theorem it styles
+    assert merged.index(r"\theoremstyle") < merged.index(r"\newtheorem")
+    assert merged.index("Page one.") < merged.index("% Pages 2-2") < merged.index("Page two.")
+    assert "```" not in merged
+
+
+def test_generate_splits_into_chunks_and_merges(monkeypatch):
+    calls = []
+    in_flight = peak = 0
+
+    async def fake_transcribe(pages):
+        nonlocal in_flight, peak
+        calls.append(pages)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        body = " ".join(pages)
+        return f"\\documentclass{{article}}\n\\usepackage{{amsmath}}\n\\begin{{document}}\n{body}\n\\end{{document}}"
+
+    monkeypatch.setattr(agent, "_transcribe", fake_transcribe)
+    pages = [f"p{i}.png" for i in range(1, 8)]
+
+    latex = asyncio.run(agent.generate_latex_from_images(pages, chunk_pages=3, parallelism=2))
+
+    assert sorted(calls) == [["p1.png", "p2.png", "p3.png"], ["p4.png", "p5.png", "p6.png"], ["p7.png"]]
+    assert peak == 2
+    assert latex.count(r"\usepackage{amsmath}") == 1
+    assert latex.index("p1.png p2.png p3.png") < latex.index("p4.png") < latex.index("% Pages 7-7")
+
+
+def test_generate_short_notebook_is_one_call(monkeypatch):
+    async def fake_transcribe(pages):
+        return "doc:" + ",".join(pages)
+
+    monkeypatch.setattr(agent, "_transcribe", fake_transcribe)
+    assert asyncio.run(agent.generate_latex_from_images(["a", "b"], chunk_pages=3)) == "doc:a,b"
+    assert asyncio.run(agent.generate_latex_from_images(["a", "b"], chunk_pages=0)) == "doc:a,b"
+
+
+def test_failed_chunk_cancels_the_others(monkeypatch):
+    started, cancelled = [], []
+
+    async def fake_transcribe(pages):
+        started.append(pages[0])
+        if pages[0] == "p1.png":
+            await asyncio.sleep(0.01)
+            raise agent.ModelUnavailable("boom")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(pages[0])
+            raise
+        return "never"
+
+    monkeypatch.setattr(agent, "_transcribe", fake_transcribe)
+    pages = [f"p{i}.png" for i in range(1, 5)]
+
+    async def main():
+        try:
+            await agent.generate_latex_from_images(pages, chunk_pages=1, parallelism=4)
+        except agent.ModelUnavailable:
+            pass
+        else:
+            raise AssertionError("expected ModelUnavailable")
+        # The other chunks were stopped before the call returned
+        return sorted(cancelled)
+
+    assert asyncio.run(main()) == ["p2.png", "p3.png", "p4.png"]
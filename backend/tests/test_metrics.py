@@ -0,0 +1,76 @@
+from backend.core.metrics import Registry
+from backend.db import database as db_module
+from backend.middleware.metrics import request_duration, requests_total
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    hits = registry.counter("hits_total", "Hits.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.callback("queue_depth", "gauge", "Depth.", lambda: 3)
+    registry.callback("absent", "gauge", "Not exported.", lambda: None)
+
+    hits.inc("/a")
+    hits.inc("/a", amount=2)
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+
+    text = registry.render()
+    assert "# TYPE hits_total counter" in text
+    assert 'hits_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/a"} 2' in text
+    assert "queue_depth 3" in text
+    assert "absent" not in text
+
+
+def test_requests_are_counted_by_route_template(client):
+    before_ok = requests_total.value("GET", "/health", "200")
+    before_401 = requests_total.value("GET", "/images/{image_id}/thumb", "401")
+    before_count = request_duration.labels("GET", "/health").count
+
+    client.get("/health")
+    client.get("/health")
+    client.get("/images/123/thumb")
+    client.get("/no/such/route")
+
+    assert requests_total.value("GET", "/health", "200") == before_ok + 2
+    assert requests_total.value("GET", "/images/{image_id}/thumb", "401") == before_401 + 1
+    assert requests_total.value("GET", "<unmatched>", "404") >= 1
+    assert request_duration.labels("GET", "/health").count == before_count + 2
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    # FakePG has no pool stats; the pool series are skipped without one
+    monkeypatch.setattr(db_module, "pg", None)
+    client.get("/health")
+
+    r = client.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in r.text
+    assert "# TYPE http_request_duration_seconds histogram" in r.text
+    assert "# TYPE model_tokens_total counter" in r.text
+
+
+def test_cache_stats_are_exported(client, monkeypatch):
+    from backend.core import authentication
+    from backend.core.cache import TTLCache
+
+    monkeypatch.setattr(authentication, "token_cache", TTLCache(maxsize=5, ttl_seconds=60))
+    monkeypatch.setattr(db_module, "pg", None)
+    authentication.token_cache.put("tok", {"id": 1})
+    authentication.token_cache.get("tok")
+    authentication.token_cache.get("other")
+
+    text = client.get("/metrics").text
+
+    assert "# TYPE auth_token_cache_hits_total counter" in text
+    assert "auth_token_cache_hits_total 1" in text
+    assert "auth_token_cache_misses_total 1" in text
+    assert "auth_token_cache_size 1" in text
+    assert "auth_token_cache_maxsize 5" in text
+    assert "# TYPE transcription_cache_evictions_total counter" in text
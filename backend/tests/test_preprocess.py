@@ -0,0 +1,59 @@
+import asyncio
+
+from PIL import Image
+
+from backend.core.preprocess import ImagePreprocessor, PreprocessSettings, preprocess_image
+
+
+def make_photo(path, size=(4000, 3000)):
+    Image.new("RGB", size, (200, 120, 40)).save(path, format="PNG")
+    return path
+
+
+def test_preprocess_downscales_and_reencodes(tmp_path):
+    src = make_photo(tmp_path / "page.png")
+    settings = PreprocessSettings(max_dimension=1000, grayscale=True, quality=70)
+
+    out = preprocess_image(str(src), str(tmp_path / "derived"), settings)
+
+    assert out.endswith(f"-{settings.tag}.jpg")
+    with Image.open(out) as img:
+        assert img.format == "JPEG"
+        assert img.mode == "L"
+        assert img.size == (1000, 750)
+
+
+def test_preprocess_reuses_cached_derivative(tmp_path):
+    src = make_photo(tmp_path / "page.png", size=(50, 50))
+    settings = PreprocessSettings(max_dimension=1000, grayscale=False, quality=80)
+
+    first = preprocess_image(str(src), str(tmp_path / "derived"), settings)
+    mtime = tmp_path.joinpath(first).stat().st_mtime_ns
+    second = preprocess_image(str(src), str(tmp_path / "derived"), settings)
+
+    assert first == second
+    assert tmp_path.joinpath(second).stat().st_mtime_ns == mtime
+    # Different settings get their own derivative
+    other = preprocess_image(str(src), str(tmp_path / "derived"), PreprocessSettings(500, False, 80))
+    assert other != first
+
+
+def test_prepare_keeps_order_and_falls_back_to_original(tmp_path):
+    good = make_photo(tmp_path / "good.png", size=(20, 10))
+    missing = tmp_path / "missing.png"
+    preprocessor = ImagePreprocessor(
+        PreprocessSettings(100, False, 80), str(tmp_path / "derived"), workers=0
+    )
+
+    out = asyncio.run(preprocessor.prepare([good, missing]))
+
+    assert out[0].endswith(".jpg")
+    assert out[1] == missing
+
+
+def test_prepare_disabled_passes_paths_through(tmp_path):
+    preprocessor = ImagePreprocessor(
+        PreprocessSettings(100, False, 80), str(tmp_path), workers=0, enabled=False
+    )
+    assert asyncio.run(preprocessor.prepare(["a.png"])) == ["a.png"]
+    assert preprocessor.variant == ""
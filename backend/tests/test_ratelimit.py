@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from backend.core.ratelimit import ModelLimiter, TokenBucket
+
+
+def test_token_bucket_spends_burst_then_waits():
+    bucket = TokenBucket(rate_per_minute=600, burst=2)  # one token per 0.1s
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+
+def test_token_bucket_disabled_never_waits():
+    bucket = TokenBucket(rate_per_minute=0)
+    assert all(bucket.try_acquire() == 0 for _ in range(100))
+
+
+def test_token_bucket_acquire_paces_calls():
+    bucket = TokenBucket(rate_per_minute=1200, burst=1)  # one token per 0.05s
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.09
+
+
+def test_model_limiter_caps_in_flight_calls():
+    limiter = ModelLimiter(max_concurrency=2, requests_per_minute=0)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    # A fresh event loop gets a fresh semaphore
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_model_limiter_zero_concurrency_means_no_cap():
+    limiter = ModelLimiter(max_concurrency=0, requests_per_minute=0)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.wait_for(asyncio.gather(*(call() for _ in range(20))), 1)
+
+    asyncio.run(main())
+    assert peak == 20
+    assert limiter.in_flight == 0
+
+
+def test_token_bucket_zero_burst_still_allows_one_call():
+    bucket = TokenBucket(rate_per_minute=60, burst=0)
+    assert bucket.try_acquire() == 0
@@ -0,0 +1,206 @@
+import asyncio
+
+import pytest
+from google.genai import errors as genai_errors
+from PIL import Image
+
+import backend.routers.tex as tex_router
+from backend.constants import AI_CONFIG
+from backend.core import agent
+from backend.core.ratelimit import ModelLimiter
+from backend.core.resilience import CircuitBreaker, CircuitOpen, ModelUnavailable, is_retryable
+from backend.tests.fake_gemini import FakeGemini, Reply
+
+
+@pytest.fixture()
+def fake_gemini(monkeypatch):
+    with FakeGemini() as server:
+        monkeypatch.setitem(AI_CONFIG, "BASE_URL", server.url)
+        monkeypatch.setitem(AI_CONFIG, "API_KEY", "test-key")
+        monkeypatch.setitem(AI_CONFIG, "CALL_TIMEOUT", 2.0)
+        monkeypatch.setitem(AI_CONFIG, "MAX_RETRIES", 2)
+        monkeypatch.setitem(AI_CONFIG, "RETRY_BASE_DELAY", 0.01)
+        monkeypatch.setitem(AI_CONFIG, "RETRY_MAX_DELAY", 0.02)
+        monkeypatch.setattr(agent, "_client", None)
+        monkeypatch.setattr(agent, "model_limiter", ModelLimiter(max_concurrency=8, requests_per_minute=0))
+        monkeypatch.setattr(agent, "model_breaker", CircuitBreaker(window=10, error_rate=0.5, min_calls=4, reset_seconds=60))
+        yield server
+
+
+@pytest.fixture()
+def page(tmp_path):
+    path = tmp_path / "page.png"
+    Image.new("RGB", (8, 8), "white").save(path)
+    return path
+
+
+def run_with_client(coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await agent.close_client()
+    return asyncio.run(main())
+
+
+def test_circuit_breaker_opens_on_error_rate_and_recovers(monkeypatch):
+    breaker = CircuitBreaker(window=4, error_rate=0.5, min_calls=4, reset_seconds=10)
+    for ok in (True, True, False):
+        breaker.before_call()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == breaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    # After the reset period a single trial call is allowed
+    monkeypatch.setattr(breaker, "_opened_at", breaker._opened_at - 11)
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+
+
+def test_retryable_classification():
+    assert is_retryable(genai_errors.ServerError(503, {"error": {"message": "x"}}))
+    assert is_retryable(genai_errors.ClientError(429, {"error": {"message": "x"}}))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(genai_errors.ClientError(400, {"error": {"message": "x"}}))
+    assert not is_retryable(ValueError())
+
+
+def test_transient_error_is_retried(fake_gemini, page):
+    fake_gemini.enqueue(Reply(status=503), Reply(status=429))
+
+    latex = run_with_client(lambda: agent.generate_latex_from_images([page]))
+
+    assert "Fake page." in latex
+    assert len(fake_gemini.requests) == 3
+
+
+def test_timeout_is_retried(fake_gemini, page, monkeypatch):
+    monkeypatch.setitem(AI_CONFIG, "CALL_TIMEOUT", 0.2)
+    fake_gemini.enqueue(Reply(delay=0.5))
+
+    latex = run_with_client(lambda: agent.generate_latex_from_images([page]))
+
+    assert "Fake page." in latex
+    assert len(fake_gemini.requests) == 2
+
+
+def test_gives_up_after_max_retries(fake_gemini, page):
+    fake_gemini.default = Reply(status=500)
+
+    with pytest.raises(ModelUnavailable):
+        run_with_client(lambda: agent.generate_latex_from_images([page]))
+    assert len(fake_gemini.requests) == 3
+
+
+def test_bad_request_is_not_retried(fake_gemini, page):
+    fake_gemini.enqueue(Reply(status=400))
+
+    with pytest.raises(genai_errors.ClientError):
+        run_with_client(lambda: agent.generate_latex_from_images([page]))
+    assert len(fake_gemini.requests) == 1
+
+
+def test_open_breaker_fails_fast(fake_gemini, page):
+    fake_gemini.default = Reply(status=503)
+
+    async def two_calls():
+        with pytest.raises(ModelUnavailable):
+            await agent.generate_latex_from_images([page])  # 3 failures
+        with pytest.raises(ModelUnavailable):
+            await agent.generate_latex_from_images([page])  # 4th failure opens it
+        with pytest.raises(CircuitOpen):
+            await agent.generate_latex_from_images([page])
+
+    run_with_client(two_calls)
+    assert len(fake_gemini.requests) == 4
+
+
+def test_stream_yields_chunks(fake_gemini, page):
+    fake_gemini.enqueue(Reply(status=503), Reply(text="abcdef", chunks=3))
+
+    async def collect():
+        return [text async for text in agent.stream_latex_from_images([page])]
+
+    assert run_with_client(collect) == ["ab", "cd", "ef"]
+    assert [r.method for r in fake_gemini.requests] == ["streamGenerateContent"] * 2
+
+
+def test_stream_retries_take_a_slot_per_attempt(fake_gemini, page, monkeypatch):
+    limiter = ModelLimiter(max_concurrency=1, requests_per_minute=0)
+    slots = []
+    real_slot = limiter.slot
+    monkeypatch.setattr(limiter, "slot", lambda: slots.append(1) or real_slot())
+    monkeypatch.setattr(agent, "model_limiter", limiter)
+    fake_gemini.enqueue(Reply(status=429), Reply(text="abcdef", chunks=3))
+
+    async def collect():
+        return [text async for text in agent.stream_latex_from_images([page])]
+
+    assert run_with_client(collect) == ["ab", "cd", "ef"]
+    assert len(slots) == 2
+    assert limiter.in_flight == 0
+
+
+def test_empty_model_output_raises(fake_gemini, page):
+    fake_gemini.enqueue(Reply(text=""), Reply(text=""))
+
+    async def stream():
+        return [text async for text in agent.stream_latex_from_images([page])]
+
+    with pytest.raises(agent.EmptyTranscription):
+        run_with_client(lambda: agent.generate_latex_from_images([page]))
+    with pytest.raises(agent.EmptyTranscription):
+        run_with_client(stream)
+
+
+def test_route_does_not_cache_empty_output(client, fake_pg, fake_verify_token, monkeypatch):
+    fake_pg._rows = [(1, "uploads/images/user_1_img1.png")]
+    stored = []
+
+    async def empty(paths):
+        raise agent.EmptyTranscription("Model returned no text: finish reason SAFETY")
+
+    async def store(*args):
+        stored.append(args)
+
+    monkeypatch.setattr(tex_router, "generate_latex_from_images", empty)
+    monkeypatch.setattr(tex_router.transcriptions, "store", store)
+
+    r = client.post("/tex/images-to-latex", headers={"Authorization": "Bearer valid"}, json={"image_ids": [1]})
+    assert r.status_code == 502
+    assert "SAFETY" in r.json()["detail"]
+    assert stored == []
+
+
+def test_route_maps_unavailable_model_to_503(client, fake_pg, fake_verify_token, monkeypatch):
+    fake_pg._rows = [(1, "uploads/images/user_1_img1.png")]
+
+    async def unavailable(paths):
+        raise CircuitOpen(12)
+
+    monkeypatch.setattr(tex_router, "generate_latex_from_images", unavailable)
+
+    r = client.post("/tex/images-to-latex", headers={"Authorization": "Bearer valid"}, json={"image_ids": [1]})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "12"
+
+
+def test_model_metrics_record_usage(fake_gemini, page):
+    prompt_before = agent.model_tokens.value("prompt")
+    ok_before = agent.model_call_duration.labels("generate", "ok").count
+    failed_before = agent.model_call_duration.labels("generate", "failed").count
+    fake_gemini.enqueue(Reply(status=503))
+
+    latex = run_with_client(lambda: agent.generate_latex_from_images([page]))
+
+    assert agent.model_call_duration.labels("generate", "failed").count == failed_before + 1
+    assert agent.model_call_duration.labels("generate", "ok").count == ok_before + 1
+    assert agent.model_tokens.value("prompt") > prompt_before
+    assert agent.model_response_bytes.value("generate") >= len(latex)
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+import psycopg
+import pytest
+
+from backend.core import authentication as auth_module
+from backend.core.cache import TTLCache
+from backend.core.revocation_feed import RevocationFeed
+from backend.core.signed_tokens import RevocationList
+from backend.db.migrate import migrate
+
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture()
+def worker_state(monkeypatch):
+    """Fresh in-memory auth state, standing in for one worker's."""
+    monkeypatch.setattr(auth_module, "token_cache", TTLCache(maxsize=100, ttl_seconds=60))
+    monkeypatch.setattr(auth_module.token_signer, "revocations", RevocationList(100))
+
+
+def _add_user(conninfo, token: str) -> int:
+    with psycopg.connect(conninfo) as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (username, email, password_hash, password_salt) "
+            "VALUES ('alice', 'a@example.com', 'x', 'x') RETURNING id"
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO tokens (user_id, token, expires_at) "
+            "VALUES (%s, %s, CURRENT_TIMESTAMP + interval '1 hour')",
+            (user_id, token),
+        )
+    return user_id
+
+
+async def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@needs_db
+def test_revocations_are_recorded_and_announced(scratch_schema, worker_state):
+    asyncio.run(migrate(scratch_schema))
+    user_id = _add_user(scratch_schema, "opaque-tok")
+    signed = auth_module.issue_signed_token({"id": user_id, "username": "alice", "email": None})
+
+    async def scenario():
+        async with await psycopg.AsyncConnection.connect(scratch_schema, autocommit=True) as listener:
+            await listener.execute(f"LISTEN {auth_module.REVOCATION_CHANNEL}")
+            async with await psycopg.AsyncConnection.connect(scratch_schema) as conn:
+                assert await auth_module.revoke_token(conn, "opaque-tok") is True
+                assert await auth_module.revoke_token(conn, "opaque-tok") is False
+                assert await auth_module.revoke_token(conn, signed) is True
+                assert await auth_module.delete_user(conn, user_id) is True
+                rows = await auth_module.load_revocations(conn)
+            ids = [int(n.payload) async for n in listener.notifies(timeout=2, stop_after=3)]
+        return rows, ids
+
+    rows, ids = asyncio.run(scenario())
+
+    assert ids == [row["id"] for row in rows]
+    assert [(r["token"], r["user_id"]) for r in rows] == [("opaque-tok", None), (None, None), (None, user_id)]
+    assert rows[1]["jti"] is not None
+    assert all(r["expires_at"] > time.time() for r in rows)
+
+
+@needs_db
+def test_feed_applies_other_workers_revocations(scratch_schema, worker_state):
+    asyncio.run(migrate(scratch_schema))
+    revocations = auth_module.token_signer.revocations
+    feed = RevocationFeed(retry_max_delay=0)
+
+    def record(column, value):
+        # What revoke_token/delete_user run in another worker
+        with psycopg.connect(scratch_schema) as conn:
+            conn.execute(
+                f"WITH recorded AS (INSERT INTO token_revocations ({column}, expires_at) "
+                "VALUES (%s, CURRENT_TIMESTAMP AT TIME ZONE 'UTC' + interval '1 hour') RETURNING id) "
+                f"SELECT pg_notify('{auth_module.REVOCATION_CHANNEL}', id::text) FROM recorded",
+                (value,),
+            )
+
+    record("jti", "before-start")
+
+    async def scenario():
+        feed.start(scratch_schema)
+        await _wait_for(lambda: feed.connected)
+        # Revoked before this worker was listening
+        assert revocations.is_revoked({"jti": "before-start", "sub": 1, "iat": 0})
+
+        auth_module.token_cache.put("opaque-tok", {"id": 1})
+        record("token", "opaque-tok")
+        await _wait_for(lambda: auth_module.token_cache.get("opaque-tok") is None)
+
+        auth_module.token_cache.put("other-tok", {"id": 7})
+        record("user_id", 7)
+        await _wait_for(lambda: auth_module.token_cache.get("other-tok") is None)
+        assert revocations.is_revoked({"jti": "x", "sub": 7, "iat": int(time.time()) - 5})
+        assert not revocations.is_revoked({"jti": "x", "sub": 7, "iat": int(time.time()) + 5})
+
+        await feed.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert feed.applied == 3
+    assert not feed.running
@@ -0,0 +1,105 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.core.timing import PhaseTimings, phase
+from backend.middleware.server_timing import ServerTimingMiddleware
+
+
+def _app(**options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        with phase("db"):
+            pass
+        with phase("model"):
+            time.sleep(0.03)
+        with phase("db"):
+            pass
+        return {"ok": True}
+
+    app.add_middleware(ServerTimingMiddleware, **options)
+    return TestClient(app)
+
+
+def test_phase_timings_header():
+    timings = PhaseTimings()
+    timings.add("db", 0.002)
+    timings.add("db", 0.001)
+    timings.add("model", 1.5)
+
+    assert timings.header(total=2.0) == 'db;dur=3.0;desc="2x", model;dur=1500.0;desc="1x", total;dur=2000.0'
+
+
+def test_phase_outside_request_is_a_no_op():
+    with phase("db"):
+        pass
+
+
+def test_server_timing_lists_phases(tmp_path):
+    client = _app(profile_dir=str(tmp_path))
+
+    r = client.get("/work")
+
+    header = r.headers["server-timing"]
+    assert 'db;dur=' in header and 'desc="2x"' in header
+    model = next(entry for entry in header.split(", ") if entry.startswith("model;"))
+    assert float(model.split("dur=")[1].split(";")[0]) >= 30
+    assert "total;dur=" in header
+    assert "x-profile-id" not in r.headers
+
+
+def test_auth_phase_on_real_routes(client):
+    r = client.get("/tex/images", headers={"Authorization": "Bearer valid"})
+
+    assert r.status_code == 200
+    assert r.headers["server-timing"].startswith("auth;dur=")
+
+
+def test_profile_requires_admin_token(tmp_path):
+    client = _app(admin_token="s3cret", profile_dir=str(tmp_path), sample_interval=0.001)
+
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+    assert client.get("/work", headers={"X-Profile": "s\xe9cret".encode("latin-1")}).status_code == 200
+    assert not list(tmp_path.iterdir())
+
+    r = client.get("/work", headers={"X-Profile": "s3cret"})
+
+    profile_id = r.headers["x-profile-id"]
+    [saved] = tmp_path.iterdir()
+    assert saved.name.endswith(f"-{profile_id}.folded")
+    # The request spent 30ms sleeping in the endpoint
+    assert "work (test_server_timing.py" in saved.read_text()
+
+
+def test_profiling_disabled_without_token(tmp_path):
+    client = _app(admin_token="", profile_dir=str(tmp_path))
+
+    r = client.get("/work", headers={"X-Profile": ""})
+
+    assert "x-profile-id" not in r.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_is_saved_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+
+    from backend.core.profiling import SamplingProfiler
+
+    client = _app(admin_token="s3cret", profile_dir=str(tmp_path), sample_interval=0.001)
+    saved_from = []
+    save = SamplingProfiler.save
+
+    def recording_save(self, directory, name):
+        saved_from.append(threading.current_thread().name)
+        return save(self, directory, name)
+
+    monkeypatch.setattr(SamplingProfiler, "save", recording_save)
+
+    client.get("/work", headers={"X-Profile": "s3cret"})
+
+    # A thread-pool thread, not the one running the event loop
+    [thread] = saved_from
+    assert "AnyIO worker thread" in thread
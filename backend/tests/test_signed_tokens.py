@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from backend.core.signed_tokens import RevocationList, TokenSigner, parse_signing_keys
+
+USER = {"id": 7, "username": "alice", "email": "a@example.com"}
+
+
+def make_signer(keys=None, active="k1"):
+    keys = keys or {"k1": b"secret-one"}
+    return TokenSigner(keys, active, RevocationList(maxsize=100))
+
+
+### ========= Tests for TokenSigner ========== ###
+
+def test_signed_token_round_trip():
+    signer = make_signer()
+    claims = signer.verify(signer.issue(USER, ttl_seconds=60))
+    assert claims["sub"] == 7
+    assert claims["usr"] == "alice"
+    assert claims["exp"] > time.time()
+
+
+def test_tampered_signed_token_is_rejected():
+    signer = make_signer()
+    kid, payload, signature = signer.issue(USER, ttl_seconds=60).split(".")
+    other = signer.issue({**USER, "id": 8}, ttl_seconds=60).split(".")[1]
+    assert signer.verify(f"{kid}.{other}.{signature}") is None
+    assert signer.verify(f"{kid}.{payload}.{signature[:-2]}xx") is None
+    assert signer.verify("not-a-token") is None
+
+
+def test_malformed_signed_tokens_are_rejected():
+    signer = make_signer()
+    kid, payload, signature = signer.issue(USER, ttl_seconds=60).split(".")
+    assert signer.verify(f"{kid}.{payload}.{signature[:-1]}\xe9") is None
+    assert signer.verify(f"{kid}.p\xe9yload.{signature}") is None
+    assert signer.verify(f"{kid}.{payload}.\ud800") is None
+    # Correctly signed, but the claims aren't an object
+    not_claims = "WzFd"  # base64url of "[1]"
+    assert signer.verify(f"{kid}.{not_claims}.{signer._sign(b'secret-one', f'{kid}.{not_claims}')}") is None
+
+
+def test_expired_signed_token_is_rejected():
+    signer = make_signer()
+    assert signer.verify(signer.issue(USER, ttl_seconds=-1)) is None
+
+
+def test_key_rotation_keeps_old_tokens_until_key_removed():
+    old = make_signer({"k1": b"secret-one"}, active="k1")
+    token = old.issue(USER, ttl_seconds=60)
+
+    rotated = make_signer({"k1": b"secret-one", "k2": b"secret-two"}, active="k2")
+    assert rotated.verify(token)["sub"] == 7
+    assert rotated.issue(USER, ttl_seconds=60).startswith("k2.")
+
+    retired = make_signer({"k2": b"secret-two"}, active="k2")
+    assert retired.verify(token) is None
+
+
+def test_revoked_signed_token_is_rejected():
+    signer = make_signer()
+    token = signer.issue(USER, ttl_seconds=60)
+    assert signer.revoke(token) is True
+    assert signer.verify(token) is None
+
+
+def test_revoke_user_rejects_tokens_issued_before():
+    signer = make_signer()
+    token = signer.issue(USER, ttl_seconds=60)
+    signer.revocations.revoke_user(7, until=int(time.time()) + 60)
+    assert signer.verify(token) is None
+
+
+def test_revocation_list_prunes_expired_entries():
+    revocations = RevocationList(maxsize=10)
+    revocations.revoke("gone", expires_at=int(time.time()) - 1)
+    revocations.revoke("live", expires_at=int(time.time()) + 60)
+    assert revocations.prune() == 1
+    assert len(revocations) == 1
+
+
+def test_full_revocation_list_keeps_live_entries(caplog):
+    revocations = RevocationList(maxsize=3)
+    now = int(time.time())
+    revocations.revoke("gone", expires_at=now - 1)
+    revocations.revoke_user(9, until=now - 1)
+    for i in range(5):
+        revocations.revoke(f"live{i}", expires_at=now + 60 + i)
+    revocations.revoke_user(7, until=now + 60)
+
+    # Expired entries made room; live ones are all still revoked
+    assert len(revocations) == 6
+    assert all(revocations.is_revoked({"jti": f"live{i}", "sub": 1, "iat": now}) for i in range(5))
+    assert revocations.is_revoked({"jti": "x", "sub": 7, "iat": now - 1})
+    assert not revocations.is_revoked({"jti": "gone", "sub": 9, "iat": now - 10})
+    # Growing past maxsize is reported once, not on every revoke
+    assert [r.levelname for r in caplog.records] == ["WARNING"]
+
+
+def test_parse_signing_keys():
+    assert parse_signing_keys("a:one, b:two") == {"a": b"one", "b": b"two"}
+    assert parse_signing_keys("") == {}
+    with pytest.raises(ValueError):
+        parse_signing_keys("missing-secret")
+
+
+### ========= Tests for signed tokens through the API ========== ###
+
+def test_login_in_signed_mode_issues_stateless_token(client, monkeypatch):
+    import backend.routers.auth as auth_router
+
+    async def fake_authenticate_user(_conn, _username, _password):
+        return dict(USER)
+
+    async def fail_get_token(*_args, **_kwargs):
+        raise AssertionError("signed mode must not persist tokens")
+
+    monkeypatch.setattr(auth_router, "authenticate_user", fake_authenticate_user)
+    monkeypatch.setattr(auth_router, "get_token", fail_get_token)
+    monkeypatch.setitem(auth_router.AUTH_CONFIG, "TOKEN_MODE", "signed")
+
+    r = client.post("/auth/login", json={"username": "alice", "password": "pw"})
+    assert r.status_code == 200
+    token = r.json()["token"]
+
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/tex/images", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/tex/images", headers=headers).status_code == 401
+
+
+def test_non_ascii_bearer_token_is_401(client):
+    headers = {"Authorization": "Bearer ephemeral.abc.d\xe9f".encode("latin-1")}
+    assert client.get("/tex/images", headers=headers).status_code == 401
+
+
+def test_signed_mode_requires_signing_keys(monkeypatch):
+    from backend.core import authentication
+
+    monkeypatch.setitem(authentication.AUTH_CONFIG, "TOKEN_MODE", "signed")
+    monkeypatch.setitem(authentication.AUTH_CONFIG, "TOKEN_SIGNING_KEYS", "")
+    with pytest.raises(RuntimeError):
+        authentication._build_token_signer()
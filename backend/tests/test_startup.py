@@ -0,0 +1,120 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from backend.core import startup as startup_module
+from backend.core.startup import Startup
+
+# Seconds allowed for "import backend.api" in a fresh interpreter (about
+# 0.6s here, most of it FastAPI); see benchmarks/bench_import_time.py
+IMPORT_BUDGET_SECONDS = 1.5
+
+
+def test_app_import_is_fast_and_skips_model_sdk():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import backend.api\n"
+        "print(time.perf_counter() - start, 'google.genai' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "DISABLE_DB_INIT": "1"}, capture_output=True, text=True, check=True,
+    )
+    seconds, sdk_loaded = result.stdout.split()
+
+    assert sdk_loaded == "False"
+    assert float(seconds) < IMPORT_BUDGET_SECONDS
+
+
+class FlakyDB:
+    conninfo = "unused"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.pings = 0
+
+    async def ping(self, timeout=None):
+        self.pings += 1
+        if self.pings <= self.failures:
+            raise ConnectionError("connection refused")
+
+
+def test_startup_retries_until_database_answers(monkeypatch):
+    started = []
+
+    async def start_jobs(db):
+        started.append("jobs")
+
+    monkeypatch.setattr(startup_module.job_queue, "start", start_jobs)
+    monkeypatch.setattr(startup_module.token_reaper, "start", lambda db: started.append("reaper"))
+    db = FlakyDB(failures=2)
+    startup = Startup(migrate_on_startup=False, retry_max_delay=0)
+
+    async def scenario():
+        startup.start(db)
+        while not startup.db_ready:
+            await asyncio.sleep(0.01)
+        await startup.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    assert db.pings == 3
+    assert started == ["jobs", "reaper"]
+    assert startup.db_error is None
+
+
+def test_ready_is_503_until_started(client, monkeypatch):
+    monkeypatch.setattr(startup_module.startup, "db_ready", False)
+    monkeypatch.setattr(startup_module.startup, "db_error", "connection refused")
+
+    r = client.get("/ready")
+
+    assert r.status_code == 503
+    assert r.json()["db"] == {"ready": False, "error": "connection refused"}
+    assert client.get("/health").status_code == 200
+
+
+def test_ready_checks_database_and_model(client, fake_pg, monkeypatch):
+    async def ping(timeout=None):
+        pass
+
+    fake_pg.ping = ping
+    monkeypatch.setattr(startup_module.startup, "db_ready", True)
+    monkeypatch.setattr(startup_module.startup, "model_ready", True)
+
+    r = client.get("/ready")
+
+    assert r.status_code == 200
+    assert r.json()["db"] == {"ready": True}
+    assert r.json()["model"]["breaker"] == "closed"
+
+    async def failing_ping(timeout=None):
+        raise TimeoutError("pool timeout")
+
+    fake_pg.ping = failing_ping
+    assert client.get("/ready").status_code == 503
+
+
+def test_worker_share_splits_deployment_limits(caplog):
+    from backend.core.workers import worker_share
+
+    assert worker_share(60.0, "RPM", workers=8) == 7.5
+    assert worker_share(8, "CONCURRENCY", workers=8) == 1
+    assert worker_share(10, "CONCURRENCY", workers=4) == 2
+    assert worker_share(0.0, "RPM", workers=8) == 0.0  # no limit stays no limit
+    assert worker_share(60.0, "RPM", workers=1) == 60.0
+    assert not caplog.records
+
+
+def test_worker_share_warns_when_the_floor_raises_the_total(caplog):
+    from backend.core.workers import worker_share
+
+    assert worker_share(4, "AI_MAX_CONCURRENCY", workers=8) == 1
+    assert worker_share(2048, "UPLOAD_MAX_INFLIGHT_BYTES", minimum=512, workers=8) == 512
+
+    first, second = caplog.records
+    assert first.levelname == "WARNING"
+    assert first.getMessage() == "AI_MAX_CONCURRENCY=4 is less than 1 per worker; 8 workers allow 8 in total"
+    assert "8 workers allow 4096 in total" in second.getMessage()
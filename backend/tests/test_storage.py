@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from backend.core.storage import UploadTooLarge, content_path, normalize_suffix, store_upload
+
+
+def store(root, data: bytes, filename: str, **kwargs):
+    upload = UploadFile(io.BytesIO(data), filename=filename)
+    return asyncio.run(store_upload(upload, root, **kwargs))
+
+
+def test_store_upload_writes_to_sharded_content_path(tmp_path):
+    stored = store(tmp_path, b"page one", "IMG_0001.JPG", chunk_size=3)
+    digest = hashlib.sha256(b"page one").hexdigest()
+    assert stored.content_hash == digest
+    assert stored.path == tmp_path / digest[:2] / digest[2:4] / f"{digest}.jpg"
+    assert stored.path.read_bytes() == b"page one"
+    assert stored.size == 8
+    assert not stored.deduplicated
+
+
+def test_store_upload_deduplicates_identical_bytes(tmp_path):
+    first = store(tmp_path, b"same", "a.png")
+    second = store(tmp_path, b"same", "b.png")
+    assert second.path == first.path
+    assert second.deduplicated
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+
+
+def test_store_upload_same_name_different_bytes_do_not_collide(tmp_path):
+    first = store(tmp_path, b"one", "IMG_0001.jpg")
+    second = store(tmp_path, b"two", "IMG_0001.jpg")
+    assert first.path != second.path
+    assert first.path.read_bytes() == b"one"
+    assert second.path.read_bytes() == b"two"
+
+
+def test_store_upload_rejects_oversized_file_and_cleans_up(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        store(tmp_path, b"X" * 10, "big.png", max_bytes=5, chunk_size=2)
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+
+def test_normalize_suffix():
+    assert normalize_suffix("photo.JPEG") == ".jpeg"
+    assert normalize_suffix("noext") == ".bin"
+    assert normalize_suffix(None) == ".bin"
+    assert normalize_suffix("weird.p/ng") == ".bin"
+
+
+def test_content_path_uses_two_hash_prefix_levels():
+    assert content_path(Path("r"), "abcdef", ".png") == Path("r/ab/cd/abcdef.png")
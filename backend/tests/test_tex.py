@@ -58,6 +58,35 @@ def test_list_user_images_with_batch_id(client, fake_pg, fake_verify_token):
     assert data["images"][0]["id"] == 20
     assert data["images"][0]["batch_id"] == 5
 
+def test_list_user_images_keyset_pages(client, fake_pg, fake_verify_token):
+    # Two images share a timestamp so the id tiebreak matters
+    fake_pg._rows = [
+        (30 + i, f"uploads/images/{i}.png", datetime(2025, 12, 16, 10, min(i, 3)), None)
+        for i in range(5)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        url = "/tex/images?limit=2" + (f"&after={cursor}" if cursor else "")
+        r = client.get(url, headers={"Authorization": "Bearer valid"})
+        assert r.status_code == 200
+        data = r.json()
+        seen.extend(img["id"] for img in data["images"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [34, 33, 32, 31, 30]
+
+
+def test_list_user_images_rejects_bad_cursor(client, fake_verify_token):
+    headers = {"Authorization": "Bearer valid"}
+    assert client.get("/tex/images?after=not-a-cursor", headers=headers).status_code == 400
+
+    from backend.core.pagination import encode_cursor
+    cursor = encode_cursor(datetime(2025, 12, 16), 1)
+    assert client.get(f"/tex/images?after={cursor}&offset=2", headers=headers).status_code == 400
+
 ### ========= Tests for /tex/images-to-latex Route ========== ###
 
 def test_images_to_latex_requires_auth(client):
@@ -90,7 +119,7 @@ def test_images_to_latex_converts_images_to_latex(client, fake_pg, fake_verify_t
 
     import backend.routers.tex as tex_router
 
-    def fake_generate(paths):
+    async def fake_generate(paths):
         assert paths == [
             "uploads/images/user_1_img1.png",
             "uploads/images/user_1_img2.png",
@@ -130,3 +159,63 @@ def test_images_to_latex_404_when_no_rows(client, fake_pg, fake_verify_token):
     )
     assert r.status_code == 404
     assert r.json()["detail"] == "No matching images found for user"
+
+
+### ========= Streaming /tex/images-to-latex ========== ###
+
+def _fake_stream(*chunks):
+    async def _stream(pages):
+        for chunk in chunks:
+            yield chunk
+    return _stream
+
+
+def test_images_to_latex_streams_chunked_text(client, fake_pg, fake_verify_token, monkeypatch):
+    import backend.routers.tex as tex_router
+
+    fake_pg._rows = [(1, "uploads/images/user_1_img1.png")]
+    monkeypatch.setattr(tex_router, "stream_latex_from_images", _fake_stream("\\documentclass", "{article}"))
+
+    with client.stream(
+        "POST",
+        "/tex/images-to-latex?stream=true",
+        headers={"Authorization": "Bearer valid"},
+        json={"image_ids": [1]},
+    ) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/x-tex"
+        assert "".join(r.iter_text()) == "\\documentclass{article}"
+
+
+def test_images_to_latex_streams_server_sent_events(client, fake_pg, fake_verify_token, monkeypatch):
+    import backend.routers.tex as tex_router
+
+    fake_pg._rows = [(1, "uploads/images/user_1_img1.png")]
+    monkeypatch.setattr(tex_router, "stream_latex_from_images", _fake_stream("line1\nline2", "more"))
+
+    r = client.post(
+        "/tex/images-to-latex?stream=true",
+        headers={"Authorization": "Bearer valid", "Accept": "text/event-stream"},
+        json={"image_ids": [1]},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text == "data: line1\ndata: line2\n\ndata: more\n\nevent: done\ndata: \n\n"
+
+
+def test_images_to_latex_stream_reports_errors_as_events(client, fake_pg, fake_verify_token, monkeypatch):
+    import backend.routers.tex as tex_router
+
+    async def broken(pages):
+        yield "partial"
+        raise RuntimeError("model went away")
+
+    fake_pg._rows = [(1, "uploads/images/user_1_img1.png")]
+    monkeypatch.setattr(tex_router, "stream_latex_from_images", broken)
+
+    r = client.post(
+        "/tex/images-to-latex?stream=true",
+        headers={"Authorization": "Bearer valid", "Accept": "text/event-stream"},
+        json={"image_ids": [1]},
+    )
+    assert r.text == "data: partial\n\nevent: error\ndata: model went away\n\n"
@@ -0,0 +1,112 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from backend.core.authentication import verify_token
+from backend.core.token_reaper import TokenReaper
+
+
+class TokensCursor:
+    """Just enough of the tokens SQL for verify_token and the reaper."""
+
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+        self.rowcount = 0
+
+    async def execute(self, query, params=None):
+        q = " ".join(query.split())
+        self.db.queries.append(q)
+        if q.startswith("DELETE FROM tokens WHERE id IN"):
+            now = datetime.utcnow()
+            expired = sorted((t for t in self.db.tokens.values() if t["expires_at"] < now), key=lambda t: t["expires_at"])
+            for token in expired[:params[0]]:
+                del self.db.tokens[token["token"]]
+            self.rowcount = len(expired[:params[0]])
+        elif q.startswith("DELETE FROM token_revocations"):
+            self.rowcount = 0
+        elif "WHERE t.token = %s" in q:
+            token = self.db.tokens.get(params[0])
+            self._rows = [{"id": 1, "username": "u", "email": "e", "expires_at": token["expires_at"]}] if token else []
+        else:
+            raise AssertionError(f"Unexpected query: {q}")
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TokensDB:
+    def __init__(self, expired: int, live: int):
+        now = datetime.utcnow()
+        self.tokens = {}
+        for i in range(expired):
+            self.tokens[f"old{i}"] = {"token": f"old{i}", "expires_at": now - timedelta(minutes=i + 1)}
+        for i in range(live):
+            self.tokens[f"new{i}"] = {"token": f"new{i}", "expires_at": now + timedelta(minutes=30)}
+        self.queries = []
+        self.commits = 0
+        self.leases = 0
+
+    def cursor(self, *args, **kwargs):
+        return TokensCursor(self)
+
+    async def commit(self):
+        self.commits += 1
+
+    @asynccontextmanager
+    async def connection(self):
+        self.leases += 1
+        yield self
+
+
+def test_sweep_deletes_expired_tokens_in_batches():
+    db = TokensDB(expired=25, live=3)
+    reaper = TokenReaper(interval=60, batch_size=10)
+    reaper.db = db
+
+    assert asyncio.run(reaper.sweep()) == 25
+    assert sorted(db.tokens) == ["new0", "new1", "new2"]
+    # 10 + 10 + 5: each batch is its own lease and transaction, plus one
+    # for expired revocation records
+    assert db.leases == 4
+    assert db.commits == 4
+    assert reaper.stats()["total_removed"] == 25
+
+    assert asyncio.run(reaper.sweep()) == 0
+    assert reaper.stats()["last_removed"] == 0
+
+
+def test_verify_token_does_not_write_for_expired_token():
+    db = TokensDB(expired=1, live=0)
+
+    assert asyncio.run(verify_token(db, "old0")) is None
+    assert "old0" in db.tokens
+    assert db.commits == 0
+    assert not any(q.startswith("DELETE") for q in db.queries)
+
+
+def test_reaper_runs_until_stopped():
+    db = TokensDB(expired=2, live=0)
+    reaper = TokenReaper(interval=60, batch_size=10)
+
+    async def main():
+        reaper.start(db)
+        assert reaper.running
+        await asyncio.sleep(0.01)
+        await reaper.stop()
+
+    asyncio.run(main())
+    assert not reaper.running
+    assert db.tokens == {}
+
+
+def test_disabled_reaper_does_not_start():
+    reaper = TokenReaper(interval=0, batch_size=10)
+    reaper.start(TokensDB(expired=1, live=0))
+    assert not reaper.running
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+
+import pytest
+
+import backend.routers.tex as tex_router
+from backend.core import transcriptions
+from backend.core.preprocess import image_preprocessor
+from backend.core.transcriptions import image_content_hashes, latex_cache, transcription_key
+
+
+@pytest.fixture(autouse=True)
+def clear_latex_cache():
+    latex_cache.clear()
+    yield
+    latex_cache.clear()
+
+
+def test_key_depends_on_images_order_prompt_and_model():
+    a, b = "a" * 64, "b" * 64
+    base = transcription_key([a, b], prompt="p", model="m")
+    assert base == transcription_key([a, b], prompt="p", model="m")
+    assert base != transcription_key([b, a], prompt="p", model="m")
+    assert base != transcription_key([a, b], prompt="p2", model="m")
+    assert base != transcription_key([a, b], prompt="p", model="m2")
+
+
+def test_key_depends_on_how_pages_are_grouped_into_calls():
+    pages = [c * 64 for c in "abcde"]
+    chunked = transcription_key(pages, prompt="p", model="m", chunk_pages=2)
+    assert chunked != transcription_key(pages, prompt="p", model="m", chunk_pages=0)
+    assert chunked != transcription_key(pages, prompt="p", model="m", chunk_pages=3)
+    # Short enough for one call either way, so the result is the same
+    assert transcription_key(pages, prompt="p", model="m", chunk_pages=5) == transcription_key(
+        pages, prompt="p", model="m", chunk_pages=0
+    )
+
+
+def test_content_hashes_trust_stored_names_and_hash_others(tmp_path):
+    digest = hashlib.sha256(b"page").hexdigest()
+    stored = tmp_path / f"{digest}.png"
+    other = tmp_path / "legacy.png"
+    other.write_bytes(b"page")
+
+    assert image_content_hashes([stored, other]) == [digest, digest]
+    assert image_content_hashes([tmp_path / "missing.png"]) is None
+
+
+class CodeConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def cursor(self):
+        conn = self
+
+        class Cur:
+            async def execute(self, q, p=None):
+                conn.queries += 1
+
+            async def fetchone(self):
+                return conn.rows[0] if conn.rows else None
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Cur()
+
+
+def test_lookup_hits_db_once_then_memory():
+    conn = CodeConn([("\\documentclass{article}",)])
+
+    async def main():
+        first = await transcriptions.lookup(conn, "k" * 64)
+        second = await transcriptions.lookup(conn, "k" * 64)
+        return first, second
+
+    assert asyncio.run(main()) == ("\\documentclass{article}",) * 2
+    assert conn.queries == 1
+
+
+def test_lookup_ignores_empty_stored_result():
+    conn = CodeConn([("",)])
+
+    assert asyncio.run(transcriptions.lookup(conn, "e" * 64)) is None
+
+
+def test_images_to_latex_serves_cached_result(client, fake_pg, fake_verify_token, monkeypatch):
+    digest = hashlib.sha256(b"page").hexdigest()
+    fake_pg._rows = [(1, f"uploads/images/{digest}.png")]
+    latex_cache.put(transcription_key([digest], variant=image_preprocessor.variant), "CACHED")
+
+    async def fail_generate(paths):
+        raise AssertionError("model should not be called")
+
+    monkeypatch.setattr(tex_router, "generate_latex_from_images", fail_generate)
+
+    r = client.post(
+        "/tex/images-to-latex",
+        headers={"Authorization": "Bearer valid"},
+        json={"image_ids": [1]},
+    )
+    assert r.status_code == 200
+    assert r.content == b"CACHED"
+
+
+def test_streamed_and_chunked_results_are_cached_apart(client, fake_pg, fake_verify_token, monkeypatch):
+    digests = [hashlib.sha256(page).hexdigest() for page in (b"one", b"two")]
+    fake_pg._rows = [(i + 1, f"uploads/images/{d}.png") for i, d in enumerate(digests)]
+    monkeypatch.setitem(transcriptions.AI_CONFIG, "CHUNK_PAGES", 1)
+    latex_cache.put(transcription_key(digests, variant=image_preprocessor.variant), "CHUNKED")
+    stored = []
+
+    async def one_call(pages):
+        yield "ONE CALL"
+
+    async def store(_conn, _user_id, key, latex):
+        stored.append((key, latex))
+
+    monkeypatch.setattr(tex_router, "stream_latex_from_images", one_call)
+    monkeypatch.setattr(tex_router.transcriptions, "store", store)
+    headers = {"Authorization": "Bearer valid"}
+
+    # The chunked result isn't served as a stream's, nor stored over it
+    r = client.post("/tex/images-to-latex?stream=true", headers=headers, json={"image_ids": [1, 2]})
+    assert r.text == "ONE CALL"
+    [(key, latex)] = stored
+    assert key == transcription_key(digests, variant=image_preprocessor.variant, chunk_pages=0)
+
+    r = client.post("/tex/images-to-latex", headers=headers, json={"image_ids": [1, 2]})
+    assert r.content == b"CHUNKED"
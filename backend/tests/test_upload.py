@@ -1,3 +1,4 @@
+import hashlib
 import io
 
 
@@ -6,45 +7,33 @@ def test_upload_image_requires_auth(client):
     assert r.status_code == 401
 
 
-def test_upload_image_happy_path(client, fake_pg, fake_verify_token, monkeypatch):
-    # Mock filesystem writes
-    from pathlib import Path
-
-    written = {}
-
-    def fake_write_bytes(self, data: bytes):
-        written[str(self)] = data
-        return len(data)
-
-    monkeypatch.setattr(Path, "write_bytes", fake_write_bytes)
-
+def test_upload_image_happy_path(client, fake_pg, fake_verify_token, upload_dir):
     # Mock DB insert returning id
     class InsertCursor:
         def __init__(self):
             self._rows = [(42,)]
             self._committed = False
 
-        def execute(self, query, params=None):
+        async def execute(self, query, params=None):
             self._last_query = (query, params)
 
-        def fetchone(self):
+        async def fetchone(self):
             return self._rows[0]
 
-        def __enter__(self):
+        async def fetchall(self):
+            return self._rows
+
+        async def __aenter__(self):
             return self
 
-        def __exit__(self, exc_type, exc, tb):
+        async def __aexit__(self, exc_type, exc, tb):
             return False
 
     class InsertConn:
         def cursor(self):
             return InsertCursor()
-        def commit(self):
+        async def commit(self):
             pass
-        def __enter__(self):
-            return self
-        def __exit__(self, exc_type, exc, tb):
-            return False
 
     fake_pg._rows = []
     fake_pg.get_conn = lambda: InsertConn()
@@ -58,5 +47,81 @@ def test_upload_image_happy_path(client, fake_pg, fake_verify_token, monkeypatch
     assert r.status_code == 200
     data = r.json()
     assert data["image_id"] == 42
-    # Ensure file was "written"
-    assert any(path.endswith("note.png") for path in written.keys())
+    # Ensure file was written to its content address, with no temp files left behind
+    digest = hashlib.sha256(b"PNGDATA").hexdigest()
+    assert data["content_hash"] == digest
+    written = {p.relative_to(upload_dir).as_posix(): p.read_bytes() for p in upload_dir.rglob("*") if p.is_file()}
+    assert written == {f"{digest[:2]}/{digest[2:4]}/{digest}.png": b"PNGDATA"}
+
+
+def test_upload_image_over_file_limit_returns_413(client, fake_verify_token, upload_dir, monkeypatch):
+    from backend.constants import UPLOAD_CONFIG
+
+    monkeypatch.setitem(UPLOAD_CONFIG, "MAX_FILE_BYTES", 4)
+
+    r = client.post(
+        "/upload/image",
+        headers={"Authorization": "Bearer valid"},
+        files={"file": ("note.png", io.BytesIO(b"TOO LARGE"), "image/png")},
+    )
+    assert r.status_code == 413
+    assert [p for p in upload_dir.rglob("*") if p.is_file()] == []
+
+
+def test_upload_request_over_request_limit_returns_413():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from backend.core.storage import ByteBudget
+    from backend.middleware.upload_limits import UploadLimitMiddleware
+
+    app = FastAPI()
+
+    @app.post("/upload/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    budget = ByteBudget(1000)
+    app.add_middleware(UploadLimitMiddleware, max_request_bytes=10, budget=budget)
+    c = TestClient(app)
+
+    assert c.post("/upload/raw", content=b"X" * 10).json() == {"size": 10}
+    assert c.post("/upload/raw", content=b"X" * 11).status_code == 413
+
+    # Without a Content-Length the body is counted as it streams in
+    r = c.post("/upload/raw", content=iter([b"X" * 6, b"X" * 6]))
+    assert r.status_code == 413
+    assert budget.in_use == 0
+
+
+def test_upload_returns_503_when_inflight_budget_exhausted(client, monkeypatch):
+    from backend.core.storage import upload_budget
+
+    monkeypatch.setattr(upload_budget, "in_use", upload_budget.limit)
+    r = client.post(
+        "/upload/image",
+        headers={"Authorization": "Bearer valid"},
+        files={"file": ("note.png", io.BytesIO(b"X"), "image/png")},
+    )
+    assert r.status_code == 503
+    assert r.headers.get("retry-after") == "1"
+
+
+def test_zero_inflight_budget_means_no_limit():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from backend.core.storage import ByteBudget
+    from backend.middleware.upload_limits import UploadLimitMiddleware
+
+    app = FastAPI()
+
+    @app.post("/upload/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    budget = ByteBudget(0)
+    app.add_middleware(UploadLimitMiddleware, max_request_bytes=100, budget=budget)
+    c = TestClient(app)
+
+    assert c.post("/upload/raw", content=b"X" * 50).json() == {"size": 50}
+    assert c.post("/upload/raw", content=iter([b"X" * 30, b"X" * 30])).json() == {"size": 60}
+    assert budget.in_use == 0
@@ -2,6 +2,7 @@
 # This route is not being used by the frontend currently.
 # but for sake of coverage, we keep tests here.
 
+import hashlib
 import io
 
 
@@ -17,40 +18,26 @@ def test_upload_batch_empty_files(client, fake_verify_token):
     assert r.status_code == 422
 
 
-def test_upload_batch_happy_path(client, fake_pg, fake_verify_token, monkeypatch):
-    # Mock file writes
-    from pathlib import Path
-    writes = {}
-    def fake_write_bytes(self, data):
-        writes[str(self)] = data
-        return len(data)
-    monkeypatch.setattr(Path, "write_bytes", fake_write_bytes)
-
-    # Mock DB cursors: first optional batch insert, then image inserts
+def test_upload_batch_happy_path(client, fake_pg, fake_verify_token, upload_dir):
+    # Mock DB cursors: optional batch insert, then one multi-row image insert
+    executed = []
+    commits = []
     class BatchCursor:
-        def __init__(self, rows):
-            self._rows = rows
-            self._commit_called = False
-        def execute(self, q, p=None):
-            self._last = (q, p)
-        def fetchone(self):
-            return self._rows.pop(0) if self._rows else (100,)  # default batch id
-        def __enter__(self):
+        async def execute(self, q, p=None):
+            executed.append((q, p))
+        async def fetchone(self):
+            return (77,)  # batch id
+        async def fetchall(self):
+            return [(6,), (5,)]  # image ids, deliberately out of order
+        async def __aenter__(self):
             return self
-        def __exit__(self, exc_type, exc, tb):
+        async def __aexit__(self, exc_type, exc, tb):
             return False
     class BatchConn:
-        def __init__(self):
-            # First fetchone for batch_id, subsequent for image ids
-            self._rows = [(77,), (5,), (6,)]
         def cursor(self):
-            return BatchCursor(self._rows)
-        def commit(self):
-            pass
-        def __enter__(self):
-            return self
-        def __exit__(self, exc_type, exc, tb):
-            return False
+            return BatchCursor()
+        async def commit(self):
+            commits.append(True)
     fake_pg.get_conn = lambda: BatchConn()
 
     files = [
@@ -67,7 +54,13 @@ def test_upload_batch_happy_path(client, fake_pg, fake_verify_token, monkeypatch
     data = r.json()
     assert data["batch_id"] == 77
     assert len(data["items"]) == 2
-    assert {item["image_id"] for item in data["items"]} == {5, 6}
+    assert [item["image_id"] for item in data["items"]] == [5, 6]
+    # One batch insert plus one multi-row image insert, committed once
+    assert len(executed) == 2
+    assert len(commits) == 1
     # Confirm writes occurred
-    assert any(path.endswith("x.png") for path in writes)
-    assert any(path.endswith("y.png") for path in writes)
+    writes = {p.name: p.read_bytes() for p in upload_dir.rglob("*.png")}
+    assert writes == {
+        hashlib.sha256(b"X").hexdigest() + ".png": b"X",
+        hashlib.sha256(b"Y").hexdigest() + ".png": b"Y",
+    }